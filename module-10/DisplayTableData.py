@@ -1,24 +1,32 @@
 """ import statements """
 import mysql.connector  # to connect
 from mysql.connector import errorcode
-from mysql.connector import MySQLConnection
 
 import os
+from typing import Iterator
 from dotenv import dotenv_values
 
+from connection_pool import get_pool, pool_options, PoolExhaustedError, PooledConnection
 
-def display_table(cursor, table_name):
+
+def display_table(cursor, table_name, stream: bool = False, batch_size: int = 1000):
     """
     Display all data from a specified table.
     No validation of if the table exists is done here.
 
     :param cursor: MySQL cursor object
     :param table_name: Name of the table to display data from
+    :param stream: Print rows as they arrive instead of loading them all
+        first (needs an unbuffered cursor, the mysql.connector default)
+    :param batch_size: Rows fetched per round trip when streaming
     """
     print(f"\n--- {table_name} table ---")
 
-    cursor.execute(f"SELECT * FROM {table_name}")
-    rows = cursor.fetchall()
+    if stream:
+        rows = IterTableData(cursor, table_name, batch_size)
+    else:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        rows = cursor.fetchall()
 
     columns = [desc[0] for desc in cursor.description]
     print(" | ".join(columns))
@@ -28,6 +36,36 @@ def display_table(cursor, table_name):
         print(" | ".join(str(item) if item is not None else "" for item in row))
 
 
+def IterTableData(cursor, table_name, batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    Stream all data from a specified table, batch_size rows at a time.
+    The query runs immediately, so cursor.description is ready on return.
+
+    :param cursor: Unbuffered MySQL cursor object
+    :param table_name: Name of the table to retrieve data from
+    :param batch_size: Rows fetched per round trip
+    """
+    cursor.execute(f"SELECT * FROM {table_name}")
+    return _iter_batches(cursor, batch_size)
+
+
+def _iter_batches(cursor, batch_size: int) -> Iterator[tuple]:
+    # Yield rows with fetchmany. If the caller stops early, read and drop
+    # the rest so the connection can run its next query.
+    done = False
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                done = True
+                return
+            yield from batch
+    finally:
+        if not done:
+            while cursor.fetchmany(batch_size):
+                pass
+
+
 def GetTables(cursor) -> list[str]:
     """
     Retrieve a list of all table names in the 'outland_adventures' database.
@@ -37,9 +75,10 @@ def GetTables(cursor) -> list[str]:
     return tables
 
 
-def GetDatabaseConnection() -> MySQLConnection | None:
+def GetDatabaseConnection() -> PooledConnection | None:
     """
     Get a connection to the MySQL database.
+    The connection comes from the shared pool; close() hands it back.
     """
 
     # Get folder where this script lives
@@ -57,9 +96,11 @@ def GetDatabaseConnection() -> MySQLConnection | None:
     }
 
     try:
-        db = MySQLConnection(**config)
+        db = get_pool(config, **pool_options(secrets)).checkout()
         if db is not None:
             return db
+    except PoolExhaustedError as err:
+        print(err)
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
             print("The supplied username or password are invalid")
@@ -82,7 +123,7 @@ def main():
     tables = GetTables(cursor)
 
     for table in tables:
-        display_table(cursor, table)
+        display_table(cursor, table, stream=True)
 
     cursor.close()
     conn.close()
@@ -0,0 +1,304 @@
+"""
+connection_pool.py
+Process-wide pool of reusable MySQL connections shared by the report and
+query scripts. A script pays the TCP/auth handshake once per pooled
+connection instead of once per report.
+
+Usage:
+    pool = get_pool(config)
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        ...
+
+Connections handed out by the pool look like a normal MySQLConnection.
+Calling close() on one gives it back to the pool instead of closing it.
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+import mysql.connector
+
+
+# Defaults used when neither the caller nor the .env file says otherwise
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_IDLE_SECONDS = 300
+DEFAULT_CHECKOUT_TIMEOUT = 30
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no pooled connection frees up before the checkout timeout."""
+
+
+class PooledConnection:
+    """
+    Wrapper around a connection checked out of a ConnectionPool.
+    Everything is passed through to the real connection except close(),
+    which returns the connection to the pool.
+    """
+
+    def __init__(self, pool, raw, checkout_seconds=0.0):
+        self._pool = pool
+        self._raw = raw
+        # How long the caller waited for this connection (seconds)
+        self.checkout_seconds = checkout_seconds
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise AttributeError(f"Pooled connection already returned: {name}")
+        return getattr(raw, name)
+
+    def is_connected(self) -> bool:
+        return self._raw is not None and self._raw.is_connected()
+
+    def close(self) -> None:
+        """Return the connection to the pool. Safe to call more than once."""
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of MySQL connections.
+
+    :param config: Keyword arguments passed to mysql.connector.connect
+    :param pool_size: Maximum number of open connections
+    :param max_idle_seconds: Idle connections older than this are closed
+    :param checkout_timeout: Seconds to wait for a free connection
+    :param connect: Function used to open a new connection
+    """
+
+    def __init__(self, config, pool_size=DEFAULT_POOL_SIZE,
+                 max_idle_seconds=DEFAULT_MAX_IDLE_SECONDS,
+                 checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT,
+                 connect=mysql.connector.connect):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.config = dict(config)
+        self.pool_size = pool_size
+        self.max_idle_seconds = max_idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self._connect = connect
+
+        # Idle connections as (connection, last_used) pairs, newest last
+        self._idle = []
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # Counters for reporting and the benchmark
+        self.stats = {"connects": 0, "reuses": 0, "evicted": 0, "broken": 0}
+
+    # ------------------------------------------------------------
+    # Checkout / release
+    # ------------------------------------------------------------
+    def checkout(self, timeout=None) -> PooledConnection:
+        """
+        Get a healthy connection from the pool, opening one if needed.
+
+        :param timeout: Seconds to wait when every connection is in use
+        :return: PooledConnection that goes back to the pool on close()
+        :rtype: PooledConnection
+        """
+        start = time.perf_counter()
+        wait = self.checkout_timeout if timeout is None else timeout
+        deadline = start + wait
+
+        with self._cond:
+            while True:
+                stale = self._take_stale_locked()
+                if stale:
+                    self._close_all(stale)
+                if self._idle:
+                    # Most recently used first, it is the least likely to be stale
+                    raw, _ = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.pool_size:
+                    raw = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No connection available after {wait} seconds "
+                        f"(pool size {self.pool_size})"
+                    )
+                self._cond.wait(remaining)
+
+        # Health check and connect happen outside the lock so one slow
+        # handshake does not hold up every other caller
+        try:
+            if raw is not None and not self._is_healthy(raw):
+                self._count("broken")
+                self._close_all([raw])
+                raw = None
+
+            if raw is None:
+                raw = self._connect(**self.config)
+                self._count("connects")
+            else:
+                self._count("reuses")
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, raw, time.perf_counter() - start)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """
+        Context manager form of checkout().
+
+            with pool.connection() as conn:
+                ...
+        """
+        conn = self.checkout(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def release(self, raw) -> None:
+        """
+        Put a connection back in the pool. Any open transaction is rolled
+        back so the next caller starts clean. Broken connections are dropped.
+
+        :param raw: The underlying MySQL connection
+        """
+        keep = True
+        try:
+            if raw.is_connected():
+                if getattr(raw, "in_transaction", False):
+                    raw.rollback()
+            else:
+                keep = False
+        except mysql.connector.Error:
+            keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+        if not keep:
+            self._count("broken")
+            self._close_all([raw])
+
+    def closeall(self) -> None:
+        """Close every idle connection. Checked out connections are left alone."""
+        with self._cond:
+            idle = [raw for raw, _ in self._idle]
+            self._idle = []
+        self._close_all(idle)
+
+    def size(self) -> tuple[int, int]:
+        """
+        :return: (idle connections, checked out connections)
+        :rtype: tuple[int, int]
+        """
+        with self._cond:
+            return len(self._idle), self._in_use
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+    def _take_stale_locked(self) -> list:
+        """Remove idle connections past max_idle_seconds. Caller holds the lock."""
+        if not self._idle or self.max_idle_seconds is None:
+            return []
+        cutoff = time.monotonic() - self.max_idle_seconds
+        stale = [raw for raw, last_used in self._idle if last_used < cutoff]
+        if stale:
+            self._idle = [(raw, t) for raw, t in self._idle if t >= cutoff]
+            self.stats["evicted"] += len(stale)
+        return stale
+
+    @staticmethod
+    def _is_healthy(raw) -> bool:
+        # is_connected() pings the server, so this also catches
+        # connections the server closed while they sat idle
+        try:
+            return raw.is_connected()
+        except mysql.connector.Error:
+            return False
+
+    @staticmethod
+    def _close_all(connections) -> None:
+        for raw in connections:
+            try:
+                raw.close()
+            except Exception:
+                pass
+
+    def _count(self, name) -> None:
+        with self._cond:
+            self.stats[name] += 1
+
+
+# ------------------------------------------------------------
+# Process-wide registry: one pool per distinct connection config
+# ------------------------------------------------------------
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_options(secrets) -> dict:
+    """
+    Read optional pool settings from a .env dictionary.
+    Supported keys: POOL_SIZE, POOL_MAX_IDLE, POOL_TIMEOUT.
+
+    :param secrets: Values loaded with dotenv_values
+    :return: Keyword arguments for get_pool
+    :rtype: dict
+    """
+    options = {}
+    if secrets.get("POOL_SIZE"):
+        options["pool_size"] = int(secrets["POOL_SIZE"])
+    if secrets.get("POOL_MAX_IDLE"):
+        options["max_idle_seconds"] = float(secrets["POOL_MAX_IDLE"])
+    if secrets.get("POOL_TIMEOUT"):
+        options["checkout_timeout"] = float(secrets["POOL_TIMEOUT"])
+    return options
+
+
+def get_pool(config, **options) -> ConnectionPool:
+    """
+    Get the shared pool for a connection config, creating it on first use.
+    Options are only applied when the pool is created.
+
+    :param config: Keyword arguments for mysql.connector.connect
+    :return: The process-wide pool for that config
+    :rtype: ConnectionPool
+    """
+    key = tuple(sorted((k, str(v)) for k, v in config.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(config, **options)
+            _pools[key] = pool
+    return pool
+
+
+def close_all_pools() -> None:
+    """Close the idle connections of every pool in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.closeall()
+
+
+atexit.register(close_all_pools)
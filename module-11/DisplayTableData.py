@@ -1,57 +1,101 @@
 """ import statements """
 import mysql.connector # to connect
 from mysql.connector import errorcode
-from mysql.connector import MySQLConnection
 
 import dotenv # to use .env file
 import os
+from typing import Iterator
 from dotenv import dotenv_values
 
+from connection_pool import get_pool, pool_options, PoolExhaustedError, PooledConnection
+from column_formatters import TableFormatter
+from table_renderer import StreamingTable
+from schema_catalog import get_catalog, SchemaCatalog
+from instrumentation import configure, instrument, timer
+from query_registry import QueryRegistry
 
-def display_table(cursor, table_name, show_astable: bool = True) -> None:
+
+# Table names cannot be query parameters; they are checked against the
+# schema catalog and quoted before they go into the SQL
+TABLE_QUERIES = QueryRegistry()
+TABLE_QUERIES.register("select_all", "SELECT * FROM {table}", table="table")
+
+
+def display_table(cursor, table_name, show_astable: bool = True,
+                  stream: bool = False, batch_size: int = 1000,
+                  cache=None) -> None:
     """
     Display all data from a specified table.
-    No validation of if the table exists is done here.
+    Raises ValueError if the table is not in the schema catalog.
 
     :param cursor: MySQL cursor object
     :param table_name: Name of the table to display data from
+    :param show_astable: Print rows as a table instead of name: value pairs
+    :param stream: Print rows as they arrive instead of loading them all
+        first. Memory is bounded by batch_size rather than table size.
+        The cursor must be unbuffered (the mysql.connector default).
+        Tables are printed fixed width, sized from the first batch;
+        longer values later run past their column rather than being cut.
+    :param batch_size: Rows fetched per round trip when streaming
+    :param cache: Optional ResultCache. Repeated calls are served from
+        memory until the table changes or the entry expires.
+        Ignored when streaming.
     """
     # Fetch and display all data from the table
     print(f"\n--- {table_name} table ---")
 
-    # Execute query to fetch all data
-    cursor.execute(f"SELECT * FROM {table_name}")
+    if stream:
+        # Rows are pulled from the server batch by batch while printing
+        rows = IterTableData(cursor, table_name, batch_size)
+        columns = [desc[0] for desc in cursor.description]
+    elif cache is not None:
+        # Served from memory when the cached result is still valid
+        columns, rows = cache.execute(cursor, SelectAllQuery(cursor, table_name))
+    else:
+        # Execute query to fetch all data
+        cursor.execute(SelectAllQuery(cursor, table_name))
 
-    # Fetch all rows
-    rows = cursor.fetchall()
+        # Fetch all rows
+        rows = cursor.fetchall()
 
-    if show_astable:
         # Get column names
         columns = [desc[0] for desc in cursor.description]
 
-        # Print column headers
-        print(" | ".join(columns))
+    # Time spent formatting and printing; when streaming this also
+    # includes fetching the batches
+    with timer("render_seconds", report=table_name):
+        if show_astable and stream:
+            # Fixed-width table printed batch by batch; widths come from the
+            # first batch so printing starts as soon as it arrives. Values are
+            # shown with str() and never cut, as in the non-streaming dump
+            with StreamingTable(columns, formatter=TableFormatter.plain(columns),
+                                max_width=None) as table:
+                table.write_all(rows, batch_size)
+        elif show_astable:
+            # Print column headers
+            print(" | ".join(columns))
 
-        print("-" * 50)
+            print("-" * 50)
 
-        # Print each row
-        for row in rows:
-            print(" | ".join(str(item) if item is not None else "" for item in row))
-    else:
-        # Get num of columns
-        num_columns = len(cursor.description)
+            # Print each row
+            for row in rows:
+                print(" | ".join(str(item) if item is not None else "" for item in row))
+        else:
+            # Get num of columns
+            num_columns = len(columns)
 
-        # Print each row
-        for row in rows:
-            for i in range(num_columns):
-                column_name = cursor.description[i][0]
-                print(f"{column_name}: {row[i]}")
-            print("-" * 20)
+            # Print each row
+            for row in rows:
+                for i in range(num_columns):
+                    column_name = columns[i]
+                    print(f"{column_name}: {row[i]}")
+                print("-" * 20)
 
 def GetTableData(cursor, table_name) -> list[tuple]:
     """
     Retrieve all data from a specified table.
-    No validation of if the table exists is done here.
+    Raises ValueError if the table is not in the schema catalog.
+    For large tables use IterTableData, which does not hold every row at once.
 
     :param cursor: MySQL cursor object
     :param table_name: Name of the table to retrieve data from
@@ -59,40 +103,113 @@ def GetTableData(cursor, table_name) -> list[tuple]:
     :rtype: list[tuple]
     """
     # Execute query to fetch all data
-    cursor.execute(f"SELECT * FROM {table_name}")
+    cursor.execute(SelectAllQuery(cursor, table_name))
 
     # Fetch all rows
     rows = cursor.fetchall()
     return rows
 
+def IterTableData(cursor, table_name, batch_size: int = 1000) -> Iterator[tuple]:
+    """
+    Stream all data from a specified table, batch_size rows at a time.
+    The query runs immediately, so cursor.description is ready on return.
+    Raises ValueError if the table is not in the schema catalog.
+
+    :param cursor: Unbuffered MySQL cursor object
+    :param table_name: Name of the table to retrieve data from
+    :param batch_size: Rows fetched per round trip
+    :return: Iterator over the table rows
+    :rtype: Iterator[tuple]
+    """
+    cursor.execute(SelectAllQuery(cursor, table_name))
+    return _iter_batches(cursor, batch_size)
+
+def SelectAllQuery(cursor, table_name) -> str:
+    """
+    Build SELECT * for a table, with the name checked against the schema
+    catalog and quoted.
+
+    :param cursor: MySQL cursor object, only used to rebuild the catalog
+    :param table_name: Table or view name
+    :return: SQL text
+    :rtype: str
+    :raises ValueError: if the table does not exist
+    """
+    try:
+        return TABLE_QUERIES.sql("select_all", {"table": table_name}, GetCatalog(cursor))
+    except ValueError:
+        # The table may be newer than the cached catalog; check the server
+        catalog = get_catalog(cursor, GetDatabaseSecrets()["DATABASE"], refresh=True)
+        return TABLE_QUERIES.sql("select_all", {"table": table_name}, catalog)
+
+def _iter_batches(cursor, batch_size: int) -> Iterator[tuple]:
+    """
+    Yield rows from an executed cursor using fetchmany.
+    If the caller stops early, the rest of the result is read and thrown
+    away so the connection can run its next query.
+    """
+    done = False
+    try:
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                done = True
+                return
+            yield from batch
+    finally:
+        if not done:
+            while cursor.fetchmany(batch_size):
+                pass
+
 def GetTables(cursor) -> list[str]:
     """
-    Retrieve a list of all table names in the 'outland_adventures' database.
+    Retrieve a list of all table and view names in the database from .env.
+    Names come from the schema catalog cache, so no query is run while
+    the cache file is valid.
     
-    :param cursor: MySQL cursor object
+    :param cursor: MySQL cursor object, only used to rebuild the cache
     :return: List of table names
     :rtype: list[str]
     """
-    cursor.execute("SHOW TABLES FROM outland_adventures;")
-    tables = [row[0] for row in cursor.fetchall()]
-    return tables
+    return GetCatalog(cursor).tables()
 
-def GetDatabaseConnection() -> MySQLConnection | None :
+def GetCatalog(cursor) -> SchemaCatalog:
     """
-    Get a connection to the MySQL database.
-    
-    :return: MySQLConnection object or None if connection fails
-    :rtype: MySQLConnection | None
+    Get the schema catalog (tables, columns, keys, indexes) for the
+    database from .env.
+
+    :param cursor: MySQL cursor object, only used to rebuild the cache
+    :return: Schema catalog
+    :rtype: SchemaCatalog
+    """
+    return get_catalog(cursor, GetDatabaseSecrets()["DATABASE"])
+
+def GetDatabaseSecrets() -> dict:
     """
+    Load the values from the .env file.
 
+    :return: Dictionary of .env values
+    :rtype: dict
+    """
     #Was having issues with relative path settings when running locally.
     # Did this to figure out what was wrong
     current_directory = os.getcwd()
     #using our .env file
-    secrets = dotenv_values(current_directory + "\\.env")
+    return dotenv_values(current_directory + "\\.env")
+
+def GetDatabaseConfig(secrets: dict | None = None) -> dict:
+    """
+    Build the mysql.connector config from the .env values.
+
+    :param secrets: Values from GetDatabaseSecrets, loaded if not given
+    :return: Keyword arguments for mysql.connector.connect
+    :rtype: dict
+    """
+    if secrets is None:
+        secrets = GetDatabaseSecrets()
 
     """ database config object """
-    config = {
+    return {
         "user": secrets["USER"],
         "password": secrets["PASSWORD"],
         "host": secrets["HOST"],
@@ -100,13 +217,29 @@ def GetDatabaseConnection() -> MySQLConnection | None :
         "raise_on_warnings": True #not in .env file
     }
 
+def GetDatabaseConnection() -> PooledConnection | None :
+    """
+    Get a connection to the MySQL database.
+    The connection comes from the shared pool, so calling close() on it
+    hands it back for the next caller instead of dropping it.
+    With METRICS set in .env its cursors are timed (see instrumentation.py).
+    
+    :return: Pooled connection object or None if connection fails
+    :rtype: PooledConnection | None
+    """
+    secrets = GetDatabaseSecrets()
+    config = GetDatabaseConfig(secrets)
+
     try:
         """ try/catch block for handling potential MySQL database errors """ 
 
         #db = mysql.connector.connect(**config) # connect to the movies database 
-        db = MySQLConnection(**config)
+        configure(secrets)
+        db = instrument(get_pool(config, **pool_options(secrets)).checkout())
         if db is not None:
             return db
+    except PoolExhaustedError as err:
+        print(f"  {err}")
     except mysql.connector.Error as err:
         """ on error code """
 
@@ -136,9 +269,10 @@ def main():
     # Get list of tables
     tables = GetTables(cursor)
 
-    # Display data from each table
+    # Display data from each table, streaming so big tables
+    # do not have to fit in memory
     for table in tables:
-        display_table(cursor, table)
+        display_table(cursor, table, stream=True)
 
     # Close the cursor and connection
     cursor.close()
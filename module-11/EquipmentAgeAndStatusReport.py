@@ -1,6 +1,24 @@
+import argparse
+import time
+
 import DisplayTableData as TableData
+from result_cache import get_cache
+import report_scheduler
+from report_registry import REGISTRY
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watch", type=float, default=0,
+                        help="refresh the report every N seconds (uses the result cache)")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="show the latest snapshot from report_scheduler.py instead of querying")
+    args = parser.parse_args()
+
+    report = REGISTRY.get("equipment_age_status")
+    if args.snapshot:
+        report_scheduler.show(report, get_connection=TableData.GetDatabaseConnection)
+        return
+
     # Get a database connection
     conn = TableData.GetDatabaseConnection()
     if conn is not None:
@@ -13,7 +31,19 @@ def main():
     cursor = conn.cursor()
 
     # Get Report from view
-    TableData.display_table(cursor, "EquipmentAgeAndInventoryStatus", False)
+    if args.watch <= 0:
+        TableData.display_table(cursor, report.view, report.show_astable)
+    else:
+        # Refreshes are answered from memory until the underlying tables change
+        cache = get_cache()
+        try:
+            while True:
+                TableData.display_table(cursor, report.view, report.show_astable, cache=cache)
+                # End the read transaction so the next refresh sees new data
+                conn.commit()
+                time.sleep(args.watch)
+        except KeyboardInterrupt:
+            print(f"\nCache stats: {cache.stats}")
 
     # Close the cursor and connection
     cursor.close()
@@ -0,0 +1,72 @@
+-- Date-ranged equipment reservations and a view of what is free today.
+-- Run after InitialLoad (1).sql. equipment_availability.py keeps the
+-- in-memory availability index and makes reservations through
+-- EquipmentReservation, locking the Equipment row so two callers cannot
+-- take the same units.
+--
+-- Equipment.AvailableQuantity is treated as the units owned. Purchases
+-- take units away for good from their TransactionDate; a Rental
+-- transaction has no return date, so it holds its units for 7 days
+-- (equipment_availability.RENTAL_DAYS).
+
+USE outland_adventures;
+
+DROP VIEW IF EXISTS EquipmentAvailabilityView;
+DROP TABLE IF EXISTS EquipmentReservation;
+
+-- =========================
+-- Table: EquipmentReservation
+-- Units of one item held from StartDate up to (not including) EndDate
+-- =========================
+CREATE TABLE EquipmentReservation (
+  ReservationID INT AUTO_INCREMENT PRIMARY KEY,
+  EquipmentID INT NOT NULL,
+  AccountID INT,
+  StartDate DATE NOT NULL,
+  EndDate DATE NOT NULL,
+  Quantity INT NOT NULL,
+  CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  KEY idx_reservation_equipment (EquipmentID, ReservationID),
+  FOREIGN KEY (EquipmentID) REFERENCES Equipment(EquipmentID),
+  FOREIGN KEY (AccountID) REFERENCES CustomerAccount(AccountID),
+  CHECK (EndDate > StartDate),
+  CHECK (Quantity > 0)
+);
+
+-- ============================================
+-- View: EquipmentAvailabilityView
+-- Units owned, sold, out on rental or reserved today, and free today,
+-- instead of the static AvailableQuantity
+-- ============================================
+CREATE VIEW EquipmentAvailabilityView AS
+SELECT
+    e.EquipmentID,
+    e.Name,
+    e.Category,
+    e.AvailableQuantity AS UnitsOwned,
+    COALESCE(p.Sold, 0) AS UnitsSold,
+    COALESCE(r.Rented, 0) AS UnitsRented,
+    COALESCE(v.Reserved, 0) AS UnitsReserved,
+    GREATEST(e.AvailableQuantity - COALESCE(p.Sold, 0)
+             - COALESCE(r.Rented, 0) - COALESCE(v.Reserved, 0), 0) AS UnitsFreeToday
+FROM Equipment e
+LEFT JOIN (
+    SELECT EquipmentID, SUM(Quantity) AS Sold
+    FROM EquipmentTransaction
+    WHERE TransactionType = 'Purchase' AND TransactionDate <= CURDATE()
+    GROUP BY EquipmentID
+) p ON e.EquipmentID = p.EquipmentID
+LEFT JOIN (
+    SELECT EquipmentID, SUM(Quantity) AS Rented
+    FROM EquipmentTransaction
+    WHERE TransactionType = 'Rental'
+      AND TransactionDate <= CURDATE()
+      AND TransactionDate > CURDATE() - INTERVAL 7 DAY
+    GROUP BY EquipmentID
+) r ON e.EquipmentID = r.EquipmentID
+LEFT JOIN (
+    SELECT EquipmentID, SUM(Quantity) AS Reserved
+    FROM EquipmentReservation
+    WHERE StartDate <= CURDATE() AND EndDate > CURDATE()
+    GROUP BY EquipmentID
+) v ON e.EquipmentID = v.EquipmentID;
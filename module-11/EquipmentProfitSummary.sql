@@ -0,0 +1,57 @@
+-- Incrementally maintained replacement for EquipmentProfitViewWithRentals.
+-- Run after InitialLoad (1).sql, then fill the summary once with:
+--     python equipment_profit_summary.py rebuild
+-- and keep it current either with
+--     python equipment_profit_summary.py apply      (application-side deltas)
+-- or by installing EquipmentProfitSummaryTriggers.sql (never both).
+
+USE outland_adventures;
+
+DROP VIEW IF EXISTS EquipmentProfitSummaryView;
+DROP TABLE IF EXISTS EquipmentRentalSummary;
+DROP TABLE IF EXISTS SummaryWatermark;
+
+-- =========================
+-- Table: EquipmentRentalSummary
+-- One row per rented piece of equipment. Only the rented quantity is
+-- stored; revenue is derived from the current RentalPrice at read time,
+-- exactly like EquipmentProfitViewWithRentals does.
+-- =========================
+CREATE TABLE EquipmentRentalSummary (
+  EquipmentID INT PRIMARY KEY,
+  TotalRentalCount BIGINT NOT NULL DEFAULT 0,
+  LastTransactionID INT NOT NULL DEFAULT 0   -- newest transaction folded in
+);
+
+-- =========================
+-- Table: SummaryWatermark
+-- Highest EquipmentTransaction.TransactionID already applied to a summary
+-- =========================
+CREATE TABLE SummaryWatermark (
+  SummaryName VARCHAR(64) PRIMARY KEY,
+  LastTransactionID INT NOT NULL DEFAULT 0,
+  UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO SummaryWatermark (SummaryName, LastTransactionID)
+VALUES ('EquipmentRentalSummary', 0);
+
+-- ============================================
+-- View: EquipmentProfitSummaryView
+-- Same columns as EquipmentProfitViewWithRentals, but reads one summary
+-- row per item instead of grouping all of EquipmentTransaction
+-- ============================================
+CREATE VIEW EquipmentProfitSummaryView AS
+SELECT
+    e.EquipmentID,
+    e.Name,
+    e.Category,
+    e.InitialCost,
+    e.SalePrice,
+    e.RentalPrice,
+    (e.SalePrice - e.InitialCost) AS SaleProfit,
+    ROUND((e.RentalPrice / e.InitialCost) * 100, 2) AS RentalROI_Percent,
+    COALESCE(s.TotalRentalCount, 0) * e.RentalPrice AS TotalRentalRevenue,
+    COALESCE(s.TotalRentalCount, 0) AS TotalRentalCount
+FROM Equipment e
+LEFT JOIN EquipmentRentalSummary s ON e.EquipmentID = s.EquipmentID;
@@ -0,0 +1,58 @@
+-- Optional: keep EquipmentRentalSummary current with triggers instead of
+-- running equipment_profit_summary.py apply. Each write to
+-- EquipmentTransaction adjusts one summary row, so the cost per change is
+-- constant. Unlike the delta applier, UPDATEs and DELETEs are handled too.
+-- Requires EquipmentProfitSummary.sql first.
+
+USE outland_adventures;
+
+DROP TRIGGER IF EXISTS EquipmentTransaction_SummaryInsert;
+DROP TRIGGER IF EXISTS EquipmentTransaction_SummaryUpdate;
+DROP TRIGGER IF EXISTS EquipmentTransaction_SummaryDelete;
+
+DELIMITER $$
+
+CREATE TRIGGER EquipmentTransaction_SummaryInsert
+AFTER INSERT ON EquipmentTransaction
+FOR EACH ROW
+BEGIN
+  IF NEW.TransactionType = 'Rental' AND NEW.EquipmentID IS NOT NULL AND NEW.Quantity IS NOT NULL THEN
+    INSERT INTO EquipmentRentalSummary (EquipmentID, TotalRentalCount, LastTransactionID)
+    VALUES (NEW.EquipmentID, NEW.Quantity, NEW.TransactionID)
+    ON DUPLICATE KEY UPDATE
+      TotalRentalCount = TotalRentalCount + NEW.Quantity,
+      LastTransactionID = GREATEST(LastTransactionID, NEW.TransactionID);
+  END IF;
+END$$
+
+CREATE TRIGGER EquipmentTransaction_SummaryUpdate
+AFTER UPDATE ON EquipmentTransaction
+FOR EACH ROW
+BEGIN
+  -- Take the old row out, then put the new one in
+  IF OLD.TransactionType = 'Rental' AND OLD.EquipmentID IS NOT NULL AND OLD.Quantity IS NOT NULL THEN
+    UPDATE EquipmentRentalSummary
+    SET TotalRentalCount = TotalRentalCount - OLD.Quantity
+    WHERE EquipmentID = OLD.EquipmentID;
+  END IF;
+  IF NEW.TransactionType = 'Rental' AND NEW.EquipmentID IS NOT NULL AND NEW.Quantity IS NOT NULL THEN
+    INSERT INTO EquipmentRentalSummary (EquipmentID, TotalRentalCount, LastTransactionID)
+    VALUES (NEW.EquipmentID, NEW.Quantity, NEW.TransactionID)
+    ON DUPLICATE KEY UPDATE
+      TotalRentalCount = TotalRentalCount + NEW.Quantity,
+      LastTransactionID = GREATEST(LastTransactionID, NEW.TransactionID);
+  END IF;
+END$$
+
+CREATE TRIGGER EquipmentTransaction_SummaryDelete
+AFTER DELETE ON EquipmentTransaction
+FOR EACH ROW
+BEGIN
+  IF OLD.TransactionType = 'Rental' AND OLD.EquipmentID IS NOT NULL AND OLD.Quantity IS NOT NULL THEN
+    UPDATE EquipmentRentalSummary
+    SET TotalRentalCount = TotalRentalCount - OLD.Quantity
+    WHERE EquipmentID = OLD.EquipmentID;
+  END IF;
+END$$
+
+DELIMITER ;
@@ -8,9 +8,23 @@ USE outland_adventures;
 -- Drop all views first (to avoid dependency errors)
 DROP VIEW IF EXISTS EquipmentProfitViewWithRentals;
 DROP VIEW IF EXISTS EquipmentAgeAndInventoryStatus;
+DROP VIEW IF EXISTS RegionBookingParticipantsReport;
+DROP VIEW IF EXISTS EquipmentAvailabilityView;
+DROP VIEW IF EXISTS EquipmentTransactionTotals;
+DROP VIEW IF EXISTS EquipmentProfitSummaryView;  -- from EquipmentProfitSummary.sql
 
 -- Drop all tables (reverse dependency order)
 DROP TABLE IF EXISTS Waiver;
+DROP TABLE IF EXISTS EquipmentTransactionDaily;
+DROP TABLE IF EXISTS EquipmentTransactionMonthly;
+DROP TABLE IF EXISTS RollupWatermark;
+DROP TABLE IF EXISTS EquipmentReservation;  -- from EquipmentAvailability.sql
+-- From EquipmentProfitSummary.sql: a reload restarts TransactionIDs at 1,
+-- so the summary and its watermark must go too (rerun that file, and
+-- EquipmentProfitSummaryTriggers.sql if used: the triggers are dropped
+-- with EquipmentTransaction)
+DROP TABLE IF EXISTS EquipmentRentalSummary;
+DROP TABLE IF EXISTS SummaryWatermark;
 DROP TABLE IF EXISTS EquipmentTransaction;
 DROP TABLE IF EXISTS Booking;
 DROP TABLE IF EXISTS TwoFactorMethod;
@@ -221,6 +235,85 @@ VALUES
 (3,2,'Rental','2025-02-09',2,9),
 (4,1,'Purchase','2025-02-11',1,10);
 
+-- =========================
+-- Rollups of EquipmentTransaction
+-- Quantity and transaction count per day (and per month) for each item
+-- and TransactionType, filled below from the sample transactions and
+-- kept current by transaction_rollups.apply_deltas (the reports and
+-- report_scheduler.py run it before they query, or run
+--     python transaction_rollups.py apply)
+-- Both tables hold every transaction up to RollupWatermark; newer ones
+-- are the live tail. Transactions without a date are kept under
+-- 1000-01-01 so totals still count them.
+-- =========================
+CREATE TABLE EquipmentTransactionDaily (
+  RollupDate DATE NOT NULL,
+  EquipmentID INT NOT NULL,
+  TransactionType VARCHAR(20) NOT NULL,
+  Quantity BIGINT NOT NULL DEFAULT 0,
+  Transactions INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (RollupDate, EquipmentID, TransactionType)
+);
+
+CREATE TABLE EquipmentTransactionMonthly (
+  RollupMonth DATE NOT NULL,  -- first day of the month
+  EquipmentID INT NOT NULL,
+  TransactionType VARCHAR(20) NOT NULL,
+  Quantity BIGINT NOT NULL DEFAULT 0,
+  Transactions INT NOT NULL DEFAULT 0,
+  PRIMARY KEY (RollupMonth, EquipmentID, TransactionType)
+);
+
+-- Highest TransactionID already in the rollups
+CREATE TABLE RollupWatermark (
+  RollupName VARCHAR(64) PRIMARY KEY,
+  LastTransactionID INT NOT NULL DEFAULT 0,
+  UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+-- Roll up the sample transactions, so the live tail starts out empty
+INSERT INTO EquipmentTransactionDaily (RollupDate, EquipmentID, TransactionType, Quantity, Transactions)
+SELECT COALESCE(TransactionDate, '1000-01-01'), EquipmentID, TransactionType,
+       COALESCE(SUM(Quantity), 0), COUNT(*)
+FROM EquipmentTransaction
+WHERE EquipmentID IS NOT NULL AND TransactionType IS NOT NULL
+GROUP BY 1, EquipmentID, TransactionType;
+
+INSERT INTO EquipmentTransactionMonthly (RollupMonth, EquipmentID, TransactionType, Quantity, Transactions)
+SELECT COALESCE(DATE_SUB(TransactionDate, INTERVAL DAYOFMONTH(TransactionDate) - 1 DAY), '1000-01-01'),
+       EquipmentID, TransactionType, COALESCE(SUM(Quantity), 0), COUNT(*)
+FROM EquipmentTransaction
+WHERE EquipmentID IS NOT NULL AND TransactionType IS NOT NULL
+GROUP BY 1, EquipmentID, TransactionType;
+
+INSERT INTO RollupWatermark (RollupName, LastTransactionID)
+SELECT 'EquipmentTransaction', COALESCE(MAX(TransactionID), 0) FROM EquipmentTransaction;
+
+-- ============================================
+-- View: EquipmentTransactionTotals
+-- All-time quantity per item and TransactionType: the monthly rollup
+-- plus the live tail past the watermark (a primary key range scan), so
+-- the cost does not grow with the years of history
+-- ============================================
+CREATE VIEW EquipmentTransactionTotals AS
+SELECT
+    EquipmentID,
+    TransactionType,
+    SUM(Quantity) AS Quantity,
+    SUM(Transactions) AS Transactions
+FROM (
+    SELECT EquipmentID, TransactionType, Quantity, Transactions
+    FROM EquipmentTransactionMonthly
+    UNION ALL
+    SELECT EquipmentID, TransactionType, Quantity, 1
+    FROM EquipmentTransaction
+    WHERE TransactionID > (SELECT LastTransactionID FROM RollupWatermark
+                           WHERE RollupName = 'EquipmentTransaction')
+      AND EquipmentID IS NOT NULL
+      AND TransactionType IS NOT NULL
+) AS history
+GROUP BY EquipmentID, TransactionType;
+
 -- =========================
 -- Table: TwoFactorMethod
 -- =========================
@@ -281,6 +374,7 @@ GRANT SELECT, INSERT, UPDATE, DELETE ON outland_adventures.* TO 'jim.ford@outlan
 
 -- View: EquipmentProfitViewWithRentals
 -- Combines equipment financials with actual rental revenue from transactions
+-- (read through EquipmentTransactionTotals, not the full history)
 CREATE VIEW EquipmentProfitViewWithRentals AS
 SELECT
     e.EquipmentID,
@@ -296,7 +390,7 @@ SELECT
     COALESCE(SUM(CASE WHEN t.TransactionType = 'Rental' 
                       THEN t.Quantity ELSE 0 END),0) AS TotalRentalCount
 FROM Equipment e
-LEFT JOIN EquipmentTransaction t ON e.EquipmentID = t.EquipmentID
+LEFT JOIN EquipmentTransactionTotals t ON e.EquipmentID = t.EquipmentID
 GROUP BY e.EquipmentID, e.Name, e.Category, e.InitialCost, e.SalePrice, e.RentalPrice;
 
 -- ============================================
@@ -317,4 +411,23 @@ SELECT
         ELSE 'Under 5 Years Old'
     END AS AgeStatus
 FROM
-    Equipment;
\ No newline at end of file
+    Equipment;
+
+-- ============================================
+-- View: RegionBookingParticipantsReport
+-- Bookings, participants and revenue per region, destination, booking
+-- status and trip start month (the grain of booking_cube.py)
+-- ============================================
+CREATE VIEW RegionBookingParticipantsReport AS
+SELECT
+    t.Region,
+    t.Destination,
+    b.Status,
+    DATE_FORMAT(t.StartDate, '%Y-%m') AS TripMonth,
+    COUNT(*) AS Bookings,
+    COALESCE(SUM(b.NumberOfParticipants), 0) AS TotalParticipants,
+    COALESCE(SUM(b.NumberOfParticipants * t.Price), 0) AS TotalRevenue
+FROM Trip t
+JOIN Booking b ON t.TripID = b.TripID
+GROUP BY t.Region, t.Destination, b.Status, DATE_FORMAT(t.StartDate, '%Y-%m')
+ORDER BY t.Region, TripMonth, t.Destination, b.Status;
\ No newline at end of file
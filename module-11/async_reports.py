@@ -0,0 +1,232 @@
+"""
+async_reports.py
+Asyncio versions of the report layer, on the aiomysql driver and its
+connection pool.
+
+Every report is a coroutine, so one process can have many reports (for
+many tenants or requests) waiting on the database at once without a
+thread per report:
+    display_table       - like DisplayTableData.display_table
+    run_report          - one query into a report_runner.ReportResult
+    run_reports         - several reports at once with asyncio.gather
+    print_reports       - the four reports of connect_and_print_reports
+
+Query results are printed with the same code as the synchronous scripts
+(outland_adventures.print_table, table_renderer), so the output is the
+same. Printing itself stays synchronous; it is CPU work, not waiting.
+
+Connections are read-only and use autocommit, so each query sees the
+latest committed data and no transaction is left open in the pool.
+
+Requires aiomysql (pip install aiomysql).
+
+Usage:
+    async def main():
+        pool = await create_pool()
+        try:
+            await print_reports(pool)
+        finally:
+            pool.close()
+            await pool.wait_closed()
+
+    python async_reports.py [--table Trip]
+"""
+
+import argparse
+import asyncio
+import time
+
+try:
+    import aiomysql
+except ImportError:  # aiomysql is optional, only this module needs it
+    aiomysql = None
+
+import DisplayTableData as TableData
+import outland_adventures
+from column_formatters import TableFormatter
+from connection_pool import DEFAULT_POOL_SIZE
+from pagination import limit_query
+from report_runner import ReportResult, print_timings
+from table_renderer import StreamingTable
+
+
+async def create_pool(secrets=None, minsize=1, maxsize=None):
+    """
+    Open an aiomysql pool for the database in .env.
+
+    :param secrets: Values from GetDatabaseSecrets, loaded if not given
+    :param minsize: Connections opened up front
+    :param maxsize: Most connections at once; POOL_SIZE from .env or the
+        synchronous pool's default
+    :return: aiomysql.Pool
+    """
+    if aiomysql is None:
+        raise RuntimeError("async_reports needs aiomysql: pip install aiomysql")
+    if secrets is None:
+        secrets = TableData.GetDatabaseSecrets()
+    config = TableData.GetDatabaseConfig(secrets)
+    if maxsize is None:
+        maxsize = int(secrets.get("POOL_SIZE") or DEFAULT_POOL_SIZE)
+
+    return await aiomysql.create_pool(
+        host=config["host"],
+        user=config["user"],
+        password=config["password"],
+        db=config["database"],
+        minsize=minsize,
+        maxsize=maxsize,
+        autocommit=True,
+    )
+
+
+async def fetch(pool, query, params=None, dictionary=False) -> tuple[list, list, list]:
+    """
+    Run a query on a pooled connection.
+
+    :return: (column names, rows, type codes)
+    :rtype: tuple[list, list, list]
+    """
+    cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+    async with pool.acquire() as conn:
+        async with conn.cursor(cursor_class) as cursor:
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+            description = cursor.description or ()
+    return [d[0] for d in description], list(rows), [d[1] for d in description]
+
+
+async def display_table(pool, table_name, show_astable: bool = True,
+                        stream: bool = False, batch_size: int = 1000) -> None:
+    """
+    Display all data from a table, like DisplayTableData.display_table.
+
+    :param pool: aiomysql pool
+    :param table_name: Table or view to display
+    :param show_astable: Print rows as a table instead of name: value pairs
+    :param stream: Fetch and print batch_size rows at a time (server-side
+        cursor), so memory does not grow with the table
+    :param batch_size: Rows fetched per round trip when streaming
+    """
+    # No catalog here (it is read through a synchronous cursor), so the
+    # name is only checked for shape and quoted
+    query = TableData.TABLE_QUERIES.sql("select_all", {"table": table_name})
+
+    if stream and show_astable:
+        print(f"\n--- {table_name} table ---")
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.SSCursor) as cursor:
+                await cursor.execute(query)
+                columns = [d[0] for d in cursor.description]
+                # Lossless like the non-streaming path: str() and no cut cells
+                with StreamingTable(columns, formatter=TableFormatter.plain(columns),
+                                    max_width=None) as table:
+                    while True:
+                        rows = await cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        table.write(rows)
+        return
+
+    columns, rows, _ = await fetch(pool, query)
+    print(f"\n--- {table_name} table ---")
+    if show_astable:
+        print(" | ".join(columns))
+        print("-" * 50)
+        for row in rows:
+            print(" | ".join(str(item) if item is not None else "" for item in row))
+    else:
+        for row in rows:
+            for column_name, value in zip(columns, row):
+                print(f"{column_name}: {value}")
+            print("-" * 20)
+
+
+async def run_report(pool, title, query, dictionary=True) -> ReportResult:
+    """
+    Run one report query. Errors are stored on the result instead of
+    raised, as report_runner.run_report does.
+    """
+    result = ReportResult(title=title, query=query)
+    try:
+        start = time.perf_counter()
+        async with pool.acquire() as conn:
+            result.checkout_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+            async with conn.cursor(cursor_class) as cursor:
+                await cursor.execute(query)
+                result.rows = list(await cursor.fetchall())
+                result.columns = [d[0] for d in cursor.description]
+                result.types = [d[1] for d in cursor.description]
+            result.query_seconds = time.perf_counter() - start
+    except Exception as e:
+        result.error = e
+    return result
+
+
+async def run_reports(pool, reports, dictionary=True) -> list[ReportResult]:
+    """
+    Run several report queries concurrently.
+
+    :param pool: aiomysql pool; at most pool.maxsize queries run at once
+    :param reports: List of (title, query) pairs
+    :return: One result per report, in the same order as reports
+    :rtype: list[ReportResult]
+    """
+    return list(await asyncio.gather(
+        *(run_report(pool, title, query, dictionary) for title, query in reports)
+    ))
+
+
+def report_queries() -> list[tuple]:
+    """(title, query) for the reports of connect_and_print_reports, with
+    the same row limits pushed into the SQL."""
+    return [(report.title, limit_query(report.sql, report.max_rows + 1))
+            for report in outland_adventures.REPORTS]
+
+
+async def print_reports(pool, show_timings=True) -> list[ReportResult]:
+    """Async connect_and_print_reports: the same reports and output."""
+    start = time.perf_counter()
+    results = await run_reports(pool, report_queries())
+    wall_seconds = time.perf_counter() - start
+
+    for report, result in zip(outland_adventures.REPORTS, results):
+        if result.error is not None:
+            raise result.error
+        type_by_name = dict(zip(result.columns, result.types or ()))
+        outland_adventures.print_table(
+            title=report.title,
+            rows=result.rows,
+            columns=report.columns,
+            max_rows=report.max_rows,
+            types=[type_by_name.get(col) for col in report.columns],
+            limited=True
+        )
+
+    if show_timings:
+        print_timings(results, wall_seconds)
+    return results
+
+
+async def _main(args):
+    pool = await create_pool()
+    try:
+        if args.table:
+            await display_table(pool, args.table, stream=args.stream)
+        else:
+            await print_reports(pool)
+    finally:
+        pool.close()
+        await pool.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the reports with asyncio")
+    parser.add_argument("--table", help="display one table instead of the reports")
+    parser.add_argument("--stream", action="store_true", help="stream --table in batches")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+benchmark_async.py
+Compares report throughput of the three ways to run the reports:
+    sequential - one connection, one report after another
+    threaded   - report_runner.run_report on a thread pool and the
+                 shared connection pool (what connect_and_print_reports does)
+    asyncio    - async_reports.run_report gathered on an aiomysql pool
+
+Each path runs --requests copies of the four connect_and_print_reports
+queries (so 4 * requests reports) with at most --concurrency in flight,
+and the same number of connections. Prints reports/sec and per-report
+latency percentiles.
+
+Usage:
+    python benchmark_async.py [--requests 50] [--concurrency 10] [--rounds 3]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import DisplayTableData as TableData
+import async_reports
+from benchmark_pool import percentile
+from connection_pool import ConnectionPool
+from report_runner import run_report
+
+
+def run_sequential(config, jobs) -> list[float]:
+    pool = ConnectionPool(config, pool_size=1)
+    latencies = []
+    try:
+        for title, query in jobs:
+            result = run_report(pool.checkout, title, query)
+            if result.error is not None:
+                raise result.error
+            latencies.append(result.checkout_seconds + result.query_seconds)
+    finally:
+        pool.closeall()
+    return latencies
+
+
+def run_threaded(config, jobs, concurrency) -> list[float]:
+    pool = ConnectionPool(config, pool_size=concurrency)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda job: run_report(pool.checkout, *job), jobs))
+    finally:
+        pool.closeall()
+    for result in results:
+        if result.error is not None:
+            raise result.error
+    return [r.checkout_seconds + r.query_seconds for r in results]
+
+
+async def _run_async(jobs, concurrency) -> list[float]:
+    pool = await async_reports.create_pool(minsize=concurrency, maxsize=concurrency)
+    # Queue reports before they start, like the thread pool does, so
+    # checkout time does not include the wait for a free slot
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(title, query):
+        async with slots:
+            return await async_reports.run_report(pool, title, query)
+
+    try:
+        results = await asyncio.gather(*(one(title, query) for title, query in jobs))
+    finally:
+        pool.close()
+        await pool.wait_closed()
+    for result in results:
+        if result.error is not None:
+            raise result.error
+    return [r.checkout_seconds + r.query_seconds for r in results]
+
+
+def run_async(config, jobs, concurrency) -> list[float]:
+    return asyncio.run(_run_async(jobs, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential vs threaded vs asyncio reports")
+    parser.add_argument("--requests", type=int, default=50,
+                        help="copies of the four reports to run")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    config = TableData.GetDatabaseConfig()
+    jobs = async_reports.report_queries() * args.requests
+
+    paths = {
+        "sequential": lambda: run_sequential(config, jobs),
+        "threaded": lambda: run_threaded(config, jobs, args.concurrency),
+        "asyncio": lambda: run_async(config, jobs, args.concurrency),
+    }
+
+    print(f"{len(jobs):,} reports per round, concurrency {args.concurrency}, "
+          f"{args.rounds} rounds")
+    print(f"{'Path':<12} {'Reports/s':>10} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for name, run in paths.items():
+        walls = []
+        latencies = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            latencies += run()
+            walls.append(time.perf_counter() - start)
+        rate = len(jobs) / statistics.median(walls)
+        print(f"{name:<12} {rate:>10.1f} "
+              + " ".join(f"{percentile(latencies, p) * 1000:>9.2f}" for p in (50, 95, 99)))
+
+
+if __name__ == "__main__":
+    main()
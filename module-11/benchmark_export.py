@@ -0,0 +1,84 @@
+"""
+benchmark_export.py
+Compares the export formats with the current text path (display_table
+output written to a file) for one table or view.
+
+For each path it prints rows/sec, MB/sec and output size. Parquet and
+Arrow are skipped when pyarrow is not installed.
+
+Usage:
+    python benchmark_export.py EquipmentTransaction --repeat 3
+"""
+
+import argparse
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+
+import DisplayTableData as TableData
+import export_data
+
+
+def time_text_path(conn, table_name, path) -> dict:
+    """The current way: display_table printing every row as text."""
+    cursor = conn.cursor()
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as out, contextlib.redirect_stdout(out):
+        TableData.display_table(cursor, table_name, True, stream=True)
+    seconds = time.perf_counter() - start
+    cursor.close()
+    return {"seconds": seconds, "bytes": os.path.getsize(path)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export formats against the text path")
+    parser.add_argument("table")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    paths = ["text", "csv", "ndjson"]
+    if export_data.pa is not None:
+        paths += ["parquet", "arrow"]
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {args.table}")
+    row_count = cursor.fetchone()[0]
+    cursor.close()
+
+    print(f"\nTable: {args.table}  ({row_count:,} rows, best of {args.repeat})")
+    print(f"{'Path':<10} {'Seconds':>10} {'Rows/s':>14} {'MB/s':>10} {'Size (MB)':>10}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name in paths:
+            path = os.path.join(folder, f"out.{name}")
+            runs = []
+            for _ in range(args.repeat):
+                if name == "text":
+                    result = time_text_path(conn, args.table, path)
+                else:
+                    result = export_data.export_table(conn, args.table, path, name, args.batch_size)
+                runs.append(result)
+                # Fresh read snapshot for the next run
+                conn.commit()
+
+            best = min(r["seconds"] for r in runs)
+            size_mb = runs[-1]["bytes"] / 1024 / 1024
+            print(f"{name:<10} {best:>10.3f} {row_count / best:>14,.0f} "
+                  f"{size_mb / best:>10.1f} {size_mb:>10.1f}")
+            if args.repeat > 1:
+                spread = statistics.pstdev(r["seconds"] for r in runs)
+                print(f"{'':<10} (stdev {spread:.3f}s)")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+benchmark_instrumentation.py
+Measures what instrumentation.py costs: the same workload runs on a
+plain connection and on an instrumented one, alternating round by round
+so both see the same server state, and the difference is reported
+against the 2% budget.
+
+Workload per round:
+    - every report query in outland_adventures.REPORTS, all rows fetched
+    - SELECT * from every table and view
+    - --lookups single-row primary key lookups on Booking, the worst
+      case, since per-statement overhead matters most on tiny queries
+
+Usage:
+    python benchmark_instrumentation.py [--rounds 9] [--lookups 500]
+"""
+
+import argparse
+import statistics
+import time
+
+import DisplayTableData as TableData
+import outland_adventures
+from instrumentation import Metrics, instrument
+
+
+BUDGET_PERCENT = 2.0
+
+
+def workload(conn, tables, lookup_ids) -> int:
+    """Run the workload once. Returns the number of statements."""
+    statements = 0
+    cursor = conn.cursor()
+    for report in outland_adventures.REPORTS:
+        cursor.execute(report.sql)
+        cursor.fetchall()
+        statements += 1
+    for table in tables:
+        cursor.execute(f"SELECT * FROM `{table}`")
+        cursor.fetchall()
+        statements += 1
+    for booking_id in lookup_ids:
+        cursor.execute("SELECT * FROM Booking WHERE BookingID = %s", (booking_id,))
+        cursor.fetchall()
+        statements += 1
+    cursor.close()
+    return statements
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the query instrumentation")
+    parser.add_argument("--rounds", type=int, default=9)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+    # Measure against the bare connection even if METRICS is set
+    conn = getattr(conn, "_conn", conn)
+
+    try:
+        cursor = conn.cursor()
+        tables = TableData.GetTables(cursor)
+        cursor.execute("SELECT BookingID FROM Booking ORDER BY BookingID LIMIT %s",
+                       (args.lookups,))
+        lookup_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+
+        metrics = Metrics()
+        instrumented = instrument(conn, metrics)
+
+        # Warm up the server caches before timing
+        statements = workload(conn, tables, lookup_ids)
+
+        plain, timed = [], []
+        for _ in range(args.rounds):
+            for target, timings in ((conn, plain), (instrumented, timed)):
+                start = time.perf_counter()
+                workload(target, tables, lookup_ids)
+                timings.append(time.perf_counter() - start)
+                conn.commit()
+    finally:
+        conn.close()
+
+    base = statistics.median(plain)
+    with_metrics = statistics.median(timed)
+    overhead = (with_metrics - base) / base * 100
+    per_statement = (with_metrics - base) / statements * 1e6
+
+    print(f"\n{statements:,} statements per round, {args.rounds} rounds")
+    print(f"{'Connection':<14} {'Median (s)':>11} {'Min (s)':>9}")
+    print(f"{'plain':<14} {base:>11.4f} {min(plain):>9.4f}")
+    print(f"{'instrumented':<14} {with_metrics:>11.4f} {min(timed):>9.4f}")
+    print(f"\nOverhead: {overhead:+.2f}% ({per_statement:+.1f} us per statement); "
+          f"budget {BUDGET_PERCENT}% -> {'OK' if overhead <= BUDGET_PERCENT else 'OVER BUDGET'}")
+
+    series = sum(1 for _ in metrics.snapshot())
+    print(f"Recorded {series} metric series")
+
+
+if __name__ == "__main__":
+    main()
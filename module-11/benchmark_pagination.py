@@ -0,0 +1,92 @@
+"""
+benchmark_pagination.py
+Times fetching one page at increasing depths with keyset pagination and
+with LIMIT ... OFFSET. Keyset time should stay flat; OFFSET time grows
+with the depth because the server reads every skipped row.
+
+Point it at a big table, e.g. after filling the schema with generated data:
+    python benchmark_pagination.py EquipmentTransaction --page-size 50
+"""
+
+import argparse
+import statistics
+import time
+
+import DisplayTableData as TableData
+from pagination import KeysetPaginator, quote_identifier
+
+
+def time_offset(cursor, table_name, key, page_size, offset, repeat) -> float:
+    key_sql = ", ".join(quote_identifier(k) for k in key)
+    query = (f"SELECT * FROM {quote_identifier(table_name)} ORDER BY {key_sql} "
+             f"LIMIT {page_size} OFFSET {offset}")
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query)
+        cursor.fetchall()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def time_keyset(cursor, pager, token, repeat) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pager.page(cursor, token)
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyset vs OFFSET page fetch latency")
+    parser.add_argument("table")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--key", nargs="+", help="unique key column(s), for views")
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+    cursor = conn.cursor()
+
+    pager = KeysetPaginator(args.table, key=args.key, page_size=args.page_size)
+    pager.page(cursor)  # resolves the key
+    key = pager.key
+    key_sql = ", ".join(quote_identifier(k) for k in key)
+
+    cursor.execute(f"SELECT COUNT(*) FROM {quote_identifier(args.table)}")
+    total = cursor.fetchone()[0]
+
+    # Pages 1, 10, 100, ... up to the last page
+    depths = []
+    depth = 1
+    while (depth - 1) * args.page_size < total:
+        depths.append(depth)
+        depth *= 10
+
+    print(f"\nTable: {args.table}  ({total:,} rows, page size {args.page_size}, "
+          f"median of {args.repeat})")
+    print(f"{'Page':>10} {'Keyset (ms)':>12} {'OFFSET (ms)':>12}")
+
+    for depth in depths:
+        offset = (depth - 1) * args.page_size
+        token = None
+        if offset > 0:
+            # Key of the row just before the page; setup, not timed
+            cursor.execute(f"SELECT {key_sql} FROM {quote_identifier(args.table)} "
+                           f"ORDER BY {key_sql} LIMIT 1 OFFSET {offset - 1}")
+            token = pager.cursor_after(list(cursor.fetchone()))
+
+        keyset = time_keyset(cursor, pager, token, args.repeat)
+        offset_time = time_offset(cursor, args.table, key, args.page_size, offset, args.repeat)
+        print(f"{depth:>10,} {keyset * 1000:>12.2f} {offset_time * 1000:>12.2f}")
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
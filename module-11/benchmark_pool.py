@@ -0,0 +1,151 @@
+"""
+benchmark_pool.py
+Compares opening a new MySQL connection per report request against
+checking one out of the shared connection pool.
+
+Runs N concurrent "report requests" (default 50) against the database in
+.env. Each request gets a connection, runs a report query, reads the rows
+and gives the connection back. For both strategies it prints the number of
+TCP/auth handshakes, connection acquire latency (p50/p95/p99/max) and
+total wall time.
+
+Usage:
+    python benchmark_pool.py [--requests 50] [--pool-size 10] [--rounds 3]
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+from dotenv import dotenv_values
+
+from connection_pool import ConnectionPool
+
+
+REPORT_QUERY = "SELECT * FROM EquipmentProfitViewWithRentals"
+
+
+def load_config() -> dict:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    secrets = dotenv_values(os.path.join(script_dir, ".env"))
+    return {
+        "host": secrets["HOST"],
+        "user": secrets["USER"],
+        "password": secrets["PASSWORD"],
+        "database": secrets["DATABASE"]
+    }
+
+
+def percentile(values, pct) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_report(conn) -> int:
+    cursor = conn.cursor()
+    cursor.execute(REPORT_QUERY)
+    rows = cursor.fetchall()
+    cursor.close()
+    return len(rows)
+
+
+def bench_direct(config, requests, rounds) -> dict:
+    """Every request opens and closes its own connection (the old behaviour)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def one_request(_):
+        start = time.perf_counter()
+        conn = mysql.connector.connect(**config)
+        acquired = time.perf_counter() - start
+        try:
+            run_report(conn)
+        finally:
+            conn.close()
+        with lock:
+            latencies.append(acquired)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with ThreadPoolExecutor(max_workers=requests) as executor:
+            list(executor.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "handshakes": requests * rounds,
+        "latencies": latencies,
+        "elapsed": elapsed
+    }
+
+
+def bench_pooled(config, requests, rounds, pool_size) -> dict:
+    """Every request checks a connection out of one shared pool."""
+    pool = ConnectionPool(config, pool_size=pool_size, checkout_timeout=120)
+    latencies = []
+    lock = threading.Lock()
+
+    def one_request(_):
+        with pool.connection() as conn:
+            run_report(conn)
+            with lock:
+                latencies.append(conn.checkout_seconds)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        with ThreadPoolExecutor(max_workers=requests) as executor:
+            list(executor.map(one_request, range(requests)))
+    elapsed = time.perf_counter() - start
+    pool.closeall()
+
+    return {
+        "handshakes": pool.stats["connects"],
+        "latencies": latencies,
+        "elapsed": elapsed
+    }
+
+
+def print_result(label, result, total_requests) -> None:
+    lat_ms = [v * 1000 for v in result["latencies"]]
+    print(f"\n{label}")
+    print("-" * len(label))
+    print(f"Requests:          {total_requests}")
+    print(f"Handshakes:        {result['handshakes']}")
+    print(f"Acquire p50 (ms):  {percentile(lat_ms, 50):.2f}")
+    print(f"Acquire p95 (ms):  {percentile(lat_ms, 95):.2f}")
+    print(f"Acquire p99 (ms):  {percentile(lat_ms, 99):.2f}")
+    print(f"Acquire max (ms):  {max(lat_ms):.2f}")
+    print(f"Acquire mean (ms): {statistics.mean(lat_ms):.2f}")
+    print(f"Wall time (s):     {result['elapsed']:.3f}")
+    print(f"Requests/sec:      {total_requests / result['elapsed']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[2])
+    parser.add_argument("--requests", type=int, default=50,
+                        help="concurrent report requests per round")
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    config = load_config()
+    total = args.requests * args.rounds
+
+    direct = bench_direct(config, args.requests, args.rounds)
+    pooled = bench_pooled(config, args.requests, args.rounds, args.pool_size)
+
+    print_result("New connection per request", direct, total)
+    print_result(f"Shared pool (size {args.pool_size})", pooled, total)
+
+    saved = direct["handshakes"] - pooled["handshakes"]
+    print(f"\nHandshakes saved by the pool: {saved} of {direct['handshakes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+benchmark_prepared.py
+Measures what the prepared statements in query_registry.py save on a
+repeated report refresh: the four connect_and_print_reports queries run
+--refreshes times on one connection, once as SQL text on a plain cursor
+and once through the registry's prepared cursors, alternating round by
+round so both see the same server state.
+
+Besides the timings, the server's own statement counters (SHOW SESSION
+STATUS) are printed per path, which shows that the prepared path parses
+each statement once (Com_stmt_prepare) and afterwards only executes it.
+
+Usage:
+    python benchmark_prepared.py [--refreshes 200] [--rounds 5]
+"""
+
+import argparse
+import statistics
+import time
+
+import DisplayTableData as TableData
+import outland_adventures
+
+
+COUNTERS = ("Com_select", "Com_stmt_prepare", "Com_stmt_execute")
+
+
+def session_counters(conn) -> dict:
+    cursor = conn.cursor()
+    cursor.execute("SHOW SESSION STATUS WHERE Variable_name IN (%s, %s, %s)", COUNTERS)
+    counters = {name: int(value) for name, value in cursor.fetchall()}
+    cursor.close()
+    return counters
+
+
+def refresh_text(conn, jobs, refreshes) -> None:
+    cursor = conn.cursor()
+    for _ in range(refreshes):
+        for name, params in jobs:
+            cursor.execute(outland_adventures.QUERIES.get(name).sql, params)
+            cursor.fetchall()
+    cursor.close()
+
+
+def refresh_prepared(conn, jobs, refreshes) -> None:
+    for _ in range(refreshes):
+        for name, params in jobs:
+            outland_adventures.QUERIES.fetch(conn, name, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQL text vs prepared report refreshes")
+    parser.add_argument("--refreshes", type=int, default=200,
+                        help="report refreshes per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+    # Measure against the bare connection even if METRICS is set
+    conn = getattr(conn, "_conn", conn)
+
+    jobs = [(report.name, (report.max_rows + 1,))
+            for report in outland_adventures.REPORTS]
+    paths = {"text": refresh_text, "prepared": refresh_prepared}
+    timings = {name: [] for name in paths}
+    counted = {name: dict.fromkeys(COUNTERS, 0) for name in paths}
+
+    try:
+        # Warm up the server caches (and prepare the statements) before timing
+        refresh_text(conn, jobs, 1)
+        refresh_prepared(conn, jobs, 1)
+
+        for _ in range(args.rounds):
+            for name, run in paths.items():
+                before = session_counters(conn)
+                start = time.perf_counter()
+                run(conn, jobs, args.refreshes)
+                timings[name].append(time.perf_counter() - start)
+                after = session_counters(conn)
+                for counter in COUNTERS:
+                    counted[name][counter] += after.get(counter, 0) - before.get(counter, 0)
+                conn.commit()
+    finally:
+        outland_adventures.QUERIES.forget(conn)
+        conn.close()
+
+    statements = len(jobs) * args.refreshes
+    print(f"\n{statements:,} statements per round, {args.rounds} rounds")
+    print(f"{'Path':<10} {'Median (s)':>11} {'us/stmt':>8} "
+          + " ".join(f"{c:>17}" for c in COUNTERS))
+    for name, walls in timings.items():
+        median = statistics.median(walls)
+        print(f"{name:<10} {median:>11.4f} {median / statements * 1e6:>8.1f} "
+              + " ".join(f"{counted[name][c] // args.rounds:>17,}" for c in COUNTERS))
+
+    text, prepared = (statistics.median(timings[n]) for n in ("text", "prepared"))
+    print(f"\nPrepared statements: {(text - prepared) / text * 100:+.1f}% "
+          f"({(text - prepared) / statements * 1e6:+.1f} us per statement)")
+    print(f"Registry: {outland_adventures.QUERIES.stats}")
+
+
+if __name__ == "__main__":
+    main()
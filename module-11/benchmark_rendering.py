@@ -0,0 +1,133 @@
+"""
+benchmark_rendering.py
+Compares PrettyTable with table_renderer for report-sized and dump-sized
+outputs: render time and peak memory at 100K and 1M rows by default.
+
+Renderers:
+    prettytable - TableFormatter rows fed to PrettyTable.add_rows, then
+                  get_string() (how module-12 printed reports before)
+    buffered    - render_table on column-major cells
+    streaming   - StreamingTable fed 1,000-row batches, as display_table
+                  does with fetchmany; only one batch is formatted at a time
+
+Each renderer and size runs in its own child process so peak RSS is
+measured cleanly. Output goes to os.devnull. The rows are synthetic,
+shaped like the Equipment Profit report, so no database is needed.
+PrettyTable is skipped when it is not installed.
+
+Usage:
+    python benchmark_rendering.py
+    python benchmark_rendering.py --rows 100000 --renderers buffered streaming
+
+Linux/macOS only (uses the resource module for peak RSS).
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmark_formatting import COLUMNS, TYPES, make_rows
+from column_formatters import TableFormatter
+from outland_adventures import MONEY_COLS, PERCENT_COLS
+from table_renderer import render_table, StreamingTable
+
+try:
+    from prettytable import PrettyTable
+except ImportError:
+    PrettyTable = None
+
+
+RENDERERS = ("prettytable", "buffered", "streaming")
+
+# Rows generated per make_rows call, and per StreamingTable.write
+BATCH_SIZE = 1000
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def iter_batches(count):
+    for start in range(0, count, BATCH_SIZE):
+        batch = make_rows(min(BATCH_SIZE, count - start), seed=start + 1)
+        for offset, row in enumerate(batch):
+            row["EquipmentID"] = start + offset + 1
+        yield batch
+
+
+def run_child(renderer, count) -> dict:
+    formatter = TableFormatter(COLUMNS, TYPES, MONEY_COLS, PERCENT_COLS)
+    rows = [row for batch in iter_batches(count) for row in batch]
+    baseline_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as out:
+        if renderer == "prettytable":
+            table = PrettyTable(field_names=COLUMNS)
+            table.add_rows(formatter.format_rows(rows))
+            out.write(table.get_string())
+        elif renderer == "buffered":
+            render_table(COLUMNS, formatter.format_columns(rows), out=out, style="grid")
+        else:
+            with StreamingTable(COLUMNS, out=out, style="grid", formatter=formatter) as table:
+                for first in range(0, count, BATCH_SIZE):
+                    table.write(rows[first:first + BATCH_SIZE])
+    seconds = time.perf_counter() - start
+
+    return {
+        "renderer": renderer,
+        "rows": count,
+        "seconds": seconds,
+        "baseline_rss_mb": baseline_mb,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_renderer(renderer, count) -> dict:
+    """Run one renderer in a fresh interpreter and read back its JSON result."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", renderer,
+         "--rows", str(count)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PrettyTable vs table_renderer")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--renderers", nargs="+", choices=RENDERERS, default=list(RENDERERS))
+    parser.add_argument("--child", choices=RENDERERS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.rows[0])))
+        return
+
+    renderers = args.renderers
+    if PrettyTable is None and "prettytable" in renderers:
+        print("PrettyTable is not installed; skipping it (pip install prettytable).")
+        renderers = [r for r in renderers if r != "prettytable"]
+
+    print(f"\n{'Renderer':<12} {'Rows':>10} {'Seconds':>9} {'Rows/s':>12} "
+          f"{'Data (MB)':>10} {'Render (MB)':>12}")
+    for count in args.rows:
+        for renderer in renderers:
+            r = run_renderer(renderer, count)
+            # Data is what the rows themselves cost; Render is what the
+            # renderer added on top of them
+            print(f"{renderer:<12} {count:>10,} {r['seconds']:>9.2f} "
+                  f"{count / r['seconds']:>12,.0f} {r['baseline_rss_mb']:>10.1f} "
+                  f"{r['peak_rss_mb'] - r['baseline_rss_mb']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+benchmark_reservations.py
+Load test for equipment_availability.reserve(): --clients threads, each
+on its own pooled connection, keep reserving random date ranges of a few
+items for --seconds, so most requests fight over the same Equipment rows.
+
+Reservations go into a test window a year ahead. Afterwards every day of
+the window is checked straight from EquipmentReservation: the units the
+test reserved on a day must not exceed what was free on that day before
+the test. Any day that does is an oversell. The test reservations are
+deleted again unless --keep is given.
+
+Usage:
+    python benchmark_reservations.py [--clients 100] [--seconds 10] [--items 5]
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import DisplayTableData as TableData
+from benchmark_pool import percentile
+from connection_pool import ConnectionPool
+from equipment_availability import AvailabilityIndex, InsufficientStockError
+
+
+WINDOW_OFFSET_DAYS = 365
+WINDOW_DAYS = 60
+MAX_RENTAL_DAYS = 7
+MAX_QUANTITY = 3
+
+
+def client(pool, index, items, window_start, deadline, seed, results, lock) -> None:
+    rng = random.Random(seed)
+    counts = Counter()
+    latencies = []
+    conn = pool.checkout()
+    try:
+        while time.perf_counter() < deadline:
+            equipment_id = rng.choice(items)
+            start = window_start + timedelta(days=rng.randrange(WINDOW_DAYS - MAX_RENTAL_DAYS))
+            end = start + timedelta(days=rng.randint(1, MAX_RENTAL_DAYS))
+            began = time.perf_counter()
+            try:
+                index.reserve(conn, equipment_id, start, end, rng.randint(1, MAX_QUANTITY))
+                counts["reserved"] += 1
+            except InsufficientStockError:
+                counts["rejected"] += 1
+            latencies.append(time.perf_counter() - began)
+    finally:
+        conn.close()
+    with lock:
+        results["counts"].update(counts)
+        results["latencies"].extend(latencies)
+
+
+def oversold_days(conn, items, window_start, free_before, first_id) -> list:
+    """(EquipmentID, day, reserved, free before) for every oversold day."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT EquipmentID, StartDate, EndDate, Quantity FROM EquipmentReservation "
+        "WHERE ReservationID > %s",
+        (first_id,)
+    )
+    reserved = Counter()
+    for equipment_id, start, end, quantity in cursor.fetchall():
+        day = start
+        while day < end:
+            reserved[equipment_id, day] += quantity
+            day += timedelta(days=1)
+    cursor.close()
+
+    oversold = []
+    for equipment_id in items:
+        for offset in range(WINDOW_DAYS):
+            day = window_start + timedelta(days=offset)
+            before = free_before[equipment_id][offset]
+            if reserved[equipment_id, day] > before:
+                oversold.append((equipment_id, day, reserved[equipment_id, day], before))
+    return oversold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent equipment reservations")
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--items", type=int, default=5,
+                        help="items the clients compete for")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the test reservations")
+    args = parser.parse_args()
+
+    config = TableData.GetDatabaseConfig()
+    pool = ConnectionPool(config, pool_size=args.clients + 1)
+    conn = pool.checkout()
+    try:
+        index = AvailabilityIndex()
+        index.load(conn)
+        window_start = date.today() + timedelta(days=WINDOW_OFFSET_DAYS)
+        window_end = window_start + timedelta(days=WINDOW_DAYS)
+
+        # The items with the most units free in the window
+        free_in_window = {i: index.free(i, window_start, window_end) for i in index.equipment_ids()}
+        items = sorted(free_in_window, key=free_in_window.get, reverse=True)[:args.items]
+        if not items or free_in_window[items[0]] == 0:
+            print("No equipment has free units in the test window.")
+            return
+        free_before = {
+            i: [index.free(i, window_start + timedelta(days=d), window_start + timedelta(days=d + 1))
+                for d in range(WINDOW_DAYS)]
+            for i in items
+        }
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(ReservationID), 0) FROM EquipmentReservation")
+        first_id = cursor.fetchone()[0]
+        cursor.close()
+        conn.commit()
+
+        print(f"{args.clients} clients, {args.seconds:g}s, items {items} "
+              f"({sum(free_in_window[i] for i in items)} units free), "
+              f"window {window_start} to {window_end}")
+
+        results = {"counts": Counter(), "latencies": []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=client,
+                                    args=(pool, index, items, window_start, deadline,
+                                          args.seed + n, results, lock))
+                   for n in range(args.clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        counts = results["counts"]
+        attempts = counts["reserved"] + counts["rejected"]
+        latencies = results["latencies"]
+        print(f"\n{attempts:,} requests in {wall:.2f}s: {attempts / wall:,.1f} requests/s, "
+              f"{counts['reserved'] / wall:,.1f} reservations/s")
+        print(f"Reserved {counts['reserved']:,}, rejected (not enough free) {counts['rejected']:,}")
+        print("Latency (ms): " + ", ".join(
+            f"p{p} {percentile(latencies, p) * 1000:.2f}" for p in (50, 95, 99)))
+
+        oversold = oversold_days(conn, items, window_start, free_before, first_id)
+        if oversold:
+            print(f"\nOVERSOLD on {len(oversold)} item-days:")
+            for equipment_id, day, reserved, before in oversold[:20]:
+                print(f"  Equipment {equipment_id} on {day}: {reserved} reserved, {before} were free")
+        else:
+            print("\nNo oversell: no day has more units reserved than were free.")
+
+        if not args.keep:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM EquipmentReservation WHERE ReservationID > %s", (first_id,))
+            conn.commit()
+            cursor.close()
+    finally:
+        conn.close()
+        pool.closeall()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+benchmark_scale.py
+Times every report entry point against generated data at one or more
+scales and appends the results to a JSON Lines file, one object per
+(scale, entry point), so runs can be compared over time.
+
+Entry points timed:
+    DisplayTableData.dump            - display_table for every table (streaming)
+    EquipmentProfitReport            - display_table on EquipmentProfitViewWithRentals
+    EquipmentAgeAndStatusReport      - display_table on EquipmentAgeAndInventoryStatus
+    outland_adventures.<report>      - each query in REPORTS plus print_table
+    outland_adventures.all           - connect_and_print_reports (parallel runner)
+
+Report output goes to os.devnull so the terminal does not skew timings.
+
+Usage:
+    python benchmark_scale.py --scales 1000,100000,1000000 --generate
+    python benchmark_scale.py --scales 1000000 --repeat 5 --output results.jsonl
+    python benchmark_scale.py --skip DisplayTableData.dump
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+
+import DisplayTableData as TableData
+import generate_data
+import outland_adventures
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def table_counts(cursor) -> dict:
+    counts = {}
+    for table in generate_data.TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def entry_points() -> dict:
+    """Name -> function(conn) for everything the benchmark times."""
+
+    def dump(conn):
+        cursor = conn.cursor()
+        for table in TableData.GetTables(cursor):
+            TableData.display_table(cursor, table, stream=True)
+        cursor.close()
+
+    def view(name, as_table):
+        def run(conn):
+            cursor = conn.cursor()
+            TableData.display_table(cursor, name, as_table)
+            cursor.close()
+        return run
+
+    def report(definition):
+        def run(conn):
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(definition.sql)
+            rows = cursor.fetchall()
+            cursor.close()
+            outland_adventures.print_table(definition.title, rows,
+                                           definition.columns, definition.max_rows)
+        return run
+
+    points = {
+        "DisplayTableData.dump": dump,
+        "EquipmentProfitReport": view("EquipmentProfitViewWithRentals", True),
+        "EquipmentAgeAndStatusReport": view("EquipmentAgeAndInventoryStatus", False),
+    }
+    for definition in outland_adventures.REPORTS:
+        name = definition.title.replace("Report Sample: ", "")
+        points[f"outland_adventures.{name}"] = report(definition)
+    points["outland_adventures.all"] = lambda conn: outland_adventures.connect_and_print_reports()
+    return points
+
+
+def time_entry(func, conn, repeat) -> list[float]:
+    timings = []
+    with open(os.devnull, "w") as devnull:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(devnull):
+                func(conn)
+            timings.append(time.perf_counter() - start)
+            # Fresh read snapshot for the next run
+            conn.commit()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time report entry points at several data scales")
+    parser.add_argument("--scales", default="1000",
+                        help="comma separated scales (EquipmentTransaction rows)")
+    parser.add_argument("--generate", action="store_true",
+                        help="regenerate data (with --reset) before each scale")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per entry point")
+    parser.add_argument("--skip", default="", help="comma separated entry points to skip")
+    parser.add_argument("--output", default="benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    skip = {s for s in args.skip.split(",") if s}
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    run = {
+        "run_id": uuid.uuid4().hex[:12],
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+    }
+
+    try:
+        with open(args.output, "a") as out:
+            for scale in scales:
+                if args.generate:
+                    print(f"\nGenerating scale {scale:,}...")
+                    generate_data.generate(conn, scale, reset=True)
+
+                cursor = conn.cursor()
+                counts = table_counts(cursor)
+                cursor.close()
+
+                print(f"\nScale {scale:,}")
+                for name, func in entry_points().items():
+                    if name in skip:
+                        continue
+                    timings = time_entry(func, conn, args.repeat)
+                    record = dict(run, scale=scale, entry_point=name, repeat=args.repeat,
+                                  seconds=timings,
+                                  median_seconds=statistics.median(timings),
+                                  min_seconds=min(timings),
+                                  table_rows=counts)
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    print(f"  {name:<60} median {record['median_seconds']:9.4f}s")
+    finally:
+        conn.close()
+
+    print(f"\nResults appended to {args.output} (run {run['run_id']})")
+
+
+if __name__ == "__main__":
+    main()
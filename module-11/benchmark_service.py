@@ -0,0 +1,139 @@
+"""
+benchmark_service.py
+Locust-style load test for report_service.py: --users simulated analysts,
+each a thread with its own keep-alive connection, keep requesting
+endpoints for --seconds, with --wait seconds of think time between
+requests (0 for as fast as possible).
+
+Each user remembers the ETag of every body it received and sends it back
+in If-None-Match, as a browser does, unless --no-etag is given. It asks
+for gzip (or --encoding zstd / identity).
+
+Prints requests/s and p50 / p95 / p99 latency per endpoint and overall,
+plus how many answers were 304 Not Modified.
+
+Usage:
+    python report_service.py &
+    python benchmark_service.py [--users 50] [--seconds 20] [--path /reports/equipment_profit.json ...]
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from benchmark_pool import percentile
+
+
+def endpoints(host, port) -> list[str]:
+    """JSON URL of every report, from the service index."""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        index = json.loads(response.read())
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise SystemExit(f"GET / answered {response.status}: {index}")
+    return [row[3] for row in index["rows"] if row[0] == "report"]
+
+
+def user(host, port, paths, deadline, wait, encoding, use_etag, seed, results, lock) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    etags = {}
+    latencies = defaultdict(list)
+    statuses = Counter()
+    received = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            headers = {"Accept-Encoding": encoding}
+            if use_etag and path in etags:
+                headers["If-None-Match"] = etags[path]
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                statuses["connection error"] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                continue
+            latencies[path].append(time.perf_counter() - start)
+            statuses[response.status] += 1
+            received += len(body)
+            if response.status == 200 and response.getheader("ETag"):
+                etags[path] = response.getheader("ETag")
+            if wait > 0:
+                time.sleep(rng.uniform(0, 2 * wait))
+    finally:
+        conn.close()
+    with lock:
+        for path, values in latencies.items():
+            results["latencies"][path].extend(values)
+        results["statuses"].update(statuses)
+        results["bytes"] += received
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the report service")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--wait", type=float, default=0,
+                        help="mean think time between a user's requests")
+    parser.add_argument("--path", action="append",
+                        help="endpoint to request (repeatable); every report by default")
+    parser.add_argument("--encoding", default="gzip", choices=["gzip", "zstd", "identity"])
+    parser.add_argument("--no-etag", action="store_true", help="never send If-None-Match")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    paths = args.path or endpoints(host, port)
+    print(f"{args.users} users, {args.seconds:g}s, {len(paths)} endpoints, "
+          f"Accept-Encoding {args.encoding}, ETags {'off' if args.no_etag else 'on'}")
+
+    results = {"latencies": defaultdict(list), "statuses": Counter(), "bytes": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=user,
+                                args=(host, port, paths, deadline, args.wait, args.encoding,
+                                      not args.no_etag, args.seed + n, results, lock))
+               for n in range(args.users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    print(f"\n{'Endpoint':<50} {'Requests':>9} {'Req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    everything = []
+    for path in sorted(results["latencies"]):
+        values = results["latencies"][path]
+        everything.extend(values)
+        print(f"{path:<50} {len(values):>9,} {len(values) / wall:>9,.1f} "
+              f"{percentile(values, 50) * 1000:>8.2f} {percentile(values, 95) * 1000:>8.2f} "
+              f"{percentile(values, 99) * 1000:>8.2f}")
+    print(f"{'Total':<50} {len(everything):>9,} {len(everything) / wall:>9,.1f} "
+          f"{percentile(everything, 50) * 1000:>8.2f} {percentile(everything, 95) * 1000:>8.2f} "
+          f"{percentile(everything, 99) * 1000:>8.2f}")
+
+    statuses = results["statuses"]
+    print("\nStatus: " + ", ".join(f"{status}: {count:,}" for status, count in
+                                    sorted(statuses.items(), key=lambda item: str(item[0]))))
+    print(f"Received {results['bytes'] / 1024 / 1024:,.1f} MB "
+          f"({statuses[304]:,} answers were 304 Not Modified)")
+
+
+if __name__ == "__main__":
+    main()
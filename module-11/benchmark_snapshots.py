@@ -0,0 +1,239 @@
+"""
+benchmark_snapshots.py
+Compares ways a new process can get at a report result it computed
+before: re-running the query against MySQL, loading a pickle or JSON
+file, or mapping a snapshot_file snapshot.
+
+For each it prints:
+    open    until the first page (--page rows) can be shown
+    scan    opening plus summing one numeric column over every row
+    filter  opening plus counting the rows where that column is above
+            its median
+    size    on disk
+
+The files are written once and read --repeat times (best run shown), so
+they come from the OS page cache, as they do when report_scheduler.py
+keeps them fresh.
+
+Usage:
+    python benchmark_snapshots.py --report equipment_profit
+    python benchmark_snapshots.py --table EquipmentTransaction
+    python benchmark_snapshots.py --synthetic 5000000      (no database needed)
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import snapshot_file
+from snapshot_file import open_snapshot, write_snapshot
+from snapshot_store import Snapshot
+
+
+NUMERIC_KINDS = ("int", "float", "decimal")
+CATEGORIES = ["Tent", "Backpack", "Stove", "Sleeping Bag", "Boots", "Climbing Gear"]
+
+
+def synthetic_rows(count, seed=42) -> tuple:
+    """(columns, rows) shaped like EquipmentTransaction joined with Equipment."""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    columns = ["TransactionID", "EquipmentID", "Name", "Category", "TransactionType",
+               "TransactionDate", "Quantity", "Amount"]
+    rows = []
+    for i in range(1, count + 1):
+        equipment_id = rng.randint(1, 500)
+        rows.append((
+            i,
+            equipment_id,
+            f"Equipment {equipment_id}",
+            CATEGORIES[equipment_id % len(CATEGORIES)],
+            "Rental" if rng.random() < 0.8 else "Purchase",
+            start + timedelta(days=rng.randrange(3650)),
+            rng.randint(1, 5),
+            Decimal(rng.randint(500, 250000)).scaleb(-2),
+        ))
+    return columns, rows
+
+
+def query_rows(sql) -> tuple:
+    """(columns, rows, seconds) of one run of sql against MySQL."""
+    import DisplayTableData as TableData
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        raise SystemExit("Failed to connect to the database.")
+    try:
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        seconds = time.perf_counter() - start
+        columns = [d[0] for d in cursor.description]
+        cursor.close()
+        conn.commit()
+    finally:
+        conn.close()
+    return columns, rows, seconds
+
+
+def _number(value):
+    # JSON has decimals (and dates) as text
+    return Decimal(value) if isinstance(value, str) else value
+
+
+def row_paths(load, position, threshold, page):
+    """open / scan / filter callables for a path that loads every row."""
+    def open_():
+        return load()[:page]
+
+    def scan():
+        return sum(_number(r[position]) for r in load() if r[position] is not None)
+
+    def filter_():
+        return sum(1 for r in load()
+                   if r[position] is not None and _number(r[position]) > threshold)
+
+    return {"open": open_, "scan": scan, "filter": filter_}
+
+
+def mapped_paths(path, column, threshold, page):
+    """open / scan / filter callables for the mapped snapshot."""
+    def open_():
+        with open_snapshot(path) as mapped:
+            return mapped.rows[:page]
+
+    def scan():
+        with open_snapshot(path) as mapped:
+            values = mapped.column(column)
+            stored = values.array()
+            if stored is None:
+                total = 0
+                for start in range(0, len(values), snapshot_file.CHUNK_ROWS):
+                    total += sum(v for v in values.values(start, start + snapshot_file.CHUNK_ROWS)
+                                 if v is not None)
+                return total
+            # NULLs are stored as 0, so they add nothing
+            total = int(stored.sum()) if values.kind != "float" else float(stored.sum())
+            del stored
+            return Decimal(total).scaleb(-values.scale) if values.kind == "decimal" else total
+
+    def filter_():
+        with open_snapshot(path) as mapped:
+            return len(mapped.where(column, ">", threshold))
+
+    return {"open": open_, "scan": scan, "filter": filter_}
+
+
+def best_of(fn, repeat) -> float:
+    runs = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reopening a report result")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--report", help="report_registry report to query")
+    source.add_argument("--table", help="table or view to query")
+    source.add_argument("--synthetic", type=int, metavar="ROWS",
+                        help="generated transaction rows instead of MySQL")
+    parser.add_argument("--column", help="numeric column to scan (first numeric one by default)")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    query_seconds = None
+    sql = None
+    if args.synthetic:
+        columns, rows = synthetic_rows(args.synthetic)
+        name = f"synthetic_{args.synthetic}"
+    else:
+        if args.report:
+            from report_registry import REGISTRY
+            sql = REGISTRY.get(args.report).sql
+            name = args.report
+        else:
+            sql = f"SELECT * FROM `{args.table}`"
+            name = args.table
+        columns, rows, query_seconds = query_rows(sql)
+    snapshot = Snapshot(name=name, columns=columns, rows=[tuple(r) for r in rows],
+                        query_seconds=query_seconds or 0.0)
+    print(f"\n{name}: {len(rows):,} rows, {len(columns)} columns")
+
+    with tempfile.TemporaryDirectory() as folder:
+        files = {
+            "snapshot": os.path.join(folder, "result.snapshot"),
+            "pickle": os.path.join(folder, "result.pickle"),
+            "json": os.path.join(folder, "result.json"),
+        }
+        write_seconds = {}
+        start = time.perf_counter()
+        write_snapshot(files["snapshot"], snapshot)
+        write_seconds["snapshot"] = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(files["pickle"], "wb") as out:
+            pickle.dump(snapshot.rows, out, protocol=pickle.HIGHEST_PROTOCOL)
+        write_seconds["pickle"] = time.perf_counter() - start
+        start = time.perf_counter()
+        with open(files["json"], "w", encoding="utf-8") as out:
+            json.dump(snapshot.rows, out, default=str)
+        write_seconds["json"] = time.perf_counter() - start
+
+        with open_snapshot(files["snapshot"]) as mapped:
+            kinds = {c.name: c.kind for c in mapped.column_data}
+            column = args.column or next((c for c in mapped.columns
+                                          if kinds[c] in NUMERIC_KINDS), None)
+            if column is None or kinds.get(column) not in NUMERIC_KINDS:
+                raise SystemExit(f"No numeric column to scan; columns: {', '.join(columns)}")
+            values = sorted(v for v in mapped.column(column).values() if v is not None)
+            threshold = values[len(values) // 2] if values else 0
+            del values
+        position = columns.index(column)
+        snapshot.rows = None
+        rows = None
+        gc.collect()
+
+        def load_pickle():
+            with open(files["pickle"], "rb") as f:
+                return pickle.load(f)
+
+        def load_json():
+            with open(files["json"], encoding="utf-8") as f:
+                return json.load(f)
+
+        paths = {
+            "snapshot": mapped_paths(files["snapshot"], column, threshold, args.page),
+            "pickle": row_paths(load_pickle, position, threshold, args.page),
+            "json": row_paths(load_json, position, threshold, args.page),
+        }
+        if sql is not None:
+            paths["mysql"] = row_paths(lambda: query_rows(sql)[1], position, threshold, args.page)
+
+        print(f"Scanning {column} ({kinds[column]}), filter {column} > {threshold}, "
+              f"best of {args.repeat}")
+        print(f"{'Path':<10} {'Open (ms)':>12} {'Scan (ms)':>12} {'Filter (ms)':>12} "
+              f"{'Write (ms)':>11} {'Size (MB)':>10}")
+        for label, fns in paths.items():
+            timings = {step: best_of(fn, args.repeat) * 1000 for step, fn in fns.items()}
+            size = os.path.getsize(files[label]) / 1024 / 1024 if label in files else None
+            written = write_seconds.get(label)
+            print(f"{label:<10} {timings['open']:>12.2f} {timings['scan']:>12.2f} "
+                  f"{timings['filter']:>12.2f} "
+                  + (f"{written * 1000:>11.1f} {size:>10.1f}" if written is not None
+                     else f"{'-':>11} {'-':>10}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+benchmark_streaming.py
+Compares the buffered (fetchall) and streaming (fetchmany) ways of dumping
+a table with DisplayTableData.
+
+Each mode runs in its own child process so peak RSS is measured cleanly.
+For each mode the script prints time-to-first-row, total time, rows read
+and peak resident memory. Output rows are formatted exactly like
+display_table but written to os.devnull so the terminal is not the
+bottleneck.
+
+Point it at a big table, e.g. after filling the schema with generated data:
+    python benchmark_streaming.py EquipmentTransaction --batch-size 5000
+
+Linux/macOS only (uses the resource module for peak RSS).
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import DisplayTableData as TableData
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_child(mode, table_name, batch_size) -> dict:
+    """Dump one table in one mode and return the measurements."""
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        raise SystemExit("Failed to connect to the database.")
+    cursor = conn.cursor()
+
+    baseline_mb = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "stream":
+        rows = TableData.IterTableData(cursor, table_name, batch_size)
+    else:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        rows = cursor.fetchall()
+
+    first_row = None
+    count = 0
+    with open(os.devnull, "w") as out:
+        for row in rows:
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            out.write(" | ".join(str(item) if item is not None else "" for item in row))
+            out.write("\n")
+            count += 1
+    total = time.perf_counter() - start
+
+    cursor.close()
+    conn.close()
+
+    return {
+        "mode": mode,
+        "table": table_name,
+        "rows": count,
+        "first_row_seconds": first_row if first_row is not None else total,
+        "total_seconds": total,
+        "baseline_rss_mb": baseline_mb,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def run_mode(mode, table_name, batch_size) -> dict:
+    """Run one mode in a fresh interpreter and read back its JSON result."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), table_name,
+         "--batch-size", str(batch_size), "--child", mode],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buffered vs streaming table dump")
+    parser.add_argument("table", help="table or view to dump")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--child", choices=["buffered", "stream"],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.table, args.batch_size)))
+        return
+
+    results = [run_mode(mode, args.table, args.batch_size)
+               for mode in ("buffered", "stream")]
+
+    print(f"\nTable: {args.table}  (batch size {args.batch_size})")
+    print(f"{'Mode':<10} {'Rows':>12} {'First row (s)':>14} {'Total (s)':>10} {'Peak RSS (MB)':>14}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['rows']:>12,} {r['first_row_seconds']:>14.3f} "
+              f"{r['total_seconds']:>10.2f} {r['peak_rss_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
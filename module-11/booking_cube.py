@@ -0,0 +1,397 @@
+"""
+booking_cube.py
+An in-memory, pre-aggregated cube over Booking x Trip for the booking
+analytics, so region/destination/status/month questions are answered
+from NumPy arrays instead of joining and sorting in MySQL every time.
+
+Dimensions (each dictionary-encoded to small integer codes):
+    region        Trip.Region
+    destination   Trip.Destination
+    status        Booking.Status
+    month         Trip.StartDate as 'YYYY-MM'
+Measures, summed per cell:
+    participants  Booking.NumberOfParticipants
+    bookings      number of Booking rows
+    revenue       Trip.Price x NumberOfParticipants (kept in cents, so
+                  sums are exact)
+
+The cells are one dense int64 array of shape
+(measure, region, destination, status, month). A query is a few array
+slices and one sum, so it takes microseconds and never touches MySQL:
+    roll-up     cube.aggregate(["region"])
+    drill-down  cube.aggregate(["region", "destination"], region="Africa")
+    slice       cube.aggregate(["month"], status="Confirmed")
+
+The cube is the same grain as the RegionBookingParticipantsReport view
+(InitialLoad (1).sql), which "check" compares it against.
+
+refresh() only reads bookings with a BookingID above the highest one
+already folded in (a primary key range scan), so keeping the cube
+current costs in proportion to the new bookings. Like
+equipment_profit_summary.py it assumes bookings are append-only; status
+changes or deletes of old bookings are only picked up by rebuild().
+
+Requires NumPy (pip install numpy).
+
+Usage:
+    python booking_cube.py                        # roll-up by region
+    python booking_cube.py --by region destination --region Africa
+    python booking_cube.py --by month --status Confirmed
+    python booking_cube.py check                  # compare with the view
+    python booking_cube.py bench                  # query timings
+"""
+
+import argparse
+import threading
+import time
+import timeit
+from dataclasses import dataclass
+from decimal import Decimal
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, only this module needs it
+    np = None
+
+import DisplayTableData as TableData
+
+
+DIMENSIONS = ("region", "destination", "status", "month")
+MEASURES = ("participants", "bookings", "revenue")
+
+PARTICIPANTS, BOOKINGS, REVENUE = range(len(MEASURES))
+
+# Rows read per round trip while loading
+DEFAULT_BATCH_SIZE = 50000
+
+BOOKING_FACTS_QUERY = """
+    SELECT
+        b.BookingID,
+        t.Region,
+        t.Destination,
+        b.Status,
+        DATE_FORMAT(t.StartDate, '%Y-%m') AS TripMonth,
+        b.NumberOfParticipants,
+        t.Price
+    FROM Booking b
+    JOIN Trip t ON t.TripID = b.TripID
+    WHERE b.BookingID > %s
+    ORDER BY b.BookingID
+    LIMIT %s
+"""
+
+
+@dataclass(frozen=True)
+class Totals:
+    """Measures of one group of cells."""
+    participants: int
+    bookings: int
+    revenue: Decimal
+
+
+class _CubeState:
+    """Members, codes and cells that belong together."""
+
+    def __init__(self):
+        # Per dimension: member values in code order, and value -> code.
+        # Both only ever grow, so older cells stay valid for them.
+        self.members = {dim: [] for dim in DIMENSIONS}
+        self.codes = {dim: {} for dim in DIMENSIONS}
+        self.cells = _new_cells((0,) * len(DIMENSIONS))
+        self.last_booking_id = 0
+
+
+class BookingCube:
+    """
+    Booking x Trip cube. Reads are lock-free: a load builds a new cells
+    array and swaps it in, so a query always sees a complete version.
+    """
+
+    def __init__(self):
+        self._state = _CubeState()
+        self._lock = threading.Lock()
+
+    @property
+    def last_booking_id(self) -> int:
+        return self._state.last_booking_id
+
+    # ------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------
+    def refresh(self, conn, batch_size=DEFAULT_BATCH_SIZE) -> int:
+        """
+        Fold in bookings newer than the last one loaded.
+
+        :param conn: MySQL connection
+        :param batch_size: Rows read per round trip
+        :return: Number of bookings added
+        :rtype: int
+        """
+        added = 0
+        cursor = conn.cursor()
+        try:
+            while True:
+                cursor.execute(BOOKING_FACTS_QUERY, (self.last_booking_id, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                self.add_rows(rows)
+                added += len(rows)
+                if len(rows) < batch_size:
+                    break
+        finally:
+            cursor.close()
+        return added
+
+    def rebuild(self, conn, batch_size=DEFAULT_BATCH_SIZE) -> int:
+        """
+        Load all bookings again into a new cube and swap it in; queries
+        keep using the old one until then.
+        """
+        fresh = BookingCube()
+        loaded = fresh.refresh(conn, batch_size)
+        with self._lock:
+            self._state = fresh._state
+        return loaded
+
+    def add_rows(self, rows) -> None:
+        """
+        Add booking facts: (BookingID, Region, Destination, Status,
+        'YYYY-MM', NumberOfParticipants, Price) tuples, in BookingID order.
+        Bookings the cube already has are skipped, so overlapping refreshes
+        (or a refresh racing rebuild) do not count them twice.
+        """
+        with self._lock:
+            state = self._state
+            rows = [row for row in rows if row[0] > state.last_booking_id]
+            if not rows:
+                return
+            codes = np.empty((len(DIMENSIONS), len(rows)), dtype=np.intp)
+            measures = np.empty((len(MEASURES), len(rows)), dtype=np.int64)
+            encoders = [_encoder(state, dim) for dim in DIMENSIONS]
+            for i, (_, region, destination, status, month, participants, price) in enumerate(rows):
+                codes[0, i] = encoders[0](region)
+                codes[1, i] = encoders[1](destination)
+                codes[2, i] = encoders[2](status)
+                codes[3, i] = encoders[3](month)
+                participants = participants or 0
+                measures[PARTICIPANTS, i] = participants
+                measures[REVENUE, i] = round((price or 0) * 100) * participants
+            measures[BOOKINGS] = 1
+
+            # Copy (and grow, if new members appeared), add, then swap in
+            shape = tuple(len(state.members[dim]) for dim in DIMENSIONS)
+            cells = _new_cells(shape)
+            old = state.cells
+            cells[(slice(None),) + tuple(slice(0, n) for n in old.shape[1:])] = old
+            for m in range(len(MEASURES)):
+                np.add.at(cells[m], tuple(codes), measures[m])
+
+            state.cells = cells
+            state.last_booking_id = max(state.last_booking_id, rows[-1][0])
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def members(self, dim) -> list:
+        """Values of a dimension, in the order they were first seen."""
+        return list(self._state.members[dim])
+
+    def aggregate(self, group_by=(), **filters) -> dict:
+        """
+        Sum the measures, grouped by some dimensions and restricted to
+        some members of others.
+
+        :param group_by: Dimensions to keep, in the order of the result keys;
+            the others are rolled up
+        :param filters: dimension=value or dimension=[values] (slice / dice)
+        :return: {tuple of group_by values: Totals}, sorted by key, only
+            groups with at least one booking
+        :rtype: dict
+        """
+        group_by = tuple(group_by)
+        for dim in group_by + tuple(filters):
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension {dim!r}; expected one of {DIMENSIONS}")
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("A dimension can only be grouped by once")
+
+        state = self._state
+        cells = state.cells
+        # Members on each axis; filtered axes keep only the wanted ones.
+        # Codes past the array's edge belong to a load not swapped in yet.
+        axis_members = []
+        for axis, dim in enumerate(DIMENSIONS):
+            members = state.members[dim][:cells.shape[1 + axis]]
+            if dim in filters:
+                wanted = filters[dim]
+                if isinstance(wanted, (str, type(None))):
+                    wanted = [wanted]
+                codes = state.codes[dim]
+                members = [v for v in dict.fromkeys(wanted)
+                           if codes.get(v, len(members)) < len(members)]
+                cells = np.take(cells, [codes[v] for v in members], axis=1 + axis)
+            axis_members.append(members)
+
+        kept = sorted(DIMENSIONS.index(dim) for dim in group_by)
+        rolled = tuple(1 + axis for axis in range(len(DIMENSIONS)) if axis not in kept)
+        cells = cells.sum(axis=rolled)
+        # The kept axes are in DIMENSIONS order; put them in group_by order
+        order = [DIMENSIONS.index(dim) for dim in group_by]
+        cells = cells.transpose([0] + [1 + kept.index(axis) for axis in order])
+        axis_members = [axis_members[axis] for axis in order]
+
+        result = {}
+        for position in map(tuple, np.argwhere(cells[BOOKINGS]).tolist()):
+            key = tuple(axis_members[axis][i] for axis, i in enumerate(position))
+            participants, bookings, revenue = cells[(slice(None),) + position].tolist()
+            result[key] = Totals(participants, bookings, Decimal(revenue).scaleb(-2))
+        return dict(sorted(result.items(), key=lambda item: _sort_key(item[0])))
+
+    def total(self, **filters) -> Totals:
+        """Grand total of the measures, optionally sliced."""
+        return self.aggregate((), **filters).get((), Totals(0, 0, Decimal("0.00")))
+
+
+def _encoder(state, dim):
+    members = state.members[dim]
+    codes = state.codes[dim]
+
+    def encode(value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(members)
+            members.append(value)
+        return code
+    return encode
+
+
+def _new_cells(shape):
+    if np is None:
+        raise RuntimeError("booking_cube needs NumPy: pip install numpy")
+    return np.zeros((len(MEASURES),) + shape, dtype=np.int64)
+
+
+def _sort_key(key) -> tuple:
+    # NULL members sort first, like ORDER BY does
+    return tuple((value is not None, value or "") for value in key)
+
+
+# ------------------------------------------------------------
+# Process-wide cube
+# ------------------------------------------------------------
+_cube = None
+_cube_lock = threading.Lock()
+
+
+def get_cube(conn=None) -> BookingCube:
+    """
+    The shared cube. With a connection, new bookings are folded in first.
+    """
+    global _cube
+    with _cube_lock:
+        if _cube is None:
+            _cube = BookingCube()
+    if conn is not None:
+        _cube.refresh(conn)
+    return _cube
+
+
+# ------------------------------------------------------------
+# Command line
+# ------------------------------------------------------------
+def print_totals(title, group_by, result) -> None:
+    print(f"\n{title}")
+    headers = [dim.title() for dim in group_by] + ["Bookings", "Participants", "Revenue"]
+    rows = [[("" if v is None else str(v)) for v in key]
+            + [f"{t.bookings:,}", f"{t.participants:,}", f"${t.revenue:,.2f}"]
+            for key, t in result.items()]
+    widths = [max([len(h)] + [len(r[i]) for r in rows]) for i, h in enumerate(headers)]
+    print(" | ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("-+-".join("-" * w for w in widths))
+    for row in rows:
+        print(" | ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def check(cube, cursor) -> int:
+    """
+    Compare the cube cell by cell with RegionBookingParticipantsReport.
+    Returns the number of cells that differ.
+    """
+    cursor.execute(
+        "SELECT Region, Destination, Status, TripMonth, Bookings, "
+        "TotalParticipants, TotalRevenue FROM RegionBookingParticipantsReport"
+    )
+    expected = {tuple(row[:4]): Totals(int(row[5]), int(row[4]), Decimal(row[6]).quantize(Decimal("0.01")))
+                for row in cursor.fetchall()}
+    actual = cube.aggregate(DIMENSIONS)
+    differences = 0
+    for key in sorted(set(expected) | set(actual), key=_sort_key):
+        if expected.get(key) != actual.get(key):
+            differences += 1
+            print(f"  {key}: view {expected.get(key)}, cube {actual.get(key)}")
+    return differences
+
+
+def bench(cube) -> None:
+    regions = cube.members("region")
+    queries = {
+        "roll-up by region": lambda: cube.aggregate(["region"]),
+        "drill-down region > destination": lambda: cube.aggregate(
+            ["region", "destination"], region=regions[:1]),
+        "slice status by month": lambda: cube.aggregate(["month"], status="Confirmed"),
+        "grand total": lambda: cube.total(),
+    }
+    print(f"\n{'Query':<34} {'us/query':>9}")
+    for name, query in queries.items():
+        number = 1000
+        seconds = min(timeit.repeat(query, number=number, repeat=5)) / number
+        print(f"{name:<34} {seconds * 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking analytics from the in-memory cube")
+    parser.add_argument("command", nargs="?", default="show", choices=["show", "check", "bench"])
+    parser.add_argument("--by", nargs="+", default=["region"], choices=DIMENSIONS,
+                        help="dimensions to group by")
+    for dim in DIMENSIONS:
+        parser.add_argument(f"--{dim}", help=f"only this {dim}")
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        cube = BookingCube()
+        start = time.perf_counter()
+        loaded = cube.refresh(conn)
+        print(f"Loaded {loaded:,} bookings in {time.perf_counter() - start:.2f}s "
+              f"(last BookingID {cube.last_booking_id})")
+
+        if args.command == "check":
+            cursor = conn.cursor()
+            differences = check(cube, cursor)
+            cursor.close()
+            print("Cube matches RegionBookingParticipantsReport." if not differences
+                  else f"{differences} cell(s) differ.")
+        elif args.command == "bench":
+            bench(cube)
+        else:
+            filters = {dim: getattr(args, dim) for dim in DIMENSIONS
+                       if getattr(args, dim) is not None}
+            start = time.perf_counter()
+            result = cube.aggregate(args.by, **filters)
+            elapsed = time.perf_counter() - start
+            title = "Bookings by " + ", ".join(args.by)
+            if filters:
+                title += " (" + ", ".join(f"{k}={v}" for k, v in filters.items()) + ")"
+            print_totals(title, args.by, result)
+            print(f"\n{len(result)} groups in {elapsed * 1e6:.0f} us")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
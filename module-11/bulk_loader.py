@@ -0,0 +1,412 @@
+"""
+bulk_loader.py
+Loads CSV or NDJSON files into any outland_adventures (or movies) table
+much faster than row-by-row INSERTs.
+
+How it gets its speed:
+  - rows are sent in chunks with executemany, which mysql.connector turns
+    into a single multi-row INSERT ... VALUES per chunk
+  - or, with --load-data, each chunk is written to a temp file and sent
+    with LOAD DATA LOCAL INFILE
+  - foreign key and unique checks are switched off for the session
+  - with --drop-indexes, non-unique secondary indexes are dropped before
+    the load and rebuilt once at the end (DISABLE KEYS on MyISAM)
+  - one commit per chunk instead of one per row
+
+Each chunk is committed together with a progress row in BulkLoadProgress,
+so after a failure the same command resumes from the last committed chunk
+without loading anything twice.
+
+Input:
+  CSV    - header row with column names; empty fields load as NULL
+  NDJSON - one JSON object per line; keys are column names
+
+Usage:
+    python bulk_loader.py EquipmentTransaction transactions.csv
+    python bulk_loader.py Booking bookings.ndjson --chunk-size 50000 --drop-indexes
+    python bulk_loader.py film films.csv --database movies --load-data
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime
+
+import mysql.connector
+
+import DisplayTableData as TableData
+from connection_pool import get_pool
+
+
+PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS BulkLoadProgress (
+      LoadKey CHAR(40) PRIMARY KEY,
+      TableName VARCHAR(64),
+      SourceFile VARCHAR(512),
+      RowsCommitted BIGINT NOT NULL DEFAULT 0,
+      DroppedIndexes TEXT,            -- JSON map of index name to the ALTER TABLE that rebuilds it
+      Finished BOOLEAN NOT NULL DEFAULT FALSE,
+      UpdatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+
+# ------------------------------------------------------------
+# Reading input files
+# ------------------------------------------------------------
+def detect_format(path) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return "ndjson" if ext in (".ndjson", ".jsonl", ".json") else "csv"
+
+
+def read_rows(path, fmt):
+    """
+    Open an input file.
+
+    :param path: CSV or NDJSON file
+    :param fmt: "csv" or "ndjson"
+    :return: (column names, iterator of row tuples)
+    :rtype: tuple[list[str], Iterator[tuple]]
+    """
+    handle = open(path, newline="", encoding="utf-8")
+
+    if fmt == "csv":
+        reader = csv.reader(handle)
+        columns = next(reader)
+
+        def rows():
+            with handle:
+                for record in reader:
+                    yield tuple(value if value != "" else None for value in record)
+        return columns, rows()
+
+    # NDJSON: column list comes from the first object
+    first_line = handle.readline()
+    while first_line and not first_line.strip():
+        first_line = handle.readline()
+    if not first_line:
+        handle.close()
+        return [], iter(())
+    first = json.loads(first_line)
+    columns = list(first)
+
+    def rows():
+        with handle:
+            yield tuple(first.get(c) for c in columns)
+            for line in handle:
+                if line.strip():
+                    record = json.loads(line)
+                    yield tuple(record.get(c) for c in columns)
+    return columns, rows()
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ------------------------------------------------------------
+# Table metadata and index handling
+# ------------------------------------------------------------
+def table_columns(cursor, table) -> list[str]:
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (table,)
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def table_engine(cursor, table) -> str:
+    cursor.execute(
+        "SELECT ENGINE FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    row = cursor.fetchone()
+    return (row[0] or "") if row else ""
+
+
+def droppable_indexes(cursor, table) -> dict:
+    """
+    Non-unique secondary indexes that can be dropped for the load.
+    Indexes backing a foreign key are kept, MySQL will not drop those.
+
+    :return: index name -> ALTER TABLE statement that recreates it
+    :rtype: dict
+    """
+    cursor.execute(
+        "SELECT INDEX_NAME, COLUMN_NAME, SUB_PART, NON_UNIQUE "
+        "FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY' "
+        "ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+        (table,)
+    )
+    indexes = {}
+    for name, column, sub_part, non_unique in cursor.fetchall():
+        if not non_unique:
+            continue
+        part = f"`{column}`({sub_part})" if sub_part else f"`{column}`"
+        indexes.setdefault(name, []).append((column, part))
+
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND REFERENCED_TABLE_NAME IS NOT NULL",
+        (table,)
+    )
+    fk_columns = {row[0] for row in cursor.fetchall()}
+
+    result = {}
+    for name, parts in indexes.items():
+        if parts[0][0] in fk_columns:
+            continue
+        column_list = ", ".join(p for _, p in parts)
+        result[name] = f"ALTER TABLE `{table}` ADD INDEX `{name}` ({column_list})"
+    return result
+
+
+def index_exists(cursor, table, name) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, name)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+# ------------------------------------------------------------
+# Progress tracking
+# ------------------------------------------------------------
+def load_key(path, table) -> str:
+    """Identify a load by file path, size, modification time and table."""
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{int(stat.st_mtime)}|{table}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def get_progress(cursor, key) -> tuple[int, dict, bool]:
+    cursor.execute(
+        "SELECT RowsCommitted, DroppedIndexes, Finished FROM BulkLoadProgress WHERE LoadKey = %s",
+        (key,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return 0, {}, False
+    return row[0], json.loads(row[1] or "{}"), bool(row[2])
+
+
+def save_progress(cursor, key, table, path, rows_committed, dropped, finished=False) -> None:
+    """Upsert the progress row. The caller commits, normally with the chunk."""
+    cursor.execute(
+        "INSERT INTO BulkLoadProgress "
+        "(LoadKey, TableName, SourceFile, RowsCommitted, DroppedIndexes, Finished) "
+        "VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE RowsCommitted = %s, DroppedIndexes = %s, Finished = %s",
+        (key, table, os.path.abspath(path), rows_committed, json.dumps(dropped), finished,
+         rows_committed, json.dumps(dropped), finished)
+    )
+
+
+# ------------------------------------------------------------
+# Writing chunks
+# ------------------------------------------------------------
+def insert_chunk(cursor, table, columns, rows) -> None:
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    placeholders = ", ".join(["%s"] * len(columns))
+    # executemany rewrites this into one INSERT with a VALUES list per row
+    cursor.executemany(f"INSERT INTO `{table}` ({column_list}) VALUES ({placeholders})", rows)
+
+
+def _load_data_value(value) -> str:
+    # MySQL's default LOAD DATA format: tab separated, backslash escaped, \N for NULL
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    text = str(value)
+    return (text.replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def load_data_chunk(cursor, table, columns, rows) -> None:
+    handle = tempfile.NamedTemporaryFile("w", suffix=".tsv", delete=False, encoding="utf-8")
+    try:
+        with handle:
+            for row in rows:
+                handle.write("\t".join(_load_data_value(v) for v in row))
+                handle.write("\n")
+        column_list = ", ".join(f"`{c}`" for c in columns)
+        cursor.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table}` "
+            f"CHARACTER SET utf8mb4 ({column_list})",
+            (handle.name,)
+        )
+    finally:
+        os.remove(handle.name)
+
+
+# ------------------------------------------------------------
+# Main load routine
+# ------------------------------------------------------------
+def bulk_load(conn, table, path, fmt=None, chunk_size=10000, use_load_data=False,
+              drop_indexes=False, disable_checks=True, verbose=True) -> dict:
+    """
+    Load a CSV/NDJSON file into a table, resuming a previous attempt.
+
+    :param conn: MySQL connection (needs allow_local_infile for use_load_data)
+    :param table: Target table
+    :param path: Input file
+    :param fmt: "csv" or "ndjson"; guessed from the extension if None
+    :param chunk_size: Rows per chunk and commit
+    :param use_load_data: Send chunks with LOAD DATA LOCAL INFILE
+    :param drop_indexes: Drop non-unique secondary indexes during the load
+    :param disable_checks: Turn off foreign key and unique checks
+    :return: Rows loaded, rows skipped on resume, seconds and rows/sec
+    :rtype: dict
+    """
+    fmt = fmt or detect_format(path)
+    cursor = conn.cursor()
+    cursor.execute(PROGRESS_TABLE)
+
+    known = table_columns(cursor, table)
+    if not known:
+        raise ValueError(f"Table {table} does not exist")
+    columns, rows = read_rows(path, fmt)
+    lookup = {c.lower(): c for c in known}
+    unknown = [c for c in columns if c.lower() not in lookup]
+    if unknown:
+        raise ValueError(f"Columns not in {table}: {', '.join(unknown)}")
+    columns = [lookup[c.lower()] for c in columns]
+
+    key = load_key(path, table)
+    committed, dropped, finished = get_progress(cursor, key)
+    if finished:
+        if verbose:
+            print(f"{path} was already loaded into {table} ({committed:,} rows).")
+        cursor.close()
+        return {"rows": 0, "skipped": committed, "seconds": 0.0, "rows_per_sec": 0.0}
+
+    if disable_checks:
+        cursor.execute("SET SESSION foreign_key_checks = 0")
+        cursor.execute("SET SESSION unique_checks = 0")
+
+    myisam = table_engine(cursor, table).upper() == "MYISAM"
+    loaded = 0
+    start = time.perf_counter()
+    try:
+        # Drop indexes. Record them first, since ALTER TABLE commits
+        # immediately and a crash must not lose the definitions.
+        if drop_indexes and myisam:
+            cursor.execute(f"ALTER TABLE `{table}` DISABLE KEYS")
+        elif drop_indexes and not dropped:
+            dropped = droppable_indexes(cursor, table)
+            save_progress(cursor, key, table, path, committed, dropped)
+            conn.commit()
+            for name in dropped:
+                cursor.execute(f"ALTER TABLE `{table}` DROP INDEX `{name}`")
+            if verbose and dropped:
+                print(f"Dropped indexes for the load: {', '.join(dropped)}")
+
+        # Skip what an earlier attempt already committed
+        if committed and verbose:
+            print(f"Resuming after {committed:,} committed rows.")
+        for _ in range(committed):
+            next(rows, None)
+
+        write = load_data_chunk if use_load_data else insert_chunk
+        for chunk in chunks(rows, chunk_size):
+            write(cursor, table, columns, chunk)
+            committed += len(chunk)
+            loaded += len(chunk)
+            # Same transaction as the rows, so progress can never run ahead
+            save_progress(cursor, key, table, path, committed, dropped)
+            conn.commit()
+            if verbose:
+                elapsed = time.perf_counter() - start
+                print(f"  {committed:>12,} rows committed  {loaded / elapsed:12,.0f} rows/s")
+
+        # Rebuild the indexes once, over the full table
+        if drop_indexes and myisam:
+            cursor.execute(f"ALTER TABLE `{table}` ENABLE KEYS")
+        for name, statement in dropped.items():
+            if not index_exists(cursor, table, name):
+                if verbose:
+                    print(f"Rebuilding index {name}...")
+                cursor.execute(statement)
+
+        save_progress(cursor, key, table, path, committed, {}, finished=True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if disable_checks:
+            # The connection goes back to the pool; restore the checks
+            cursor.execute("SET SESSION foreign_key_checks = 1")
+            cursor.execute("SET SESSION unique_checks = 1")
+        cursor.close()
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": loaded,
+        "skipped": committed - loaded,
+        "seconds": seconds,
+        "rows_per_sec": loaded / seconds if seconds else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load CSV/NDJSON into a table")
+    parser.add_argument("table")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--database", help="load into this database instead of the .env one")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--load-data", action="store_true", help="use LOAD DATA LOCAL INFILE")
+    parser.add_argument("--drop-indexes", action="store_true",
+                        help="drop secondary indexes during the load and rebuild them after")
+    parser.add_argument("--keep-checks", action="store_true",
+                        help="leave foreign key and unique checks on")
+    args = parser.parse_args()
+
+    config = TableData.GetDatabaseConfig()
+    # DDL like CREATE TABLE IF NOT EXISTS raises harmless warnings
+    config["raise_on_warnings"] = False
+    if args.database:
+        config["database"] = args.database
+    if args.load_data:
+        config["allow_local_infile"] = True
+
+    try:
+        conn = get_pool(config).checkout()
+    except mysql.connector.Error as err:
+        print(err)
+        return
+
+    try:
+        result = bulk_load(conn, args.table, args.file, args.format, args.chunk_size,
+                           args.load_data, args.drop_indexes, not args.keep_checks)
+    finally:
+        conn.close()
+
+    print(f"\nLoaded {result['rows']:,} rows into {args.table} in {result['seconds']:.1f}s "
+          f"({result['rows_per_sec']:,.0f} rows/s)")
+    if result["skipped"]:
+        print(f"Skipped {result['skipped']:,} rows committed by an earlier attempt.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+"""
+equipment_availability.py
+Date-ranged equipment availability and reservations (see
+EquipmentAvailability.sql).
+
+Equipment.AvailableQuantity never changes, so on its own it cannot say
+how many units are free on a given day. This module keeps, per
+EquipmentID, the number of units in use on every day of a fixed horizon
+in a segment tree (range add, range max):
+    - a Purchase takes its units away for good from its TransactionDate
+    - a Rental holds its units for RENTAL_DAYS from its TransactionDate
+    - a row of EquipmentReservation holds its units from StartDate up to
+      (not including) EndDate
+"How many of X are free from D1 to D2" is then the units owned minus
+the busiest day in [D1, D2), an O(log n) tree query.
+
+reserve() is safe under concurrent callers, in this process and others:
+it locks the item's Equipment row (SELECT ... FOR UPDATE), folds in any
+transactions and reservations for that item newer than the index has
+seen, checks the free count and inserts the reservation, all in one
+transaction. Two callers can never both take the last units.
+
+Like equipment_profit_summary.py the index assumes the source rows are
+append-only; edits and deletes are only picked up by a new load().
+
+Usage:
+    python equipment_availability.py free 3 2026-07-01 2026-07-08
+    python equipment_availability.py reserve 3 2026-07-01 2026-07-08 --quantity 2
+"""
+
+import argparse
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import DisplayTableData as TableData
+
+
+# A Rental transaction has no return date; it holds its units this long
+RENTAL_DAYS = 7
+
+# Days covered by the index, starting DEFAULT_HISTORY_DAYS before today
+DEFAULT_HORIZON_DAYS = 4096
+DEFAULT_HISTORY_DAYS = 1024
+
+
+class InsufficientStockError(Exception):
+    """Raised when a reservation asks for more units than are free."""
+
+    def __init__(self, equipment_id, start, end, requested, free):
+        super().__init__(
+            f"Equipment {equipment_id}: {requested} requested from {start} to {end}, "
+            f"only {free} free"
+        )
+        self.equipment_id = equipment_id
+        self.requested = requested
+        self.free = free
+
+
+class UsageTree:
+    """
+    Units in use per day, with O(log n) "add q units to days [l, r)" and
+    "busiest day in [l, r)". Non-recursive segment tree with lazy adds.
+
+    :param size: Number of days; must be a power of two
+    :param usage: Optional starting units in use per day
+    """
+
+    def __init__(self, size, usage=None):
+        self.size = size
+        self._height = size.bit_length()
+        # _tree[p]: max of p's range, including adds pending at p
+        # _pending[p]: add not yet pushed to p's children
+        self._tree = [0] * (2 * size)
+        self._pending = [0] * size
+        if usage is not None:
+            self._tree[size:size + len(usage)] = usage
+            for p in range(size - 1, 0, -1):
+                self._tree[p] = max(self._tree[2 * p], self._tree[2 * p + 1])
+
+    def add(self, left, right, units) -> None:
+        """Add units to every day in [left, right)."""
+        if left >= right:
+            return
+        tree, pending, size = self._tree, self._pending, self.size
+        l, r = left + size, right + size
+        while l < r:
+            if l & 1:
+                tree[l] += units
+                if l < size:
+                    pending[l] += units
+                l += 1
+            if r & 1:
+                r -= 1
+                tree[r] += units
+                if r < size:
+                    pending[r] += units
+            l >>= 1
+            r >>= 1
+        self._rebuild(left + size)
+        self._rebuild(right - 1 + size)
+
+    def max(self, left, right) -> int:
+        """Most units in use on any day in [left, right)."""
+        if left >= right:
+            return 0
+        tree, size = self._tree, self.size
+        l, r = left + size, right + size
+        self._push(l)
+        self._push(r - 1)
+        busiest = None
+        while l < r:
+            if l & 1:
+                busiest = tree[l] if busiest is None else max(busiest, tree[l])
+                l += 1
+            if r & 1:
+                r -= 1
+                busiest = tree[r] if busiest is None else max(busiest, tree[r])
+            l >>= 1
+            r >>= 1
+        return busiest
+
+    def _rebuild(self, p) -> None:
+        tree, pending = self._tree, self._pending
+        while p > 1:
+            p >>= 1
+            tree[p] = max(tree[2 * p], tree[2 * p + 1]) + pending[p]
+
+    def _push(self, p) -> None:
+        tree, pending, size = self._tree, self._pending, self.size
+        for shift in range(self._height, 0, -1):
+            i = p >> shift
+            if i and pending[i]:
+                for child in (2 * i, 2 * i + 1):
+                    tree[child] += pending[i]
+                    if child < size:
+                        pending[child] += pending[i]
+                pending[i] = 0
+
+
+@dataclass
+class ItemAvailability:
+    """Index state of one EquipmentID."""
+    units_owned: int
+    usage: UsageTree
+    # Newest source rows already folded into usage
+    last_transaction_id: int = 0
+    last_reservation_id: int = 0
+    # Guards usage (queries push pending adds, so they write too)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    # Serializes reserve() for this item within the process
+    reserve_lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class AvailabilityIndex:
+    """
+    Units in use per item and day, loaded from MySQL and kept current by
+    reserve().
+
+    :param origin: First day covered; defaults to DEFAULT_HISTORY_DAYS ago
+    :param horizon_days: Days covered from origin (rounded up to a power of two)
+    """
+
+    def __init__(self, origin=None, horizon_days=DEFAULT_HORIZON_DAYS):
+        self.origin = origin or date.today() - timedelta(days=DEFAULT_HISTORY_DAYS)
+        self.horizon_days = 1 << max(horizon_days - 1, 1).bit_length()
+        self._items = {}
+        self._lock = threading.Lock()
+
+    @property
+    def end(self) -> date:
+        """First day past the horizon."""
+        return self.origin + timedelta(days=self.horizon_days)
+
+    # ------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------
+    def load(self, conn) -> int:
+        """
+        Build the index for every item from Equipment, EquipmentTransaction
+        and EquipmentReservation.
+
+        :param conn: MySQL connection
+        :return: Number of items indexed
+        :rtype: int
+        """
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT EquipmentID, COALESCE(AvailableQuantity, 0) FROM Equipment")
+            owned = dict(cursor.fetchall())
+            diffs = {equipment_id: [0] * (self.horizon_days + 1) for equipment_id in owned}
+            last_ids = {equipment_id: [0, 0] for equipment_id in owned}
+
+            # One row per item, type and day, not per transaction
+            cursor.execute(
+                """
+                SELECT EquipmentID, TransactionType, TransactionDate,
+                       SUM(Quantity), MAX(TransactionID)
+                FROM EquipmentTransaction
+                WHERE EquipmentID IS NOT NULL AND Quantity IS NOT NULL
+                  AND TransactionDate IS NOT NULL
+                GROUP BY EquipmentID, TransactionType, TransactionDate
+                """
+            )
+            for equipment_id, kind, day, units, last_id in cursor.fetchall():
+                if equipment_id not in diffs:
+                    continue
+                span = self._transaction_span(kind, day)
+                if span is not None:
+                    _add_span(diffs[equipment_id], span, int(units))
+                last_ids[equipment_id][0] = max(last_ids[equipment_id][0], last_id)
+
+            cursor.execute(
+                """
+                SELECT EquipmentID, StartDate, EndDate, SUM(Quantity), MAX(ReservationID)
+                FROM EquipmentReservation
+                GROUP BY EquipmentID, StartDate, EndDate
+                """
+            )
+            for equipment_id, start, end, units, last_id in cursor.fetchall():
+                if equipment_id not in diffs:
+                    continue
+                _add_span(diffs[equipment_id], self._span(start, end), int(units))
+                last_ids[equipment_id][1] = max(last_ids[equipment_id][1], last_id)
+        finally:
+            cursor.close()
+            # End the transaction the SELECTs opened (autocommit is off), so
+            # reserve() can start its own on the same connection
+            conn.commit()
+
+        items = {}
+        for equipment_id, diff in diffs.items():
+            usage, running = [], 0
+            for change in diff[:-1]:
+                running += change
+                usage.append(running)
+            items[equipment_id] = ItemAvailability(
+                units_owned=owned[equipment_id],
+                usage=UsageTree(self.horizon_days, usage),
+                last_transaction_id=last_ids[equipment_id][0],
+                last_reservation_id=last_ids[equipment_id][1],
+            )
+        with self._lock:
+            self._items = items
+        return len(items)
+
+    def _catch_up(self, cursor, equipment_id, item) -> None:
+        """Fold in rows for one item that are newer than the index."""
+        cursor.execute(
+            "SELECT TransactionID, TransactionType, TransactionDate, Quantity "
+            "FROM EquipmentTransaction "
+            "WHERE EquipmentID = %s AND TransactionID > %s ORDER BY TransactionID",
+            (equipment_id, item.last_transaction_id)
+        )
+        transactions = cursor.fetchall()
+        cursor.execute(
+            "SELECT ReservationID, StartDate, EndDate, Quantity "
+            "FROM EquipmentReservation "
+            "WHERE EquipmentID = %s AND ReservationID > %s ORDER BY ReservationID",
+            (equipment_id, item.last_reservation_id)
+        )
+        reservations = cursor.fetchall()
+
+        with item.lock:
+            for transaction_id, kind, day, units in transactions:
+                span = self._transaction_span(kind, day) if units and day else None
+                if span is not None:
+                    item.usage.add(*span, units)
+                item.last_transaction_id = transaction_id
+            for reservation_id, start, end, units in reservations:
+                item.usage.add(*self._span(start, end), units)
+                item.last_reservation_id = reservation_id
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+    def free(self, equipment_id, start, end) -> int:
+        """
+        Units of an item free on every day from start up to (not
+        including) end, as of the last load or reservation.
+
+        :raises KeyError: for an item the index does not know
+        :raises ValueError: for an empty range or one past the horizon
+        """
+        item = self._items[equipment_id]
+        left, right = self._checked_span(start, end)
+        with item.lock:
+            return max(item.units_owned - item.usage.max(left, right), 0)
+
+    def equipment_ids(self) -> list:
+        return sorted(self._items)
+
+    # ------------------------------------------------------------
+    # Reservations
+    # ------------------------------------------------------------
+    def reserve(self, conn, equipment_id, start, end, quantity, account_id=None) -> int:
+        """
+        Reserve units of an item from start up to (not including) end.
+
+        :param conn: MySQL connection (not in a transaction)
+        :param equipment_id: Item to reserve
+        :param start: First day
+        :param end: Day the units come back
+        :param quantity: Units wanted
+        :param account_id: Optional CustomerAccount making the reservation
+        :return: The new ReservationID
+        :rtype: int
+        :raises InsufficientStockError: if fewer than quantity units are free
+        :raises ValueError: for a bad range or quantity, or an unknown item
+        """
+        if quantity <= 0:
+            raise ValueError("Reservation quantity must be positive")
+        left, right = self._checked_span(start, end)
+        item = self._items.get(equipment_id) or self._new_item(equipment_id)
+
+        with item.reserve_lock:
+            # READ COMMITTED, so the catch-up reads see rows committed by
+            # whoever held the row lock before us
+            conn.start_transaction(isolation_level="READ COMMITTED")
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT AvailableQuantity FROM Equipment WHERE EquipmentID = %s FOR UPDATE",
+                    (equipment_id,)
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    raise ValueError(f"Unknown equipment {equipment_id}")
+                item.units_owned = row[0] or 0
+                self._catch_up(cursor, equipment_id, item)
+
+                with item.lock:
+                    free = max(item.units_owned - item.usage.max(left, right), 0)
+                if free < quantity:
+                    raise InsufficientStockError(equipment_id, start, end, quantity, free)
+
+                cursor.execute(
+                    "INSERT INTO EquipmentReservation "
+                    "(EquipmentID, AccountID, StartDate, EndDate, Quantity) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    (equipment_id, account_id, start, end, quantity)
+                )
+                reservation_id = cursor.lastrowid
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+            with item.lock:
+                item.usage.add(left, right, quantity)
+                item.last_reservation_id = reservation_id
+        return reservation_id
+
+    def _new_item(self, equipment_id) -> ItemAvailability:
+        # An item added after load(); reserve() fills it in from row 0
+        with self._lock:
+            item = self._items.get(equipment_id)
+            if item is None:
+                item = ItemAvailability(0, UsageTree(self.horizon_days))
+                self._items = {**self._items, equipment_id: item}
+        return item
+
+    # ------------------------------------------------------------
+    # Dates to tree positions
+    # ------------------------------------------------------------
+    def _span(self, start, end) -> tuple[int, int]:
+        """[start, end) as positions, clipped to the horizon."""
+        left = max((start - self.origin).days, 0)
+        right = min((end - self.origin).days, self.horizon_days)
+        return left, max(left, right)
+
+    def _checked_span(self, start, end) -> tuple[int, int]:
+        if end <= start:
+            raise ValueError(f"End date {end} must be after start date {start}")
+        if start < self.origin or end > self.end:
+            raise ValueError(f"Dates must be between {self.origin} and {self.end}")
+        return self._span(start, end)
+
+    def _transaction_span(self, kind, day):
+        if kind == "Purchase":
+            return self._span(day, self.end)
+        if kind == "Rental":
+            return self._span(day, day + timedelta(days=RENTAL_DAYS))
+        return None
+
+
+def _add_span(diff, span, units) -> None:
+    left, right = span
+    if left < right:
+        diff[left] += units
+        diff[right] -= units
+
+
+# ------------------------------------------------------------
+# Process-wide index
+# ------------------------------------------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index(conn) -> AvailabilityIndex:
+    """The shared index, loaded on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = AvailabilityIndex()
+            index.load(conn)
+            _index = index
+    return _index
+
+
+def reset_reservations(cursor) -> None:
+    """
+    Empty EquipmentReservation and forget the shared index, for when
+    Equipment and CustomerAccount were emptied (their ids start again at
+    1, so old reservations would land on new items). Does nothing if the
+    table does not exist.
+    """
+    global _index
+    with _index_lock:
+        _index = None
+    try:
+        cursor.execute("TRUNCATE TABLE EquipmentReservation")
+    except mysql.connector.Error as err:
+        if err.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Equipment availability and reservations")
+    parser.add_argument("command", choices=["free", "reserve"])
+    parser.add_argument("equipment_id", type=int)
+    parser.add_argument("start", type=date.fromisoformat)
+    parser.add_argument("end", type=date.fromisoformat, help="day the units come back")
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--account", type=int, help="AccountID making the reservation")
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        index = get_index(conn)
+        if args.command == "reserve":
+            try:
+                reservation_id = index.reserve(conn, args.equipment_id, args.start, args.end,
+                                               args.quantity, args.account)
+                print(f"Reserved {args.quantity} as ReservationID {reservation_id}")
+            except InsufficientStockError as e:
+                print(e)
+        print(f"Equipment {args.equipment_id}: "
+              f"{index.free(args.equipment_id, args.start, args.end)} free "
+              f"from {args.start} to {args.end}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+equipment_profit_summary.py
+Maintains EquipmentRentalSummary, the incrementally updated replacement
+for the EquipmentProfitViewWithRentals aggregate (see
+EquipmentProfitSummary.sql).
+
+Commands:
+    python equipment_profit_summary.py rebuild   # full recompute, resets the watermark
+    python equipment_profit_summary.py apply     # fold in transactions newer than the watermark
+    python equipment_profit_summary.py check     # compare the summary against the full view
+    python equipment_profit_summary.py reset     # empty the summary after EquipmentTransaction was emptied
+
+apply only reads EquipmentTransaction rows with a TransactionID above the
+watermark (a primary key range scan), so its cost grows with the number
+of new rows, not with the size of the history. It assumes transactions
+are append-only; edits or deletes of old rows are only picked up by
+rebuild, or by using EquipmentProfitSummaryTriggers.sql instead.
+"""
+
+import sys
+from decimal import Decimal
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import DisplayTableData as TableData
+
+
+SUMMARY_NAME = "EquipmentRentalSummary"
+
+
+def triggers_installed(cursor) -> bool:
+    """
+    Check whether the summary triggers are installed. When they are, the
+    triggers keep the summary current and apply_deltas must not run.
+    """
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TRIGGERS "
+        "WHERE TRIGGER_SCHEMA = DATABASE() "
+        "AND TRIGGER_NAME LIKE 'EquipmentTransaction\\_Summary%'"
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def apply_deltas(conn) -> tuple[int, int]:
+    """
+    Fold transactions newer than the watermark into the summary.
+    Runs as one transaction so the summary and watermark move together.
+
+    :param conn: MySQL connection
+    :return: (transactions read, new watermark)
+    :rtype: tuple[int, int]
+    """
+    cursor = conn.cursor()
+    try:
+        if triggers_installed(cursor):
+            raise RuntimeError(
+                "Summary triggers are installed; they already keep the summary current."
+            )
+
+        # Lock the watermark row so two appliers cannot double count
+        cursor.execute(
+            "SELECT LastTransactionID FROM SummaryWatermark "
+            "WHERE SummaryName = %s FOR UPDATE",
+            (SUMMARY_NAME,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise RuntimeError("SummaryWatermark is missing; run EquipmentProfitSummary.sql")
+        low = row[0]
+
+        # Fix the upper bound first so rows inserted meanwhile wait for the
+        # next run. Locking read, as in transaction_rollups.apply_deltas: a
+        # lower id still uncommitted would otherwise end up below the
+        # watermark and never be counted
+        cursor.execute(
+            "SELECT MAX(TransactionID), COUNT(*) FROM EquipmentTransaction "
+            "WHERE TransactionID > %s FOR SHARE",
+            (low,)
+        )
+        high, new_rows = cursor.fetchone()
+        if high is None:
+            conn.rollback()
+            return 0, low
+
+        cursor.execute(
+            """
+            INSERT INTO EquipmentRentalSummary (EquipmentID, TotalRentalCount, LastTransactionID)
+            SELECT * FROM (
+                SELECT EquipmentID, SUM(Quantity) AS NewCount, MAX(TransactionID) AS NewLastID
+                FROM EquipmentTransaction
+                WHERE TransactionID > %s AND TransactionID <= %s
+                  AND TransactionType = 'Rental'
+                  AND EquipmentID IS NOT NULL
+                  AND Quantity IS NOT NULL
+                GROUP BY EquipmentID
+            ) AS delta
+            ON DUPLICATE KEY UPDATE
+              TotalRentalCount = EquipmentRentalSummary.TotalRentalCount + delta.NewCount,
+              LastTransactionID = GREATEST(EquipmentRentalSummary.LastTransactionID, delta.NewLastID)
+            """,
+            (low, high)
+        )
+        cursor.execute(
+            "UPDATE SummaryWatermark SET LastTransactionID = %s WHERE SummaryName = %s",
+            (high, SUMMARY_NAME)
+        )
+        conn.commit()
+        return new_rows, high
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def reset_summary(cursor) -> None:
+    """
+    Empty the summary and zero the watermark, for when EquipmentTransaction
+    itself was emptied (its TransactionIDs start again at 1, and TRUNCATE
+    does not fire the summary triggers). Does nothing if the summary
+    tables do not exist.
+    """
+    try:
+        cursor.execute(f"TRUNCATE TABLE {SUMMARY_NAME}")
+        cursor.execute(
+            "UPDATE SummaryWatermark SET LastTransactionID = 0 WHERE SummaryName = %s",
+            (SUMMARY_NAME,)
+        )
+    except mysql.connector.Error as err:
+        if err.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+
+
+def rebuild_summary(conn) -> int:
+    """
+    Recompute the whole summary from EquipmentTransaction and reset the
+    watermark. Use this once after creating the table, or to repair drift.
+
+    :param conn: MySQL connection
+    :return: The new watermark
+    :rtype: int
+    """
+    cursor = conn.cursor()
+    try:
+        # Lock the watermark first so an applier cannot run halfway through
+        cursor.execute(
+            "SELECT LastTransactionID FROM SummaryWatermark "
+            "WHERE SummaryName = %s FOR UPDATE",
+            (SUMMARY_NAME,)
+        )
+        cursor.fetchall()
+
+        cursor.execute("SELECT COALESCE(MAX(TransactionID), 0) FROM EquipmentTransaction")
+        high = cursor.fetchone()[0]
+
+        cursor.execute("DELETE FROM EquipmentRentalSummary")
+        cursor.execute(
+            """
+            INSERT INTO EquipmentRentalSummary (EquipmentID, TotalRentalCount, LastTransactionID)
+            SELECT EquipmentID, SUM(Quantity), MAX(TransactionID)
+            FROM EquipmentTransaction
+            WHERE TransactionID <= %s
+              AND TransactionType = 'Rental'
+              AND EquipmentID IS NOT NULL
+              AND Quantity IS NOT NULL
+            GROUP BY EquipmentID
+            """,
+            (high,)
+        )
+        cursor.execute(
+            "UPDATE SummaryWatermark SET LastTransactionID = %s WHERE SummaryName = %s",
+            (high, SUMMARY_NAME)
+        )
+        conn.commit()
+        return high
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def check_consistency(cursor) -> list[tuple]:
+    """
+    Compare the summary view against the full EquipmentProfitViewWithRentals.
+
+    :param cursor: MySQL cursor object
+    :return: (EquipmentID, column, full view value, summary value) for
+        every difference; empty when they agree
+    :rtype: list[tuple]
+    """
+    columns = ["TotalRentalCount", "TotalRentalRevenue"]
+    select = ", ".join(["EquipmentID"] + columns)
+
+    cursor.execute(f"SELECT {select} FROM EquipmentProfitViewWithRentals")
+    full = {row[0]: row[1:] for row in cursor.fetchall()}
+    cursor.execute(f"SELECT {select} FROM EquipmentProfitSummaryView")
+    summary = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    mismatches = []
+    for equipment_id in sorted(set(full) | set(summary)):
+        expected = full.get(equipment_id)
+        actual = summary.get(equipment_id)
+        if expected is None or actual is None:
+            mismatches.append((equipment_id, "row", expected, actual))
+            continue
+        for name, a, b in zip(columns, expected, actual):
+            # The view sums into DECIMAL, the summary stores BIGINT
+            if Decimal(a or 0) != Decimal(b or 0):
+                mismatches.append((equipment_id, name, a, b))
+    return mismatches
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "apply"
+    if command not in ("apply", "rebuild", "check", "reset"):
+        print(__doc__)
+        return
+
+    # Get a database connection
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        if command == "apply":
+            new_rows, watermark = apply_deltas(conn)
+            print(f"Applied {new_rows} new transactions. Watermark is now {watermark}.")
+        elif command == "rebuild":
+            watermark = rebuild_summary(conn)
+            print(f"Summary rebuilt. Watermark is now {watermark}.")
+        elif command == "reset":
+            cursor = conn.cursor()
+            reset_summary(cursor)
+            cursor.close()
+            conn.commit()
+            print("Summary emptied. Watermark is now 0.")
+        else:
+            cursor = conn.cursor()
+            mismatches = check_consistency(cursor)
+            cursor.close()
+            if not mismatches:
+                print("Summary matches EquipmentProfitViewWithRentals.")
+            else:
+                print(f"{len(mismatches)} differences found:")
+                for equipment_id, column, expected, actual in mismatches:
+                    print(f"  EquipmentID {equipment_id} {column}: view={expected} summary={actual}")
+                sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
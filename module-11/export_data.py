@@ -0,0 +1,244 @@
+"""
+export_data.py
+Streams any table or view straight from the cursor into a file for the
+BI pipeline, instead of scraping the console output of display_table.
+
+Formats:
+    csv      - header row, NULL as an empty field
+    ndjson   - one JSON object per row; DECIMAL as a string so no
+               precision is lost, dates in ISO format
+    parquet  - typed columnar file (needs pyarrow)
+    arrow    - Arrow IPC file (needs pyarrow)
+
+Rows are read with fetchmany in batches and written batch by batch, so
+memory is bounded by the batch size. For Parquet/Arrow every batch is
+turned into typed columns (DECIMAL -> decimal128, or decimal256 above 38
+digits, DATE -> date32, ...) using the column types from information_schema.
+
+Usage:
+    python export_data.py EquipmentProfitViewWithRentals profit.parquet
+    python export_data.py Booking bookings.csv --batch-size 50000
+    python export_data.py EquipmentTransaction tx.ndjson --format ndjson
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import DisplayTableData as TableData
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for parquet/arrow output
+    pa = None
+    pq = None
+
+
+FORMATS = ("csv", "ndjson", "parquet", "arrow")
+
+
+def detect_format(path) -> str:
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "json"):
+        return "ndjson"
+    if ext in ("feather", "ipc"):
+        return "arrow"
+    return ext if ext in FORMATS else "csv"
+
+
+def column_types(cursor, table_name) -> list[dict]:
+    """
+    Column names and SQL types of a table or view, in column order.
+
+    :param cursor: MySQL cursor object
+    :param table_name: Table or view to describe
+    :return: Dictionaries with name, data_type, column_type, precision, scale
+    :rtype: list[dict]
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, NUMERIC_PRECISION, NUMERIC_SCALE "
+        "FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (table_name,)
+    )
+    return [
+        {"name": name, "data_type": data_type.lower(), "column_type": column_type.lower(),
+         "precision": precision, "scale": scale}
+        for name, data_type, column_type, precision, scale in cursor.fetchall()
+    ]
+
+
+def arrow_schema(columns):
+    """Map MySQL column types to an Arrow schema."""
+    fields = []
+    for col in columns:
+        t = col["data_type"]
+        if t == "tinyint" and col["column_type"].startswith("tinyint(1)"):
+            arrow_type = pa.bool_()
+        elif t in ("tinyint", "smallint", "mediumint", "int", "integer", "year"):
+            # Unsigned INT does not fit in int32
+            arrow_type = pa.int64() if "unsigned" in col["column_type"] else pa.int32()
+        elif t == "bigint":
+            arrow_type = pa.uint64() if "unsigned" in col["column_type"] else pa.int64()
+        elif t == "decimal":
+            # MySQL allows up to 65 digits, decimal128 only 38
+            precision = int(col["precision"] or 38)
+            decimal_type = pa.decimal128 if precision <= 38 else pa.decimal256
+            arrow_type = decimal_type(precision, int(col["scale"] or 0))
+        elif t == "float":
+            arrow_type = pa.float32()
+        elif t == "double":
+            arrow_type = pa.float64()
+        elif t == "date":
+            arrow_type = pa.date32()
+        elif t in ("datetime", "timestamp"):
+            arrow_type = pa.timestamp("us")
+        elif t == "time":
+            arrow_type = pa.duration("us")
+        elif t in ("binary", "varbinary", "blob", "tinyblob", "mediumblob", "longblob"):
+            arrow_type = pa.binary()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col["name"], arrow_type))
+    return pa.schema(fields)
+
+
+def json_default(value):
+    """JSON for values json cannot encode: DECIMAL as a string, dates in ISO format."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    return str(value)
+
+
+def _to_arrow(values, arrow_type):
+    # MySQL sends BOOLEAN (tinyint(1)) as 0/1, which Arrow will not cast to bool
+    if arrow_type == pa.bool_():
+        values = [None if v is None else bool(v) for v in values]
+    return pa.array(values, type=arrow_type)
+
+
+def iter_batches(cursor, table_name, batch_size):
+    """Run SELECT * and yield lists of rows, batch_size at a time."""
+    cursor.execute(TableData.SelectAllQuery(cursor, table_name))
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return
+        yield batch
+
+
+def export_table(conn, table_name, path, fmt=None, batch_size=10000) -> dict:
+    """
+    Stream a table or view into a file.
+
+    :param conn: MySQL connection
+    :param table_name: Table or view to export
+    :param path: Output file
+    :param fmt: csv, ndjson, parquet or arrow; guessed from the extension if None
+    :param batch_size: Rows fetched and written per batch
+    :return: Rows written, bytes written and seconds taken
+    :rtype: dict
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt}")
+    if fmt in ("parquet", "arrow") and pa is None:
+        raise RuntimeError("pyarrow is required for parquet/arrow export (pip install pyarrow)")
+
+    meta_cursor = conn.cursor()
+    # Column types from the schema catalog cache; ask the server only
+    # for tables the catalog does not know yet
+    columns = TableData.GetCatalog(meta_cursor).columns(table_name) \
+        or column_types(meta_cursor, table_name)
+    meta_cursor.close()
+    if not columns:
+        raise ValueError(f"Table or view {table_name} does not exist")
+    names = [c["name"] for c in columns]
+
+    # Unbuffered cursor so rows stay on the server until fetched
+    cursor = conn.cursor()
+    rows = 0
+    start = time.perf_counter()
+    try:
+        if fmt == "csv":
+            with open(path, "w", newline="", encoding="utf-8") as out:
+                writer = csv.writer(out)
+                writer.writerow(names)
+                for batch in iter_batches(cursor, table_name, batch_size):
+                    writer.writerows(batch)
+                    rows += len(batch)
+
+        elif fmt == "ndjson":
+            encoder = json.JSONEncoder(default=json_default, separators=(",", ":"))
+            with open(path, "w", encoding="utf-8") as out:
+                for batch in iter_batches(cursor, table_name, batch_size):
+                    out.write("\n".join(encoder.encode(dict(zip(names, row))) for row in batch))
+                    out.write("\n")
+                    rows += len(batch)
+
+        else:
+            schema = arrow_schema(columns)
+            if fmt == "parquet":
+                writer = pq.ParquetWriter(path, schema)
+            else:
+                writer = pa.ipc.new_file(path, schema)
+            try:
+                for batch in iter_batches(cursor, table_name, batch_size):
+                    # Transpose the batch into one Python list per column
+                    arrays = [_to_arrow(values, field.type)
+                              for values, field in zip(zip(*batch), schema)]
+                    record_batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+                    if fmt == "parquet":
+                        writer.write_batch(record_batch)
+                    else:
+                        writer.write(record_batch)
+                    rows += len(batch)
+            finally:
+                writer.close()
+    finally:
+        cursor.close()
+
+    return {
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a table or view to CSV/NDJSON/Parquet/Arrow")
+    parser.add_argument("table")
+    parser.add_argument("output")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        result = export_table(conn, args.table, args.output, args.format, args.batch_size)
+    finally:
+        conn.close()
+
+    rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+    print(f"Exported {result['rows']:,} rows from {args.table} to {args.output} "
+          f"({result['bytes'] / 1024 / 1024:.1f} MB) in {result['seconds']:.2f}s "
+          f"({rate:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
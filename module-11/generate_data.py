@@ -0,0 +1,378 @@
+"""
+generate_data.py
+Fills the outland_adventures schema with synthetic, referentially valid
+data so the reports can be tried at production volume.
+
+The scale is the number of EquipmentTransaction rows (the largest table).
+The other tables are sized from it:
+    CustomerAccount       scale / 20
+    TwoFactorMethod       one per account with TwoFactorEnabled (about 40%)
+    FamilyMember          1-5 per account (about 3)
+    Waiver                one per family member
+    Trip                  scale / 1000   (at least 10)
+    Booking               scale / 4
+    Equipment             scale / 10000  (at least 10)
+    EquipmentTransaction  scale
+
+Popularity is skewed the way real data is: a few trips, items and
+accounts get most of the bookings and transactions, and recent dates are
+busier than old ones. The same --seed always produces the same data.
+
+Usage:
+    python generate_data.py --scale 1000000 --reset
+    python generate_data.py --scale 1000 --years 3 --batch-size 5000
+"""
+
+import argparse
+import random
+import time
+from array import array
+from datetime import date, timedelta
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import DisplayTableData as TableData
+from equipment_availability import reset_reservations
+from equipment_profit_summary import reset_summary
+from transaction_rollups import apply_deltas, reset_rollups
+
+
+# Tables in the order they must be filled (parents first)
+TABLES = ["CustomerAccount", "TwoFactorMethod", "FamilyMember", "Waiver", "Trip",
+          "Booking", "Equipment", "EquipmentTransaction"]
+
+DESTINATIONS = {
+    "Africa": ["Kilimanjaro Trek", "Safari Adventure", "Sahara Desert Trek",
+               "Atlas Mountains", "Okavango Delta", "Victoria Falls"],
+    "Asia": ["Everest Base Camp", "Annapurna Circuit", "Great Wall Hike",
+             "Mount Fuji Climb", "Ha Long Bay Kayak", "Tiger Leaping Gorge"],
+    "Southern Europe": ["Alps Hiking", "Pyrenees Trek", "Dolomites Adventure",
+                        "Cinque Terre Walk", "Picos de Europa", "Mount Olympus"],
+}
+REGIONS = list(DESTINATIONS)
+
+EQUIPMENT = {
+    "Tent": (150, 250), "Backpack": (60, 120), "Sleeping Bag": (50, 90),
+    "Cooking": (30, 80), "Lighting": (20, 50), "Footwear": (60, 110),
+}
+CATEGORIES = list(EQUIPMENT)
+
+FIRST_NAMES = ["John", "Mary", "Robert", "Linda", "Michael", "Maria", "David",
+               "Susan", "James", "Patricia", "Tom", "Ella", "Sam", "Lucy", "Anna"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia",
+              "Miller", "Davis", "Rodriguez", "Martinez", "Wong", "Ford"]
+
+
+def skewed_index(rng, n, skew) -> int:
+    """
+    Pick an index in [0, n) where low indexes are much more likely.
+    skew=1 is uniform; larger values concentrate picks on the first items.
+    """
+    return min(n - 1, int(n * rng.random() ** skew))
+
+
+def recent_date(rng, start, days, skew=0.6) -> date:
+    """Pick a date in [start, start + days), weighted toward the end."""
+    return start + timedelta(days=min(days - 1, int(days * rng.random() ** skew)))
+
+
+def table_sizes(scale) -> dict:
+    return {
+        "CustomerAccount": max(10, scale // 20),
+        "Trip": max(10, scale // 1000),
+        "Booking": max(10, scale // 4),
+        "Equipment": max(10, scale // 10000),
+        "EquipmentTransaction": max(10, scale),
+    }
+
+
+def max_ids(cursor) -> dict:
+    """Current highest ID per table, so new rows can be appended."""
+    keys = {"CustomerAccount": "AccountID", "TwoFactorMethod": "MethodID",
+            "FamilyMember": "MemberID",
+            "Waiver": "WaiverID", "Trip": "TripID", "Booking": "BookingID",
+            "Equipment": "EquipmentID", "EquipmentTransaction": "TransactionID"}
+    result = {}
+    for table, key in keys.items():
+        cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+        result[table] = cursor.fetchone()[0]
+    return result
+
+
+class BatchWriter:
+    """Collects rows and sends them with executemany, one commit per batch."""
+
+    def __init__(self, conn, table, columns, batch_size):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.table = table
+        placeholders = ", ".join(["%s"] * len(columns))
+        # mysql.connector turns executemany on a plain INSERT into multi-row VALUES
+        self.sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def add(self, row) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.rows:
+            self.cursor.executemany(self.sql, self.rows)
+            self.conn.commit()
+            self.count += len(self.rows)
+            self.rows = []
+
+    def close(self) -> int:
+        self.flush()
+        self.cursor.close()
+        return self.count
+
+
+def generate(conn, scale, years=3, seed=42, batch_size=5000, reset=False, verbose=True) -> dict:
+    """
+    Generate data for every table at the given scale, then fold the new
+    transactions into the rollups (if the database has them).
+
+    :param conn: MySQL connection
+    :param scale: Number of EquipmentTransaction rows to create
+    :param years: How many years of history the dates span
+    :param seed: Random seed; the same seed gives the same data
+    :param batch_size: Rows per INSERT batch and commit
+    :param reset: Empty the tables first
+    :return: Rows written per table
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    sizes = table_sizes(scale)
+
+    cursor = conn.cursor()
+    # Data is valid by construction; skip the per-row checks while loading
+    cursor.execute("SET SESSION foreign_key_checks = 0")
+    cursor.execute("SET SESSION unique_checks = 0")
+    try:
+        if reset:
+            for table in reversed(TABLES):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            # TransactionIDs start again at 1, so the rollups and the summary must too
+            reset_rollups(cursor)
+            reset_summary(cursor)
+            # Reservations point at EquipmentIDs and AccountIDs that are reused
+            reset_reservations(cursor)
+        start_ids = max_ids(cursor)
+        written = _generate(conn, rng, sizes, start_ids, years, batch_size, verbose)
+        # Roll up the new transactions now rather than leaving them all in
+        # the live tail the reports scan
+        started = time.perf_counter()
+        try:
+            rolled_up, _ = apply_deltas(conn)
+        except mysql.connector.Error as err:
+            if err.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+            return written
+        if verbose:
+            print(f"  {'Rollups':<22} {rolled_up:>12,} rows  "
+                  f"{time.perf_counter() - started:8.1f}s")
+        return written
+    finally:
+        # The connection goes back to the shared pool; restore the checks
+        cursor.execute("SET SESSION foreign_key_checks = 1")
+        cursor.execute("SET SESSION unique_checks = 1")
+        cursor.close()
+
+
+def _generate(conn, rng, sizes, start_ids, years, batch_size, verbose) -> dict:
+    today = date.today()
+    history_start = today - timedelta(days=365 * years)
+    history_days = 365 * years
+    written = {}
+
+    def log(table, count, started):
+        written[table] = count
+        if verbose:
+            elapsed = time.perf_counter() - started
+            rate = count / elapsed if elapsed else 0
+            print(f"  {table:<22} {count:>12,} rows  {elapsed:8.1f}s  {rate:12,.0f} rows/s")
+
+    # ------------------------------------------------------------
+    # CustomerAccount, TwoFactorMethod, FamilyMember, Waiver
+    # ------------------------------------------------------------
+    first_account = start_ids["CustomerAccount"] + 1
+    n_accounts = sizes["CustomerAccount"]
+    # Members of account i are member_first[i] .. member_first[i] + member_count[i] - 1
+    member_first = array("q")
+    member_count = array("b")
+
+    started = time.perf_counter()
+    accounts = BatchWriter(conn, "CustomerAccount",
+                           ["AccountID", "AccountName", "PrimaryContactName", "Email", "Phone",
+                            "Username", "PasswordHash", "AccountStatus", "TwoFactorEnabled"],
+                           batch_size)
+    methods = BatchWriter(conn, "TwoFactorMethod",
+                          ["MethodID", "AccountID", "MethodType", "Destination",
+                           "IsPrimary", "DateEnabled"], batch_size)
+    members = BatchWriter(conn, "FamilyMember",
+                          ["MemberID", "AccountID", "Name", "Age", "Relationship"], batch_size)
+    waivers = BatchWriter(conn, "Waiver",
+                          ["WaiverID", "MemberID", "SignedByMember", "SignedByParent",
+                           "ParentMemberID", "DateSigned"], batch_size)
+
+    method_id = start_ids["TwoFactorMethod"]
+    member_id = start_ids["FamilyMember"]
+    waiver_id = start_ids["Waiver"]
+    for i in range(n_accounts):
+        account_id = first_account + i
+        last = rng.choice(LAST_NAMES)
+        contact = f"{rng.choice(FIRST_NAMES)} {last}"
+        status = rng.choices(["Active", "Suspended", "Closed"], [90, 6, 4])[0]
+        two_factor = rng.random() < 0.4
+        accounts.add((account_id, f"{last} Family {account_id}", contact,
+                      f"user{account_id}@example.com", f"555-{account_id % 10000:04d}",
+                      f"user{account_id}", f"hash{account_id}", status, two_factor))
+        if two_factor:
+            # Picked from the account ID, so the other tables stay the same for a seed
+            method_id += 1
+            method = ("SMS", "Email", "AuthenticatorApp")[account_id % 3]
+            destination = {"SMS": f"555-{account_id % 10000:04d}",
+                           "Email": f"user{account_id}@example.com",
+                           "AuthenticatorApp": f"user{account_id}-app"}[method]
+            methods.add((method_id, account_id, method, destination, True,
+                         history_start + timedelta(days=account_id % history_days)))
+
+        count = rng.choices([1, 2, 3, 4, 5], [15, 25, 30, 20, 10])[0]
+        member_first.append(member_id + 1)
+        member_count.append(count)
+        parent_id = member_id + 1
+        for m in range(count):
+            member_id += 1
+            is_parent = m < min(2, count)
+            age = rng.randint(25, 70) if is_parent else rng.randint(3, 17)
+            members.add((member_id, account_id,
+                         f"{rng.choice(FIRST_NAMES)} {last}", age,
+                         "Parent" if is_parent else "Child"))
+            waiver_id += 1
+            signed = recent_date(rng, history_start, history_days)
+            if is_parent:
+                waivers.add((waiver_id, member_id, True, False, None, signed))
+            else:
+                waivers.add((waiver_id, member_id, False, True, parent_id, signed))
+
+    log("CustomerAccount", accounts.close(), started)
+    log("TwoFactorMethod", methods.close(), started)
+    log("FamilyMember", members.close(), started)
+    log("Waiver", waivers.close(), started)
+
+    # ------------------------------------------------------------
+    # Trip
+    # ------------------------------------------------------------
+    started = time.perf_counter()
+    first_trip = start_ids["Trip"] + 1
+    n_trips = sizes["Trip"]
+    trip_start = array("q")
+    trips = BatchWriter(conn, "Trip",
+                        ["TripID", "Destination", "Region", "StartDate", "EndDate",
+                         "Price", "SuggestedMaxParticipants"], batch_size)
+    for i in range(n_trips):
+        region = REGIONS[skewed_index(rng, len(REGIONS), 1.5)]
+        destination = rng.choice(DESTINATIONS[region])
+        start = history_start + timedelta(days=rng.randrange(history_days + 180))
+        length = rng.randint(4, 15)
+        trip_start.append(start.toordinal())
+        trips.add((first_trip + i, destination, region, start, start + timedelta(days=length),
+                   round(rng.uniform(900, 3500), 2), rng.choice([8, 10, 12, 15, 20])))
+    log("Trip", trips.close(), started)
+
+    # ------------------------------------------------------------
+    # Booking
+    # ------------------------------------------------------------
+    started = time.perf_counter()
+    bookings = BatchWriter(conn, "Booking",
+                           ["BookingID", "AccountID", "TripID", "BookingDate",
+                            "Status", "NumberOfParticipants"], batch_size)
+    booking_id = start_ids["Booking"]
+    for _ in range(sizes["Booking"]):
+        booking_id += 1
+        a = skewed_index(rng, n_accounts, 1.3)
+        t = skewed_index(rng, n_trips, 2.0)
+        # Booked up to 120 days before the trip starts
+        booked = date.fromordinal(trip_start[t] - rng.randint(1, 120))
+        status = rng.choices(["Confirmed", "Pending", "Cancelled"], [70, 20, 10])[0]
+        bookings.add((booking_id, first_account + a, first_trip + t, booked, status,
+                      rng.randint(1, member_count[a])))
+    log("Booking", bookings.close(), started)
+
+    # ------------------------------------------------------------
+    # Equipment
+    # ------------------------------------------------------------
+    started = time.perf_counter()
+    first_equipment = start_ids["Equipment"] + 1
+    n_equipment = sizes["Equipment"]
+    equipment = BatchWriter(conn, "Equipment",
+                            ["EquipmentID", "Name", "Category", "PurchaseDate", "EquipCondition",
+                             "AvailableQuantity", "InitialCost", "SalePrice", "RentalPrice"],
+                            batch_size)
+    for i in range(n_equipment):
+        category = CATEGORIES[skewed_index(rng, len(CATEGORIES), 1.4)]
+        low, high = EQUIPMENT[category]
+        cost = round(rng.uniform(low, high), 2)
+        purchased = today - timedelta(days=rng.randint(30, 365 * 9))
+        age_years = (today - purchased).days / 365
+        condition = "New" if age_years < 2 else ("Good" if age_years < 5 else "Worn")
+        equipment.add((first_equipment + i, f"{category} {first_equipment + i}", category,
+                       purchased, condition, rng.randint(1, 25), cost,
+                       round(cost * 1.5, 2), round(cost * 0.12, 2)))
+    log("Equipment", equipment.close(), started)
+
+    # ------------------------------------------------------------
+    # EquipmentTransaction
+    # ------------------------------------------------------------
+    started = time.perf_counter()
+    transactions = BatchWriter(conn, "EquipmentTransaction",
+                               ["TransactionID", "AccountID", "EquipmentID", "TransactionType",
+                                "TransactionDate", "Quantity", "MemberID"], batch_size)
+    transaction_id = start_ids["EquipmentTransaction"]
+    for _ in range(sizes["EquipmentTransaction"]):
+        transaction_id += 1
+        a = skewed_index(rng, n_accounts, 1.3)
+        member = member_first[a] + rng.randrange(member_count[a])
+        kind = "Rental" if rng.random() < 0.75 else "Purchase"
+        transactions.add((transaction_id, first_account + a,
+                          first_equipment + skewed_index(rng, n_equipment, 1.8),
+                          kind, recent_date(rng, history_start, history_days),
+                          rng.choices([1, 2, 3, 4], [60, 25, 10, 5])[0], member))
+    log("EquipmentTransaction", transactions.close(), started)
+
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic outland_adventures data")
+    parser.add_argument("--scale", type=int, default=1000,
+                        help="EquipmentTransaction rows to create (other tables scale from it)")
+    parser.add_argument("--years", type=int, default=3, help="years of history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="empty the tables first")
+    args = parser.parse_args()
+
+    # Get a database connection
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    print(f"Generating scale {args.scale:,} (seed {args.seed})")
+    started = time.perf_counter()
+    try:
+        written = generate(conn, args.scale, args.years, args.seed, args.batch_size, args.reset)
+    finally:
+        conn.close()
+    print(f"Done: {sum(written.values()):,} rows in {time.perf_counter() - started:.1f}s")
+    print("If you use EquipmentRentalSummary, run: python equipment_profit_summary.py apply")
+
+
+if __name__ == "__main__":
+    main()
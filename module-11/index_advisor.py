@@ -0,0 +1,560 @@
+"""
+index_advisor.py
+Explains every report query, flags the expensive parts of each plan and
+proposes covering indexes for them.
+
+Queries checked: each report in outland_adventures.REPORTS (as
+connect_and_print_reports runs it) and a SELECT * from every view.
+
+For each query the advisor
+    1. runs EXPLAIN FORMAT=JSON and EXPLAIN ANALYZE,
+    2. flags full table scans, full index scans, filesorts, temporary
+       tables and index lookups that still have to read the table rows,
+    3. proposes an index for each flagged table: the join or filter
+       columns first (or the ORDER BY columns, so rows come out already
+       sorted), then the other columns the query reads from that table,
+       so the index alone answers the query (a covering index),
+    4. with --apply, creates the proposed indexes, times every query again
+       and re-explains it, then drops them (keeps them with --keep).
+
+The proposals are written to a migration script (ReportIndexes.sql by
+default) with the measured latency of the queries each index serves.
+Small tables are not flagged (--min-rows); generate data first to see
+what the plans look like at production volume.
+
+Usage:
+    python index_advisor.py
+    python index_advisor.py --generate --scale 1000000 --apply
+    python index_advisor.py --apply --keep --output ReportIndexes.sql
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import mysql.connector
+
+import DisplayTableData as TableData
+import generate_data
+import outland_adventures
+import schema_catalog
+from pagination import limit_query
+
+
+# Plans reading fewer rows than this per scan are not worth an index
+DEFAULT_MIN_ROWS = 1000
+
+# Wider indexes cost more on every write than they save on reads; past
+# this, only the key columns are proposed, not the covering ones
+MAX_INDEX_COLUMNS = 5
+
+# MySQL identifier limit
+_MAX_NAME = 64
+
+# `schema`.`alias`.`column` or `alias`.`column` in attached conditions
+_CONDITION_COLUMN = r"`{alias}`\.`(\w+)`"
+
+# FROM/JOIN <table> [AS] <alias>, with or without backticks and schema
+_TABLE_REFERENCE = re.compile(
+    r"\b(?:from|join)\s*\(*\s*(?:`?\w+`?\.)?`?(\w+)`?(?:\s+(?:as\s+)?`?(\w+)`?)?",
+    re.IGNORECASE,
+)
+_NOT_ALIASES = {"on", "where", "group", "order", "limit", "left", "right",
+                "inner", "outer", "cross", "join", "using", "having", "union"}
+
+_ORDER_BY = re.compile(r"\border\s+by\s+(.+?)\s*(?:\blimit\b|;|$)",
+                       re.IGNORECASE | re.DOTALL)
+_ORDER_ITEM = re.compile(r"^`?(?:(\w+)`?\.`?)?(\w+)`?(?:\s+(?:asc|desc))?$", re.IGNORECASE)
+
+
+@dataclass
+class Problem:
+    """One expensive step in a query plan."""
+    # full_scan, full_index_scan, filesort, temporary, not_covering
+    kind: str
+    # Table alias as it appears in the plan; None for whole-query steps
+    alias: str | None
+    rows: int
+    detail: str
+
+    def __str__(self):
+        where = f" on {self.alias}" if self.alias else ""
+        rows = f" ({self.rows:,} rows)" if self.rows else ""
+        return f"{self.kind}{where}{rows}: {self.detail}"
+
+
+@dataclass
+class IndexCandidate:
+    """A proposed index. The first key_columns columns are what it is searched
+    or sorted by; the rest make it covering."""
+    table: str
+    columns: list
+    key_columns: int
+    reasons: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return ("ix_" + self.table + "_" + "_".join(self.columns))[:_MAX_NAME]
+
+    def ddl(self) -> str:
+        columns = ", ".join(f"`{c}`" for c in self.columns)
+        # Online DDL: reports keep reading and writing while it builds
+        return (f"ALTER TABLE `{self.table}` ADD INDEX `{self.name}` ({columns}), "
+                f"ALGORITHM=INPLACE, LOCK=NONE")
+
+    def drop_ddl(self) -> str:
+        return f"ALTER TABLE `{self.table}` DROP INDEX `{self.name}`"
+
+
+@dataclass
+class QueryReport:
+    """Plan, problems and timings of one report query."""
+    name: str
+    query: str
+    plan: dict = None
+    analyze: str | None = None
+    problems: list = field(default_factory=list)
+    before: float | None = None
+    after: float | None = None
+    problems_after: list = field(default_factory=list)
+
+
+# ------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------
+def report_queries(catalog) -> list[tuple]:
+    """(name, query) for every report and every view."""
+    queries = []
+    for report in outland_adventures.REPORTS:
+        name = report.title.replace("Report Sample: ", "")
+        queries.append((name, limit_query(report.sql, report.max_rows + 1)))
+    for view in catalog.views():
+        queries.append((f"view {view}", f"SELECT * FROM `{view}`"))
+    return queries
+
+
+def view_definitions(cursor, database) -> dict:
+    """Lowercase view name -> SQL text, to resolve the aliases in its plan."""
+    cursor.execute(
+        "SELECT TABLE_NAME, VIEW_DEFINITION FROM information_schema.VIEWS "
+        "WHERE TABLE_SCHEMA = %s",
+        (database,)
+    )
+    return {name.lower(): definition or "" for name, definition in cursor.fetchall()}
+
+
+def table_aliases(sql, catalog) -> dict:
+    """Lowercase alias (or table name) -> table name for FROM/JOIN references."""
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(sql):
+        if not catalog.has_table(table):
+            continue
+        aliases[table.lower()] = table
+        if alias and alias.lower() not in _NOT_ALIASES:
+            aliases[alias.lower()] = table
+    return aliases
+
+
+def order_by_columns(sql) -> list[tuple] | None:
+    """
+    (alias, column) for each ORDER BY item of the outermost query, or
+    None when any item is an expression (no index can sort those).
+    """
+    matches = _ORDER_BY.findall(sql)
+    if not matches:
+        return []
+    items = []
+    for item in matches[-1].split(","):
+        match = _ORDER_ITEM.match(item.strip())
+        if not match:
+            return None
+        items.append((match.group(1), match.group(2)))
+    return items
+
+
+# ------------------------------------------------------------
+# Plans
+# ------------------------------------------------------------
+def _strip(query) -> str:
+    return query.strip().rstrip(";")
+
+
+def explain_json(cursor, query) -> dict:
+    cursor.execute("EXPLAIN FORMAT=JSON " + _strip(query))
+    return json.loads(cursor.fetchone()[0])
+
+
+def explain_analyze(cursor, query) -> str | None:
+    """
+    EXPLAIN ANALYZE output (actual rows and time per step), or None on
+    servers older than MySQL 8.0.18. Runs the query.
+    """
+    try:
+        cursor.execute("EXPLAIN ANALYZE " + _strip(query))
+        rows = cursor.fetchall()
+    except mysql.connector.Error:
+        return None
+    return "\n".join(row[0] for row in rows)
+
+
+def plan_tables(plan):
+    """Every table access node in an EXPLAIN FORMAT=JSON plan."""
+    if isinstance(plan, dict):
+        for key, value in plan.items():
+            if key == "table" and isinstance(value, dict):
+                yield value
+            yield from plan_tables(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_tables(value)
+
+
+def _flags(plan, flag):
+    if isinstance(plan, dict):
+        if plan.get(flag) is True:
+            yield plan
+        for value in plan.values():
+            yield from _flags(value, flag)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _flags(value, flag)
+
+
+def find_problems(plan, min_rows=DEFAULT_MIN_ROWS) -> list[Problem]:
+    """
+    Flag the expensive steps of a plan.
+
+    :param plan: EXPLAIN FORMAT=JSON output, parsed
+    :param min_rows: Ignore table accesses reading fewer rows per scan
+    :return: Problems found
+    :rtype: list[Problem]
+    """
+    problems = []
+    largest = 0
+    for node in plan_tables(plan):
+        alias = node.get("table_name")
+        rows = int(node.get("rows_examined_per_scan") or 0)
+        largest = max(largest, rows)
+        if rows < min_rows:
+            continue
+        access = node.get("access_type")
+        if access == "ALL":
+            problems.append(Problem("full_scan", alias, rows,
+                                    "reads every row of the table"))
+        elif access == "index":
+            problems.append(Problem("full_index_scan", alias, rows,
+                                    f"reads all of index {node.get('key')}"))
+        elif (access in ("ref", "eq_ref", "range") and not node.get("using_index")
+              and node.get("key") != "PRIMARY"):
+            problems.append(Problem("not_covering", alias, rows,
+                                    f"finds rows through {node.get('key')} but reads "
+                                    "the table for the other columns"))
+
+    # Sorting or grouping in a temporary table is only worth flagging
+    # when the rows involved are many
+    if largest >= min_rows:
+        for _ in _flags(plan, "using_filesort"):
+            problems.append(Problem("filesort", None, largest,
+                                    "sorts the result instead of reading it in index order"))
+        for _ in _flags(plan, "using_temporary_table"):
+            problems.append(Problem("temporary", None, largest,
+                                    "builds a temporary table to group or sort"))
+    return problems
+
+
+# ------------------------------------------------------------
+# Proposals
+# ------------------------------------------------------------
+def _resolve_table(alias, node, aliases, catalog) -> str | None:
+    if alias and alias.lower() in aliases:
+        return aliases[alias.lower()]
+    if alias and catalog.has_table(alias):
+        return alias
+    # Fall back on the only table that has every column the plan reads
+    used = set(node.get("used_columns") or [])
+    matches = [t for t in catalog.base_tables() if used and used <= set(catalog.column_names(t))]
+    return matches[0] if len(matches) == 1 else None
+
+
+def _with_covering(table, key, node, catalog) -> tuple[list, int]:
+    """Key columns plus the other columns the query reads, if they fit."""
+    # InnoDB secondary indexes already carry the primary key
+    skip = set(key) | set(catalog.primary_key(table))
+    extra = [c for c in node.get("used_columns") or [] if c not in skip]
+    if len(key) + len(extra) <= MAX_INDEX_COLUMNS:
+        return list(key) + extra, len(key)
+    return list(key), len(key)
+
+
+def _lookup_columns(alias, node, catalog, table) -> list:
+    """Columns of this table the plan searches by: index key parts in use,
+    else columns of this table that appear in its join/filter condition."""
+    if node.get("used_key_parts"):
+        return list(node["used_key_parts"])
+    condition = node.get("attached_condition") or ""
+    known = set(catalog.column_names(table))
+    columns = []
+    for column in re.findall(_CONDITION_COLUMN.format(alias=re.escape(alias or "")), condition):
+        if column in known and column not in columns:
+            columns.append(column)
+    return columns
+
+
+def propose_indexes(name, sql, plan, problems, aliases, catalog) -> list[IndexCandidate]:
+    """
+    Propose indexes for the problems of one query.
+
+    :param name: Query name, recorded on each candidate
+    :param sql: Query text (and view definition), for aliases and ORDER BY
+    :param plan: EXPLAIN FORMAT=JSON output, parsed
+    :param problems: find_problems output for the plan
+    :param aliases: table_aliases output for the query
+    :param catalog: SchemaCatalog
+    :return: Index candidates
+    :rtype: list[IndexCandidate]
+    """
+    nodes = {node.get("table_name"): node for node in plan_tables(plan)}
+    candidates = []
+
+    for problem in problems:
+        if problem.alias is None or problem.alias not in nodes:
+            continue
+        node = nodes[problem.alias]
+        table = _resolve_table(problem.alias, node, aliases, catalog)
+        if table is None:
+            continue
+        key = _lookup_columns(problem.alias, node, catalog, table)
+        if not key:
+            continue
+        columns, key_len = _with_covering(table, key, node, catalog)
+        candidates.append(IndexCandidate(table, columns, key_len,
+                                         [f"{name}: {problem.kind} on {problem.alias}"], [name]))
+
+    # A sort on plain columns of one table can come straight off an index
+    order = order_by_columns(sql)
+    if order and any(p.kind == "filesort" for p in problems):
+        order_aliases = {alias.lower() if alias else None for alias, _ in order}
+        if len(order_aliases) == 1:
+            alias = order[0][0]
+            if alias is None and len(nodes) == 1:
+                alias = next(iter(nodes))
+            node = nodes.get(alias, {})
+            table = _resolve_table(alias, node, aliases, catalog) if node else None
+            key = [column for _, column in order]
+            if table and set(key) <= set(catalog.column_names(table)):
+                columns, key_len = _with_covering(table, key, node, catalog)
+                candidates.append(IndexCandidate(table, columns, key_len,
+                                                 [f"{name}: filesort on ORDER BY "
+                                                  f"{', '.join(key)}"], [name]))
+    return candidates
+
+
+def merge_candidates(candidates, catalog) -> list[IndexCandidate]:
+    """
+    Drop duplicates and candidates an existing index already serves. When
+    one candidate is a prefix of another, the longer one serves both.
+    """
+    merged = []
+    for candidate in sorted(candidates, key=lambda c: (c.table.lower(), -len(c.columns))):
+        for kept in merged:
+            if (kept.table.lower() == candidate.table.lower()
+                    and kept.columns[:len(candidate.columns)] == candidate.columns):
+                kept.reasons += [r for r in candidate.reasons if r not in kept.reasons]
+                kept.queries += [q for q in candidate.queries if q not in kept.queries]
+                break
+        else:
+            merged.append(candidate)
+
+    return [candidate for candidate in merged
+            if not any(index["columns"][:len(candidate.columns)] == candidate.columns
+                       for index in catalog.indexes(candidate.table).values())]
+
+
+def superseded_indexes(candidate, catalog) -> list[str]:
+    """Existing non-unique indexes that are a prefix of the candidate."""
+    return [name for name, index in catalog.indexes(candidate.table).items()
+            if name != "PRIMARY" and not index["unique"]
+            and candidate.columns[:len(index["columns"])] == index["columns"]]
+
+
+# ------------------------------------------------------------
+# Timing
+# ------------------------------------------------------------
+def time_query(cursor, query, repeat=3) -> float:
+    """Median seconds to run a query and fetch every row."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(_strip(query))
+        cursor.fetchall()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def analyse(cursor, catalog, database, min_rows=DEFAULT_MIN_ROWS, repeat=3) -> tuple[list, list]:
+    """
+    Explain and time every report query and propose indexes.
+
+    :return: (QueryReport per query, merged IndexCandidates)
+    :rtype: tuple[list, list]
+    """
+    views = view_definitions(cursor, database)
+    reports = []
+    candidates = []
+    for name, query in report_queries(catalog):
+        report = QueryReport(name, query)
+        sql = query
+        if name.startswith("view "):
+            sql += "\n" + views.get(name[5:].lower(), "")
+        report.plan = explain_json(cursor, query)
+        report.analyze = explain_analyze(cursor, query)
+        report.problems = find_problems(report.plan, min_rows)
+        report.before = time_query(cursor, query, repeat)
+        candidates += propose_indexes(name, sql, report.plan, report.problems,
+                                      table_aliases(sql, catalog), catalog)
+        reports.append(report)
+    return reports, merge_candidates(candidates, catalog)
+
+
+def measure_with_indexes(conn, reports, candidates, database, min_rows, repeat, keep) -> None:
+    """Create the candidates, re-explain and re-time every query, then
+    drop the candidates unless keep is set."""
+    cursor = conn.cursor()
+    created = []
+    try:
+        for candidate in candidates:
+            print(f"  creating {candidate.name}...")
+            cursor.execute(candidate.ddl())
+            created.append(candidate)
+        # Fresh statistics so the optimizer considers the new indexes
+        if created:
+            cursor.execute("ANALYZE TABLE " + ", ".join(
+                sorted({f"`{c.table}`" for c in created})))
+            cursor.fetchall()
+        for report in reports:
+            report.problems_after = find_problems(explain_json(cursor, report.query), min_rows)
+            report.after = time_query(cursor, report.query, repeat)
+    finally:
+        if not keep:
+            for candidate in created:
+                cursor.execute(candidate.drop_ddl())
+        cursor.close()
+        # DDL changed the schema; the cached catalog is stale
+        schema_catalog.invalidate(database)
+
+
+# ------------------------------------------------------------
+# Output
+# ------------------------------------------------------------
+def _ms(seconds) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:,.1f} ms"
+
+
+def print_report(reports, candidates, verbose=False) -> None:
+    for report in reports:
+        print(f"\n{report.name}")
+        print(f"  latency: {_ms(report.before)}"
+              + (f" -> {_ms(report.after)} with proposed indexes" if report.after is not None else ""))
+        for problem in report.problems:
+            print(f"  ! {problem}")
+        if report.after is not None:
+            fixed = len(report.problems) - len(report.problems_after)
+            print(f"  {fixed} of {len(report.problems)} problems gone with proposed indexes")
+        if verbose and report.analyze:
+            print("  EXPLAIN ANALYZE:")
+            for line in report.analyze.splitlines():
+                print("    " + line)
+
+    print(f"\n{len(candidates)} index(es) proposed")
+    for candidate in candidates:
+        print(f"  {candidate.table}({', '.join(candidate.columns)})")
+        for reason in candidate.reasons:
+            print(f"    - {reason}")
+
+
+def migration_script(reports, candidates, catalog, database) -> str:
+    """SQL that adds the proposed indexes, with a rollback section."""
+    by_name = {report.name: report for report in reports}
+    lines = [
+        "-- Covering indexes for the report queries.",
+        f"-- Generated by index_advisor.py on {datetime.now():%Y-%m-%d %H:%M}.",
+        "-- Each index lists the queries it serves and their latency before and",
+        "-- after (\"-\" when the run did not measure with the indexes in place).",
+        "-- Run after InitialLoad (1).sql, then: python schema_catalog.py refresh",
+        "",
+        f"USE `{database}`;",
+        "",
+    ]
+    if not candidates:
+        lines.append("-- No indexes proposed.")
+    for candidate in candidates:
+        key = ", ".join(candidate.columns[:candidate.key_columns])
+        cover = ", ".join(candidate.columns[candidate.key_columns:])
+        lines.append(f"-- {candidate.table}: key ({key})" + (f", covering {cover}" if cover else ""))
+        for query in candidate.queries:
+            report = by_name.get(query)
+            if report:
+                lines.append(f"--   {query}: {_ms(report.before)} -> {_ms(report.after)}")
+        for name in superseded_indexes(candidate, catalog):
+            lines.append(f"--   makes {name} redundant; drop it separately once verified")
+        lines.append(candidate.ddl() + ";")
+        lines.append("")
+
+    lines.append("-- Rollback:")
+    for candidate in candidates:
+        lines.append(f"-- {candidate.drop_ddl()};")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the report queries and propose indexes")
+    parser.add_argument("--generate", action="store_true",
+                        help="regenerate data (empties the tables) before analysing")
+    parser.add_argument("--scale", type=int, default=100000,
+                        help="EquipmentTransaction rows for --generate")
+    parser.add_argument("--apply", action="store_true",
+                        help="create the proposed indexes and measure latency with them")
+    parser.add_argument("--keep", action="store_true",
+                        help="with --apply, leave the indexes in place")
+    parser.add_argument("--min-rows", type=int, default=DEFAULT_MIN_ROWS)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per query")
+    parser.add_argument("--output", default="ReportIndexes.sql", help="migration script path")
+    parser.add_argument("--verbose", action="store_true", help="print EXPLAIN ANALYZE output")
+    args = parser.parse_args()
+
+    database = TableData.GetDatabaseSecrets()["DATABASE"]
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        if args.generate:
+            print(f"Generating scale {args.scale:,}...")
+            generate_data.generate(conn, args.scale, reset=True)
+
+        cursor = conn.cursor()
+        catalog = schema_catalog.get_catalog(cursor, database, refresh=True)
+        reports, candidates = analyse(cursor, catalog, database, args.min_rows, args.repeat)
+        cursor.close()
+
+        if args.apply and candidates:
+            print("\nMeasuring with the proposed indexes")
+            measure_with_indexes(conn, reports, candidates, database,
+                                 args.min_rows, args.repeat, args.keep)
+
+        print_report(reports, candidates, args.verbose)
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(migration_script(reports, candidates, catalog, database))
+        print(f"\nMigration script written to {args.output}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
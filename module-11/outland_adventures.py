@@ -10,10 +10,18 @@ module-11/
 """
 
 import os
-import mysql.connector
+import time
 from mysql.connector import Error
 from dotenv import dotenv_values
 
+from connection_pool import get_pool, pool_options, PoolExhaustedError
+from report_runner import run_reports, print_timings
+from column_formatters import TableFormatter
+from table_renderer import render_table
+from instrumentation import configure, instrument, timer
+from query_registry import QueryRegistry
+import report_registry
+
 
 def get_connection():
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -28,15 +36,27 @@ def get_connection():
             f"Make sure .env is in: {script_dir}"
         )
 
-    return mysql.connector.connect(
-        host=secrets["HOST"],
-        user=secrets["USER"],
-        password=secrets["PASSWORD"],
-        database=secrets["DATABASE"]
-    )
+    config = {
+        "host": secrets["HOST"],
+        "user": secrets["USER"],
+        "password": secrets["PASSWORD"],
+        "database": secrets["DATABASE"]
+    }
+
+    # Connections come from the shared pool; close() hands them back.
+    # With METRICS set in .env, every query on them is timed.
+    configure(secrets)
+    return instrument(get_pool(config, **pool_options(secrets)).checkout())
+
+
+# Money and percent formatting for report readability
+MONEY_COLS = report_registry.MONEY_COLS
+PERCENT_COLS = report_registry.PERCENT_COLS
 
 
 def fmt_value(val, col_name=""):
+    # Formats a single cell. print_table formats whole columns with
+    # TableFormatter instead; this stays for one-off values.
     if val is None:
         return ""
 
@@ -44,19 +64,13 @@ def fmt_value(val, col_name=""):
     if hasattr(val, "strftime"):
         return val.strftime("%Y-%m-%d")
 
-    # Money and percent formatting for report readability
-    money_cols = {
-        "InitialCost", "SalePrice", "RentalPrice", "SaleProfit", "TotalRentalRevenue"
-    }
-    percent_cols = {"RentalROI_Percent"}
-
-    if col_name in money_cols:
+    if col_name in MONEY_COLS:
         try:
             return f"${float(val):,.2f}"
         except Exception:
             return str(val)
 
-    if col_name in percent_cols:
+    if col_name in PERCENT_COLS:
         try:
             return f"{float(val):.2f}%"
         except Exception:
@@ -66,7 +80,9 @@ def fmt_value(val, col_name=""):
     return str(val)
 
 
-def print_table(title, rows, columns, max_rows=15):
+def print_table(title, rows, columns, max_rows=15, types=None, limited=False):
+    # limited: the query itself was cut off at max_rows + 1 rows, so the
+    # full row count is unknown
     print("\n" + title)
     print("-" * len(title))
 
@@ -74,202 +90,89 @@ def print_table(title, rows, columns, max_rows=15):
         print("No rows returned.")
         return
 
-    # Convert to list of list strings
-    data = []
-    for r in rows[:max_rows]:
-        data.append([fmt_value(r.get(col), col) for col in columns])
-
-    # Compute column widths
-    widths = []
-    for i, col in enumerate(columns):
-        widest = len(col)
-        for row in data:
-            widest = max(widest, len(row[i]))
-        widths.append(widest)
-
-    # Header
-    header = " | ".join(columns[i].ljust(widths[i]) for i in range(len(columns)))
-    sep = "-+-".join("-" * widths[i] for i in range(len(columns)))
-    print(header)
-    print(sep)
-
-    # Rows
-    for row in data:
-        line = " | ".join(row[i].ljust(widths[i]) for i in range(len(columns)))
-        print(line)
+    # Format column by column, then write the table in one pass
+    with timer("render_seconds", report=title):
+        formatter = TableFormatter(columns, types, MONEY_COLS, PERCENT_COLS)
+        render_table(columns, formatter.format_columns(rows[:max_rows]))
 
     if len(rows) > max_rows:
-        print(f"\n(Showing first {max_rows} rows out of {len(rows)})")
+        if limited:
+            print(f"\n(Showing first {max_rows} rows; more not shown)")
+        else:
+            print(f"\n(Showing first {max_rows} rows out of {len(rows)})")
+
+
+# ------------------------------------------------------------
+# Report definitions live in report_registry. Each one is independent,
+# so they can run in parallel on separate pooled connections.
+# ------------------------------------------------------------
+REPORTS = report_registry.REGISTRY.group("samples")
 
 
-def connect_and_print_reports():
+# Every report is declared once and runs as a prepared statement, so a
+# refresh on an already used pooled connection skips the server's parse.
+# The row limit is a parameter.
+QUERIES = QueryRegistry()
+for _report in REPORTS:
+    QUERIES.register(_report.name, _report.sql + "\nLIMIT %s", params=("limit",))
+
+
+def connect_and_print_reports(show_timings=True):
     connection = None
-    cursor = None
 
     try:
         connection = get_connection()
         print("Successfully connected to MySQL.")
         print("Database:", connection.database)
 
-        cursor = connection.cursor(dictionary=True)
-
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 1: Booking Summary by Trip and Region
-        # ------------------------------------------------------------
-        booking_summary_query = """
-            SELECT
-                t.TripID,
-                t.Destination,
-                t.Region,
-                t.StartDate,
-                t.EndDate,
-                b.BookingDate,
-                b.Status,
-                b.NumberOfParticipants
-            FROM Trip t
-            JOIN Booking b ON t.TripID = b.TripID
-            ORDER BY t.Region, t.StartDate;
-        """
-        cursor.execute(booking_summary_query)
-        booking_rows = cursor.fetchall()
-
-        print_table(
-            title="Report Sample: Booking Summary by Trip and Region",
-            rows=booking_rows,
-            columns=[
-                "TripID",
-                "Destination",
-                "Region",
-                "StartDate",
-                "EndDate",
-                "BookingDate",
-                "Status",
-                "NumberOfParticipants"
-            ],
-            max_rows=12
+        # Hand the connection back so the first report can reuse it
+        connection.close()
+        connection = None
+
+        # Run every report at once, each on its own pooled connection,
+        # then print them in the order they are listed above. LIMIT goes
+        # into the SQL so only the rows shown (plus one, to know there are
+        # more) leave the server.
+        start = time.perf_counter()
+        results = run_reports(
+            get_connection,
+            [(report.title, report.name, {"limit": report.max_rows + 1})
+             for report in REPORTS],
+            registry=QUERIES
         )
-
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 2: Equipment Age and Inventory Status
-        # ------------------------------------------------------------
-        equipment_age_query = """
-            SELECT
-                EquipmentID,
-                Name,
-                Category,
-                EquipCondition,
-                AvailableQuantity,
-                PurchaseDate,
-                TIMESTAMPDIFF(YEAR, PurchaseDate, CURDATE()) AS YearsSincePurchase,
-                CASE
-                    WHEN TIMESTAMPDIFF(YEAR, PurchaseDate, CURDATE()) >= 5 THEN 'Over 5 Years Old'
-                    ELSE 'Under 5 Years Old'
-                END AS AgeStatus
-            FROM Equipment
-            ORDER BY YearsSincePurchase DESC, Name;
-        """
-        cursor.execute(equipment_age_query)
-        equipment_age_rows = cursor.fetchall()
-
-        print_table(
-            title="Report Sample: Equipment Age and Inventory Status",
-            rows=equipment_age_rows,
-            columns=[
-                "EquipmentID",
-                "Name",
-                "Category",
-                "EquipCondition",
-                "AvailableQuantity",
-                "PurchaseDate",
-                "YearsSincePurchase",
-                "AgeStatus"
-            ],
-            max_rows=12
-        )
-
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 3: Equipment Rental vs Purchase Totals
-        # ------------------------------------------------------------
-        rental_vs_purchase_query = """
-            SELECT
-                e.EquipmentID,
-                e.Name,
-                e.Category,
-                SUM(CASE WHEN t.TransactionType = 'Purchase' THEN t.Quantity ELSE 0 END) AS TotalPurchased,
-                SUM(CASE WHEN t.TransactionType = 'Rental' THEN t.Quantity ELSE 0 END) AS TotalRented
-            FROM Equipment e
-            LEFT JOIN EquipmentTransaction t ON e.EquipmentID = t.EquipmentID
-            GROUP BY e.EquipmentID, e.Name, e.Category
-            ORDER BY TotalPurchased DESC, TotalRented DESC;
-        """
-        cursor.execute(rental_vs_purchase_query)
-        rvsp_rows = cursor.fetchall()
-
-        print_table(
-            title="Report Sample: Equipment Rental vs Purchase Totals",
-            rows=rvsp_rows,
-            columns=[
-                "EquipmentID",
-                "Name",
-                "Category",
-                "TotalPurchased",
-                "TotalRented"
-            ],
-            max_rows=12
-        )
-
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 4: Equipment Profit and Rental Performance
-        # Uses the view EquipmentProfitViewWithRentals
-        # ------------------------------------------------------------
-        equipment_profit_query = """
-            SELECT
-                EquipmentID,
-                Name,
-                Category,
-                InitialCost,
-                SalePrice,
-                SaleProfit,
-                RentalPrice,
-                RentalROI_Percent,
-                TotalRentalRevenue,
-                TotalRentalCount
-            FROM EquipmentProfitViewWithRentals
-            ORDER BY EquipmentID;
-        """
-        cursor.execute(equipment_profit_query)
-        profit_rows = cursor.fetchall()
-
-        print_table(
-            title="Report Sample: Equipment Profit and Rental Performance",
-            rows=profit_rows,
-            columns=[
-                "EquipmentID",
-                "Name",
-                "Category",
-                "InitialCost",
-                "SalePrice",
-                "SaleProfit",
-                "RentalPrice",
-                "RentalROI_Percent",
-                "TotalRentalRevenue",
-                "TotalRentalCount"
-            ],
-            max_rows=12
-        )
-
-        print("\nDone. MySQL connection will now close.")
+        wall_seconds = time.perf_counter() - start
+
+        for report, result in zip(REPORTS, results):
+            if result.error is not None:
+                raise result.error
+            types = None
+            if result.types is not None:
+                type_by_name = dict(zip(result.columns, result.types))
+                types = [type_by_name.get(col) for col in report.columns]
+            print_table(
+                title=report.title,
+                rows=result.rows,
+                columns=report.columns,
+                max_rows=report.max_rows,
+                types=types,
+                limited=True
+            )
+
+        if show_timings:
+            print_timings(results, wall_seconds)
+
+        print("\nDone. MySQL connections will now be returned to the pool.")
 
     except Error as e:
         print(f"\nDatabase error: {e}")
     except ValueError as e:
         print(f"\nConfiguration error: {e}")
+    except PoolExhaustedError as e:
+        print(f"\nConnection pool error: {e}")
     finally:
-        if cursor is not None:
-            cursor.close()
         if connection is not None and connection.is_connected():
             connection.close()
-            print("MySQL connection is closed.")
+            print("MySQL connection returned to the pool.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,363 @@
+"""
+pagination.py
+Keyset (seek) pagination over any table or view with a unique key.
+
+Each page is one query of the form
+    SELECT ... FROM Booking WHERE BookingID > <last key seen>
+    ORDER BY BookingID LIMIT <page size + 1>
+so MySQL jumps straight to the start of the page through the primary key
+index and reads only the rows it returns. With LIMIT ... OFFSET the
+server reads and throws away every row before the page, so page 10,000
+costs 10,000 pages of work; here it costs the same as page 1.
+
+Pages hand out opaque cursor strings for the next and previous page.
+They carry the boundary key values and are only valid for the same
+table and key. An approximate total comes from information_schema
+(InnoDB's row estimate) instead of COUNT(*), which would scan the table.
+
+Views have no primary key of their own; pass key= for them (known report
+views are filled in from VIEW_KEYS). Paging a view that aggregates
+(GROUP BY) still builds the whole view per page.
+
+Usage:
+    pager = KeysetPaginator("EquipmentTransaction", page_size=25)
+    page = pager.page(cursor)                   # first page
+    page = pager.page(cursor, page.next_cursor) # next one
+    page = pager.page(cursor, page.prev_cursor) # and back
+
+    python pagination.py Booking --page-size 20
+"""
+
+import argparse
+import base64
+import json
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import DisplayTableData as TableData
+from column_formatters import TableFormatter
+from table_renderer import render_table
+
+
+# Unique key of report views, which information_schema cannot tell us
+VIEW_KEYS = {
+    "equipmentprofitviewwithrentals": ["EquipmentID"],
+    "equipmentageandinventorystatus": ["EquipmentID"],
+    "equipmentprofitsummaryview": ["EquipmentID"],
+}
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+# A LIMIT already at the end of a query, with or without OFFSET
+_TRAILING_LIMIT = re.compile(r"\bLIMIT\s+\d+(\s*(,|OFFSET)\s*\d+)?\s*$", re.IGNORECASE)
+
+
+def quote_identifier(name) -> str:
+    """
+    Backtick-quote a table or column name. Names are interpolated into
+    SQL, so anything but a plain identifier is rejected.
+    """
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f"`{name}`"
+
+
+def limit_query(query, limit) -> str:
+    """
+    Push a row limit into a report query so the server stops after the
+    rows that will be shown. Queries that already end in LIMIT are left
+    alone.
+
+    :param query: SELECT statement, optionally ending in ';'
+    :param limit: Maximum rows to return
+    :return: The query with LIMIT appended
+    :rtype: str
+    """
+    query = query.strip().rstrip(";").rstrip()
+    if _TRAILING_LIMIT.search(query):
+        return query
+    return f"{query}\nLIMIT {int(limit)}"
+
+
+def primary_key(cursor, table_name) -> list[str]:
+    """
+    Primary key columns of a table, in key order. Falls back to VIEW_KEYS
+    for known views.
+
+    :param cursor: MySQL cursor object
+    :param table_name: Table or view name
+    :return: Key column names; empty when none is known
+    :rtype: list[str]
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+        "AND CONSTRAINT_NAME = 'PRIMARY' ORDER BY ORDINAL_POSITION",
+        (table_name,)
+    )
+    key = [row[0] for row in cursor.fetchall()]
+    return key or list(VIEW_KEYS.get(table_name.lower(), []))
+
+
+def approximate_total(cursor, table_name) -> int | None:
+    """
+    InnoDB's estimated row count for a table, read from
+    information_schema. It can be off by a few tens of percent but costs
+    nothing. None for views.
+    """
+    cursor.execute(
+        "SELECT TABLE_ROWS FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table_name,)
+    )
+    row = cursor.fetchone()
+    return None if row is None or row[0] is None else int(row[0])
+
+
+# ------------------------------------------------------------
+# Cursor tokens. Key values are tagged with their type so dates and
+# DECIMALs come back as the same Python values they left as.
+# ------------------------------------------------------------
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    if isinstance(value, timedelta):
+        return {"s": value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {"b": base64.b64encode(value).decode("ascii")}
+    return value
+
+
+def _decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    tag, raw = next(iter(value.items()))
+    if tag == "dt":
+        return datetime.fromisoformat(raw)
+    if tag == "d":
+        return date.fromisoformat(raw)
+    if tag == "n":
+        return Decimal(raw)
+    if tag == "s":
+        return timedelta(seconds=raw)
+    if tag == "b":
+        return base64.b64decode(raw)
+    raise ValueError(f"Unknown cursor value tag {tag}")
+
+
+def encode_cursor(table_name, key, values, direction) -> str:
+    """
+    Build an opaque page cursor.
+
+    :param table_name: Table the cursor belongs to
+    :param key: Key column names
+    :param values: Key values of the boundary row
+    :param direction: "next" (rows after values) or "prev" (rows before)
+    :return: URL-safe token
+    :rtype: str
+    """
+    payload = {"t": table_name.lower(), "k": list(key), "d": direction,
+               "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token) -> dict:
+    """Unpack a cursor from encode_cursor. Raises ValueError if it is damaged."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        payload["v"] = [_decode_value(v) for v in payload["v"]]
+    except (ValueError, KeyError, TypeError, StopIteration) as e:
+        raise ValueError(f"Invalid page cursor: {e}") from e
+    if payload.get("d") not in ("next", "prev"):
+        raise ValueError("Invalid page cursor: bad direction")
+    return payload
+
+
+@dataclass
+class Page:
+    """One page of rows plus the cursors to move away from it."""
+    columns: list = field(default_factory=list)
+    rows: list = field(default_factory=list)
+    # cursor.description type codes, for TableFormatter
+    types: list | None = None
+    # None when there is nothing further in that direction
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    approx_total: int | None = None
+    seconds: float = 0.0
+
+
+class KeysetPaginator:
+    """
+    Pages through a table or view in key order.
+
+    :param table_name: Table or view to browse
+    :param key: Unique key column(s). Looked up from the primary key
+        (or VIEW_KEYS) when None.
+    :param columns: Columns to return; all when None. The key columns
+        are added if missing, since the cursors need them.
+    :param page_size: Rows per page
+    :param with_total: Attach the approximate row count to every page
+    """
+
+    def __init__(self, table_name, key=None, columns=None, page_size=50, with_total=False):
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        self.table_name = table_name
+        self.key = [key] if isinstance(key, str) else (list(key) if key else None)
+        self.columns = list(columns) if columns else None
+        self.page_size = page_size
+        self.with_total = with_total
+        self._table_sql = quote_identifier(table_name)
+
+    def _resolve_key(self, cursor) -> list[str]:
+        if self.key is None:
+            self.key = (TableData.GetCatalog(cursor).primary_key(self.table_name)
+                        or primary_key(cursor, self.table_name))
+            if not self.key:
+                raise ValueError(
+                    f"{self.table_name} has no primary key; pass key= with a unique column"
+                )
+        return self.key
+
+    def _select_list(self) -> str:
+        if self.columns is None:
+            return "*"
+        names = self.columns + [k for k in self.key if k not in self.columns]
+        return ", ".join(quote_identifier(name) for name in names)
+
+    def _query(self, direction, has_boundary) -> str:
+        key_sql = [quote_identifier(k) for k in self.key]
+        order = "ASC" if direction == "next" else "DESC"
+        sql = f"SELECT {self._select_list()} FROM {self._table_sql}"
+        if has_boundary:
+            # A row constructor comparison is still a single index range scan
+            op = ">" if direction == "next" else "<"
+            if len(key_sql) == 1:
+                sql += f" WHERE {key_sql[0]} {op} %s"
+            else:
+                placeholders = ", ".join(["%s"] * len(key_sql))
+                sql += f" WHERE ({', '.join(key_sql)}) {op} ({placeholders})"
+        sql += " ORDER BY " + ", ".join(f"{k} {order}" for k in key_sql)
+        # One extra row tells us whether another page exists
+        sql += f" LIMIT {self.page_size + 1}"
+        return sql
+
+    def cursor_after(self, values) -> str:
+        """Cursor for the page starting just after the given key values."""
+        return encode_cursor(self.table_name, self.key, values, "next")
+
+    def page(self, cursor, token=None) -> Page:
+        """
+        Fetch one page.
+
+        :param cursor: MySQL cursor object (tuple or dictionary rows)
+        :param token: next_cursor or prev_cursor of an earlier page;
+            None for the first page
+        :return: The page
+        :rtype: Page
+        """
+        key = self._resolve_key(cursor)
+        start = time.perf_counter()
+
+        if token is None:
+            direction, values = "next", None
+        else:
+            payload = decode_cursor(token)
+            if payload["t"] != self.table_name.lower() or payload["k"] != key:
+                raise ValueError("Page cursor belongs to a different table or key")
+            direction, values = payload["d"], payload["v"]
+
+        cursor.execute(self._query(direction, values is not None), values or ())
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+        types = [desc[1] for desc in cursor.description]
+
+        more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if direction == "prev":
+            # Read backwards from the boundary; show in key order
+            rows.reverse()
+
+        page = Page(columns=columns, rows=rows, types=types)
+        if rows:
+            positions = [columns.index(k) for k in key]
+            first, last = rows[0], rows[-1]
+            if isinstance(first, dict):
+                first_key = [first[k] for k in key]
+                last_key = [last[k] for k in key]
+            else:
+                first_key = [first[i] for i in positions]
+                last_key = [last[i] for i in positions]
+
+            # Coming forward from a cursor means rows exist behind us, and
+            # coming backward means rows exist ahead
+            if (direction == "next" and more) or direction == "prev":
+                page.next_cursor = encode_cursor(self.table_name, key, last_key, "next")
+            if (direction == "prev" and more) or (direction == "next" and values is not None):
+                page.prev_cursor = encode_cursor(self.table_name, key, first_key, "prev")
+
+        if self.with_total:
+            page.approx_total = approximate_total(cursor, self.table_name)
+        page.seconds = time.perf_counter() - start
+        return page
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browse a table page by page")
+    parser.add_argument("table")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--key", nargs="+", help="unique key column(s), for views")
+    args = parser.parse_args()
+
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    cursor = conn.cursor()
+    pager = KeysetPaginator(args.table, key=args.key, page_size=args.page_size,
+                            with_total=True)
+    token = None
+    number = 1
+    try:
+        while True:
+            page = pager.page(cursor, token)
+            print(f"\n--- {args.table} page {number} "
+                  f"(about {page.approx_total or '?'} rows, {page.seconds * 1000:.1f} ms) ---")
+            if page.rows:
+                formatter = TableFormatter(page.columns, page.types)
+                render_table(page.columns, formatter.format_columns(page.rows))
+            else:
+                print("No rows.")
+
+            choices = []
+            if page.next_cursor:
+                choices.append("[n]ext")
+            if page.prev_cursor:
+                choices.append("[p]rev")
+            answer = input(" ".join(choices + ["[q]uit"]) + ": ").strip().lower()
+            if answer == "n" and page.next_cursor:
+                token, number = page.next_cursor, number + 1
+            elif answer == "p" and page.prev_cursor:
+                token, number = page.prev_cursor, number - 1
+            elif answer == "q":
+                break
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
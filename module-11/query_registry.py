@@ -0,0 +1,287 @@
+"""
+query_registry.py
+Named queries, declared once and run as server-side prepared statements.
+
+A plain cursor sends the SQL text on every call and the server parses
+and plans it again each time. The registry gives every statement a name,
+prepares it once per pooled connection (cursor(prepared=True)) and keeps
+that prepared cursor for the next call on the same connection, so a
+repeated report refresh only sends the parameters.
+
+Values always go in as parameters (%s). Table and column names cannot be
+parameters, so they are written as {placeholders} in the SQL and only
+filled in after checking them: against the schema catalog when one is
+given, otherwise against the identifier pattern. They are then
+backtick-quoted.
+
+Usage:
+    QUERIES = QueryRegistry()
+    QUERIES.register("short_films",
+                     "SELECT film_name FROM film WHERE film_runtime < %s",
+                     params=("max_runtime",))
+    QUERIES.register("select_all", "SELECT * FROM {table}", table="table")
+
+    columns, rows, types = QUERIES.fetch(conn, "short_films", {"max_runtime": 120})
+    sql = QUERIES.sql("select_all", {"table": "Trip"}, catalog)
+"""
+
+import re
+import threading
+from dataclasses import dataclass, field
+
+import mysql.connector
+from mysql.connector import errorcode
+
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+IDENTIFIER_KINDS = ("table", "column")
+
+# Cached statements kept per connection before the oldest are dropped
+MAX_STATEMENTS_PER_CONNECTION = 64
+
+# Connections tracked before the oldest one's statements are dropped
+# (connections the pool closed never come back under the same id)
+MAX_CONNECTIONS = 32
+
+# Errors after which a cached prepared statement is thrown away and the
+# statement prepared again on the same connection
+_REPREPARE_ERRORS = {errorcode.ER_UNKNOWN_STMT_HANDLER, errorcode.ER_NEED_REPREPARE}
+
+
+@dataclass(frozen=True)
+class NamedQuery:
+    """One declared statement."""
+    name: str
+    sql: str
+    # Names of the %s parameters, in order
+    params: tuple = ()
+    # {placeholder} -> "table" or "column"
+    identifiers: dict = field(default_factory=dict)
+
+    def bind(self, values) -> tuple:
+        """Parameter values in statement order, from a mapping or a sequence."""
+        if values is None:
+            values = ()
+        if isinstance(values, dict):
+            missing = [p for p in self.params if p not in values]
+            if missing:
+                raise ValueError(f"{self.name}: missing parameter(s) {', '.join(missing)}")
+            return tuple(values[p] for p in self.params)
+        values = tuple(values)
+        if self.params and len(values) != len(self.params):
+            raise ValueError(f"{self.name}: expected {len(self.params)} parameter(s), "
+                             f"got {len(values)}")
+        return values
+
+
+class QueryRegistry:
+    """
+    Declared statements and their prepared cursors, per connection.
+
+    :param catalog: Optional SchemaCatalog used to check identifiers
+    """
+
+    def __init__(self, catalog=None):
+        self.catalog = catalog
+        self._queries = {}
+        # connection_id -> {(name, identifiers): prepared cursor}
+        self._statements = {}
+        self._lock = threading.Lock()
+        self.stats = {"prepares": 0, "executions": 0, "reprepares": 0}
+
+    # ------------------------------------------------------------
+    # Declaring
+    # ------------------------------------------------------------
+    def register(self, name, sql, params=(), **identifiers) -> NamedQuery:
+        """
+        Declare a statement.
+
+        :param name: Name used to run it
+        :param sql: Statement with %s parameters and {placeholder} identifiers
+        :param params: Names of the %s parameters, in order
+        :param identifiers: placeholder="table" or placeholder="column"
+        :return: The declared query
+        :rtype: NamedQuery
+        :raises ValueError: for a name already used for other SQL, or
+            placeholders that do not match identifiers
+        """
+        placeholders = set(_PLACEHOLDER.findall(sql))
+        if placeholders != set(identifiers):
+            raise ValueError(f"{name}: placeholders {sorted(placeholders)} do not match "
+                             f"identifiers {sorted(identifiers)}")
+        for kind in identifiers.values():
+            if kind not in IDENTIFIER_KINDS:
+                raise ValueError(f"{name}: identifier kind must be one of {IDENTIFIER_KINDS}")
+
+        query = NamedQuery(name, sql.strip().rstrip(";"), tuple(params), dict(identifiers))
+        with self._lock:
+            existing = self._queries.get(name)
+            if existing is not None and existing != query:
+                raise ValueError(f"Query {name!r} is already registered with different SQL")
+            self._queries[name] = query
+        return query
+
+    def get(self, name) -> NamedQuery:
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise KeyError(f"No query registered as {name!r}") from None
+
+    def names(self) -> list[str]:
+        return sorted(self._queries)
+
+    # ------------------------------------------------------------
+    # Identifiers
+    # ------------------------------------------------------------
+    def sql(self, name, identifiers=None, catalog=None) -> str:
+        """
+        The statement text with its identifiers checked and filled in.
+
+        :param name: Registered query name
+        :param identifiers: {placeholder: table or column name}
+        :param catalog: SchemaCatalog to check names against; defaults to
+            the registry's
+        :raises ValueError: for a missing, malformed, or unknown name
+        """
+        query = self.get(name)
+        if not query.identifiers:
+            return query.sql
+        identifiers = identifiers or {}
+        catalog = catalog or self.catalog
+
+        tables = []
+        values = {}
+        # Tables first, so columns can be checked against them
+        for placeholder, kind in sorted(query.identifiers.items(), key=lambda i: i[1] != "table"):
+            value = identifiers.get(placeholder)
+            if not isinstance(value, str) or not _IDENTIFIER.match(value):
+                raise ValueError(f"{name}: invalid {kind} name {value!r}")
+            if catalog is not None:
+                value = self._check(catalog, kind, value, tables)
+            if kind == "table":
+                tables.append(value)
+            values[placeholder] = f"`{value}`"
+        return query.sql.format(**values)
+
+    @staticmethod
+    def _check(catalog, kind, value, tables) -> str:
+        """Catalog spelling of a name, or ValueError if it does not exist."""
+        if kind == "table":
+            for table in catalog.tables():
+                if table.lower() == value.lower():
+                    return table
+            raise ValueError(f"Unknown table {value!r}")
+        candidates = tables or catalog.tables()
+        for table in candidates:
+            for column in catalog.column_names(table):
+                if column.lower() == value.lower():
+                    return column
+        raise ValueError(f"Unknown column {value!r}")
+
+    # ------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------
+    def cursor(self, conn, name, identifiers=None):
+        """
+        The prepared cursor for a statement on this connection, prepared
+        on first use and reused afterwards.
+        """
+        key = (name, tuple(sorted((identifiers or {}).items())))
+        statements = self._connection_statements(conn)
+        cursor = statements.get(key)
+        if cursor is None:
+            cursor = conn.cursor(prepared=True)
+            statements[key] = cursor
+            with self._lock:
+                self.stats["prepares"] += 1
+            if len(statements) > MAX_STATEMENTS_PER_CONNECTION:
+                oldest = next(iter(statements))
+                self._close_cursor(statements.pop(oldest))
+        return cursor
+
+    def execute(self, conn, name, params=None, identifiers=None):
+        """
+        Run a statement on its prepared cursor and return the cursor.
+        The caller reads the rows; the cursor stays open for reuse.
+
+        :param conn: MySQL or pooled connection
+        :param name: Registered query name
+        :param params: Parameter values, a mapping or a sequence
+        :param identifiers: {placeholder: name} for {placeholder}s
+        """
+        query = self.get(name)
+        sql = self.sql(name, identifiers)
+        values = query.bind(params)
+        cursor = self.cursor(conn, name, identifiers)
+        try:
+            cursor.execute(sql, values)
+        except mysql.connector.Error as err:
+            if err.errno not in _REPREPARE_ERRORS:
+                raise
+            # The server lost the statement (e.g. after a reconnect)
+            self.forget(conn, name)
+            cursor = self.cursor(conn, name, identifiers)
+            cursor.execute(sql, values)
+            with self._lock:
+                self.stats["reprepares"] += 1
+        with self._lock:
+            self.stats["executions"] += 1
+        return cursor
+
+    def fetch(self, conn, name, params=None, identifiers=None,
+              dictionary=False) -> tuple[list, list, list]:
+        """
+        Run a statement and read every row.
+
+        :param dictionary: Return rows as dictionaries keyed by column name
+        :return: (column names, rows, type codes)
+        :rtype: tuple[list, list, list]
+        """
+        cursor = self.execute(conn, name, params, identifiers)
+        rows = cursor.fetchall()
+        description = cursor.description or ()
+        columns = [d[0] for d in description]
+        if dictionary:
+            rows = [dict(zip(columns, row)) for row in rows]
+        return columns, rows, [d[1] for d in description]
+
+    def forget(self, conn=None, name=None) -> None:
+        """
+        Close cached prepared statements: for one connection (and only one
+        query name, if given), or for every connection.
+        """
+        with self._lock:
+            if conn is None:
+                groups = list(self._statements.values())
+                self._statements = {}
+            else:
+                groups = [self._statements.get(conn.connection_id, {})]
+        for statements in groups:
+            for key in [k for k in statements if name is None or k[0] == name]:
+                self._close_cursor(statements.pop(key))
+
+    def _connection_statements(self, conn) -> dict:
+        # Prepared statements live in the server session, so they are
+        # kept by the session's id; the id does not change while the
+        # connection moves in and out of the pool
+        connection_id = conn.connection_id
+        stale = []
+        with self._lock:
+            statements = self._statements.get(connection_id)
+            if statements is None:
+                statements = self._statements[connection_id] = {}
+                while len(self._statements) > MAX_CONNECTIONS:
+                    stale.append(self._statements.pop(next(iter(self._statements))))
+        for group in stale:
+            for cursor in group.values():
+                self._close_cursor(cursor)
+        return statements
+
+    @staticmethod
+    def _close_cursor(cursor) -> None:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
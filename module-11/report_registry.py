@@ -0,0 +1,321 @@
+"""
+report_registry.py
+Every report, declared once: its SQL (or the view it reads), the columns
+shown and how they are formatted, and how often it should be refreshed.
+
+The scripts that used to carry their own copy of a query read it from
+here instead:
+    outland_adventures.py            the "samples" group
+    EquipmentProfitReport.py         equipment_profit / equipment_profit_summary
+    EquipmentAgeAndStatusReport.py   equipment_age_status
+and report_scheduler.py pre-computes all of them on their refresh
+interval.
+
+Usage:
+    definition = REGISTRY.get("equipment_profit")
+    cursor.execute(definition.sql)
+    render(definition, columns, rows, types)
+"""
+
+import threading
+from dataclasses import dataclass
+
+from column_formatters import TableFormatter
+from table_renderer import render_table
+
+
+# Refresh interval for reports that do not set one (seconds)
+DEFAULT_REFRESH_SECONDS = 300
+
+# Money and percent formatting shared by the equipment reports
+MONEY_COLS = frozenset({
+    "InitialCost", "SalePrice", "RentalPrice", "SaleProfit", "TotalRentalRevenue",
+    "TotalRevenue",
+})
+PERCENT_COLS = frozenset({"RentalROI_Percent"})
+
+
+@dataclass(frozen=True)
+class ReportDefinition:
+    """One report."""
+    # Short identifier used on the command line and as the snapshot name
+    name: str
+    title: str
+    # Either the SQL text or the view whose rows are the report
+    query: str = None
+    view: str = None
+    # Columns shown, in order; all result columns when None
+    columns: tuple = None
+    # Rows shown; all when None
+    max_rows: int = None
+    money_columns: frozenset = MONEY_COLS
+    percent_columns: frozenset = PERCENT_COLS
+    # False prints "column: value" pairs per row instead of a table
+    show_astable: bool = True
+    refresh_seconds: float = DEFAULT_REFRESH_SECONDS
+    groups: tuple = ()
+    description: str = ""
+
+    def __post_init__(self):
+        if (self.query is None) == (self.view is None):
+            raise ValueError(f"Report {self.name!r} needs exactly one of query or view")
+
+    @property
+    def sql(self) -> str:
+        """The statement that produces the report's rows."""
+        if self.query is not None:
+            return self.query.strip().rstrip(";")
+        return f"SELECT * FROM `{self.view}`"
+
+    def formatter(self, columns, types=None) -> TableFormatter:
+        return TableFormatter(columns, types, self.money_columns, self.percent_columns)
+
+
+class ReportRegistry:
+    """Report definitions by name, in the order they were registered."""
+
+    def __init__(self):
+        self._reports = {}
+        self._lock = threading.Lock()
+
+    def register(self, definition) -> ReportDefinition:
+        """
+        Add a report.
+
+        :raises ValueError: if the name is already used by another definition
+        """
+        with self._lock:
+            existing = self._reports.get(definition.name)
+            if existing is not None and existing != definition:
+                raise ValueError(f"Report {definition.name!r} is already registered")
+            self._reports[definition.name] = definition
+        return definition
+
+    def get(self, name) -> ReportDefinition:
+        try:
+            return self._reports[name]
+        except KeyError:
+            raise KeyError(f"No report registered as {name!r}; "
+                           f"known: {', '.join(self._reports)}") from None
+
+    def all(self) -> list[ReportDefinition]:
+        return list(self._reports.values())
+
+    def group(self, group) -> list[ReportDefinition]:
+        """Reports in a group, in registration order."""
+        return [d for d in self._reports.values() if group in d.groups]
+
+    def names(self) -> list[str]:
+        return list(self._reports)
+
+
+def render(definition, columns, rows, types=None, max_rows=None) -> None:
+    """
+    Print a report's rows the way its definition asks: a table of the
+    chosen columns, or "column: value" pairs.
+
+    :param definition: ReportDefinition
+    :param columns: Result column names
+    :param rows: Result rows (tuples or dictionaries)
+    :param types: cursor.description type codes, in columns order
+    :param max_rows: Rows shown; the definition's max_rows when None
+    """
+    # Slice first: rows may be a mapped snapshot that decodes on access
+    max_rows = max_rows if max_rows is not None else definition.max_rows
+    if max_rows is not None:
+        rows = rows[:max_rows]
+
+    shown = list(definition.columns or columns)
+    if definition.columns is not None or rows and isinstance(rows[0], dict):
+        # Pick the chosen columns out of each row
+        positions = [columns.index(c) for c in shown]
+        rows = [tuple(row[c] for c in shown) if isinstance(row, dict)
+                else tuple(row[p] for p in positions) for row in rows]
+        if types is not None:
+            types = [types[p] for p in positions]
+
+    print(f"\n--- {definition.title} ---")
+    if not rows:
+        print("No rows returned.")
+        return
+    cells = definition.formatter(shown, types).format_columns(rows)
+    if definition.show_astable:
+        render_table(shown, cells)
+    else:
+        for i in range(len(rows)):
+            for name, column in zip(shown, cells):
+                print(f"{name}: {column[i]}")
+            print("-" * 20)
+
+
+# ------------------------------------------------------------
+# The reports
+# ------------------------------------------------------------
+REGISTRY = ReportRegistry()
+
+REGISTRY.register(ReportDefinition(
+    name="booking_summary",
+    title="Report Sample: Booking Summary by Trip and Region",
+    query="""
+        SELECT
+            t.TripID,
+            t.Destination,
+            t.Region,
+            t.StartDate,
+            t.EndDate,
+            b.BookingDate,
+            b.Status,
+            b.NumberOfParticipants
+        FROM Trip t
+        JOIN Booking b ON t.TripID = b.TripID
+        ORDER BY t.Region, t.StartDate;
+    """,
+    columns=(
+        "TripID",
+        "Destination",
+        "Region",
+        "StartDate",
+        "EndDate",
+        "BookingDate",
+        "Status",
+        "NumberOfParticipants"
+    ),
+    max_rows=12,
+    refresh_seconds=120,
+    groups=("samples",),
+))
+
+REGISTRY.register(ReportDefinition(
+    name="equipment_age",
+    title="Report Sample: Equipment Age and Inventory Status",
+    query="""
+        SELECT
+            EquipmentID,
+            Name,
+            Category,
+            EquipCondition,
+            AvailableQuantity,
+            PurchaseDate,
+            TIMESTAMPDIFF(YEAR, PurchaseDate, CURDATE()) AS YearsSincePurchase,
+            CASE
+                WHEN TIMESTAMPDIFF(YEAR, PurchaseDate, CURDATE()) >= 5 THEN 'Over 5 Years Old'
+                ELSE 'Under 5 Years Old'
+            END AS AgeStatus
+        FROM Equipment
+        ORDER BY YearsSincePurchase DESC, Name;
+    """,
+    columns=(
+        "EquipmentID",
+        "Name",
+        "Category",
+        "EquipCondition",
+        "AvailableQuantity",
+        "PurchaseDate",
+        "YearsSincePurchase",
+        "AgeStatus"
+    ),
+    max_rows=12,
+    refresh_seconds=3600,
+    groups=("samples",),
+))
+
+REGISTRY.register(ReportDefinition(
+    name="rental_vs_purchase",
+    title="Report Sample: Equipment Rental vs Purchase Totals",
+    # Reads the transaction rollups plus the live tail, not the full history
+    query="""
+        SELECT
+            e.EquipmentID,
+            e.Name,
+            e.Category,
+            SUM(CASE WHEN t.TransactionType = 'Purchase' THEN t.Quantity ELSE 0 END) AS TotalPurchased,
+            SUM(CASE WHEN t.TransactionType = 'Rental' THEN t.Quantity ELSE 0 END) AS TotalRented
+        FROM Equipment e
+        LEFT JOIN EquipmentTransactionTotals t ON e.EquipmentID = t.EquipmentID
+        GROUP BY e.EquipmentID, e.Name, e.Category
+        ORDER BY TotalPurchased DESC, TotalRented DESC;
+    """,
+    columns=(
+        "EquipmentID",
+        "Name",
+        "Category",
+        "TotalPurchased",
+        "TotalRented"
+    ),
+    max_rows=12,
+    refresh_seconds=300,
+    groups=("samples",),
+))
+
+REGISTRY.register(ReportDefinition(
+    name="equipment_profit_sample",
+    title="Report Sample: Equipment Profit and Rental Performance",
+    # Uses the view EquipmentProfitViewWithRentals
+    query="""
+        SELECT
+            EquipmentID,
+            Name,
+            Category,
+            InitialCost,
+            SalePrice,
+            SaleProfit,
+            RentalPrice,
+            RentalROI_Percent,
+            TotalRentalRevenue,
+            TotalRentalCount
+        FROM EquipmentProfitViewWithRentals
+        ORDER BY EquipmentID;
+    """,
+    columns=(
+        "EquipmentID",
+        "Name",
+        "Category",
+        "InitialCost",
+        "SalePrice",
+        "SaleProfit",
+        "RentalPrice",
+        "RentalROI_Percent",
+        "TotalRentalRevenue",
+        "TotalRentalCount"
+    ),
+    max_rows=12,
+    refresh_seconds=300,
+    groups=("samples",),
+))
+
+REGISTRY.register(ReportDefinition(
+    name="equipment_profit",
+    title="EquipmentProfitViewWithRentals",
+    view="EquipmentProfitViewWithRentals",
+    refresh_seconds=300,
+    groups=("equipment",),
+    description="Equipment financials with rental revenue (EquipmentProfitReport.py)",
+))
+
+REGISTRY.register(ReportDefinition(
+    name="equipment_profit_summary",
+    title="EquipmentProfitSummaryView",
+    view="EquipmentProfitSummaryView",
+    refresh_seconds=300,
+    groups=("equipment",),
+    description="Same as equipment_profit, from the incrementally maintained summary",
+))
+
+REGISTRY.register(ReportDefinition(
+    name="equipment_age_status",
+    title="EquipmentAgeAndInventoryStatus",
+    view="EquipmentAgeAndInventoryStatus",
+    show_astable=False,
+    refresh_seconds=3600,
+    groups=("equipment",),
+    description="Equipment age and inventory level (EquipmentAgeAndStatusReport.py)",
+))
+
+REGISTRY.register(ReportDefinition(
+    name="region_booking_participants",
+    title="RegionBookingParticipantsReport",
+    view="RegionBookingParticipantsReport",
+    refresh_seconds=120,
+    groups=("bookings",),
+    description="Bookings, participants and revenue per region, destination and month",
+))
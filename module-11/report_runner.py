@@ -0,0 +1,141 @@
+"""
+report_runner.py
+Runs independent report queries at the same time, each on its own pooled
+connection, and hands the results back in the order the reports were
+listed. Total time approaches the slowest single query instead of the sum
+of all of them.
+
+Usage:
+    results = run_reports(get_connection, [
+        ("Report A", "SELECT ..."),
+        ("Report B", "SELECT ..."),
+    ])
+    for result in results:
+        print_table(result.title, result.rows, result.columns)
+    print_timings(results)
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReportResult:
+    """Rows and timings for one report query."""
+    title: str
+    query: str
+    columns: list = field(default_factory=list)
+    rows: list = field(default_factory=list)
+    # cursor.description type codes; None when the rows came from a cache
+    types: list | None = None
+    checkout_seconds: float = 0.0
+    query_seconds: float = 0.0
+    error: Exception | None = None
+
+
+def run_report(get_connection, title, query, dictionary=True, cache=None,
+               params=None, registry=None) -> ReportResult:
+    """
+    Run one report query on its own connection.
+    Errors are stored on the result instead of raised, so one failing
+    report does not stop the others.
+
+    :param get_connection: Function returning a (pooled) connection
+    :param title: Report title
+    :param query: SQL to run, or a query name when registry is given
+    :param dictionary: Return rows as dictionaries keyed by column name
+    :param cache: Optional ResultCache to answer repeat queries from memory
+    :param params: Query parameters
+    :param registry: Optional QueryRegistry; the query then runs as a
+        prepared statement that is reused on the same connection
+    :return: The rows, column names and timings
+    :rtype: ReportResult
+    """
+    result = ReportResult(title=title, query=query)
+    connection = None
+    cursor = None
+
+    try:
+        start = time.perf_counter()
+        connection = get_connection()
+        result.checkout_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if registry is not None:
+            # The prepared cursor belongs to the registry and stays open
+            result.columns, result.rows, result.types = registry.fetch(
+                connection, query, params, dictionary=dictionary)
+        elif cache is not None:
+            cursor = connection.cursor(dictionary=dictionary)
+            result.columns, result.rows = cache.execute(cursor, query, params)
+        else:
+            cursor = connection.cursor(dictionary=dictionary)
+            cursor.execute(query, params)
+            result.rows = cursor.fetchall()
+            result.columns = [desc[0] for desc in cursor.description]
+            result.types = [desc[1] for desc in cursor.description]
+        result.query_seconds = time.perf_counter() - start
+    except Exception as e:
+        result.error = e
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if connection is not None:
+            connection.close()
+
+    return result
+
+
+def run_reports(get_connection, reports, max_workers=None, dictionary=True,
+                cache=None, registry=None) -> list[ReportResult]:
+    """
+    Run several report queries concurrently.
+
+    :param get_connection: Function returning a (pooled) connection.
+        Called once per report from worker threads.
+    :param reports: List of (title, query) pairs, or (title, query,
+        params) triples
+    :param max_workers: Thread count, defaults to one per report
+    :param dictionary: Return rows as dictionaries keyed by column name
+    :param cache: Optional ResultCache shared by all the reports
+    :param registry: Optional QueryRegistry the query names belong to
+    :return: One result per report, in the same order as reports
+    :rtype: list[ReportResult]
+    """
+    if not reports:
+        return []
+
+    workers = max_workers or len(reports)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_report, get_connection, title, query, dictionary, cache,
+                            params[0] if params else None, registry)
+            for title, query, *params in reports
+        ]
+        # Collect in submission order so output stays deterministic
+        return [future.result() for future in futures]
+
+
+def print_timings(results, wall_seconds=None) -> None:
+    """
+    Print a per-report timing breakdown.
+
+    :param results: Results from run_reports
+    :param wall_seconds: Measured total time, shown next to the serial sum
+    """
+    print("\nReport timings")
+    print("--------------")
+
+    width = max(len(r.title) for r in results) if results else 10
+    print(f"{'Report'.ljust(width)} | {'Checkout (s)':>12} | {'Query (s)':>10} | {'Rows':>8}")
+    print(f"{'-' * width}-+-{'-' * 12}-+-{'-' * 10}-+-{'-' * 8}")
+    for r in results:
+        rows = "error" if r.error is not None else str(len(r.rows))
+        print(f"{r.title.ljust(width)} | {r.checkout_seconds:>12.4f} | "
+              f"{r.query_seconds:>10.4f} | {rows:>8}")
+
+    serial = sum(r.checkout_seconds + r.query_seconds for r in results)
+    print(f"\nSum of report times: {serial:.4f}s")
+    if wall_seconds is not None:
+        print(f"Wall time (parallel): {wall_seconds:.4f}s")
@@ -0,0 +1,327 @@
+"""
+report_scheduler.py
+Long-running process that pre-computes every report in report_registry
+on its refresh interval into the snapshot store, so reading a report is
+instant and never waits on MySQL.
+
+The database never sees a burst of report queries at once:
+    - the first runs are spread evenly over --warmup seconds instead of
+      all starting together
+    - each later run is due one refresh interval after the previous one
+      finished, give or take --jitter (10%), so reports that share an
+      interval drift apart instead of firing in lockstep
+    - at most --concurrency report queries run at once; due reports
+      wait their turn
+    - a report still running is never queued again, and a failing one
+      backs off (RETRY_SECONDS, doubling, up to its interval) while its
+      previous snapshot stays readable
+
+Before a report that reads EquipmentTransaction is refreshed, new
+transactions are folded into the rollups (transaction_rollups.py), so
+EquipmentTransactionTotals only scans a short live tail.
+
+Usage:
+    python report_scheduler.py run [--group samples] [--concurrency 2]
+    python report_scheduler.py list
+    python report_scheduler.py show equipment_profit
+    python report_scheduler.py show equipment_profit --where "TotalRentalCount>10"
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import DisplayTableData as TableData
+import transaction_rollups as Rollups
+from report_registry import REGISTRY, render
+from report_runner import run_report
+from result_cache import tables_for_query
+from snapshot_store import Snapshot, SnapshotStore, snapshot_folder
+
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_JITTER = 0.1
+DEFAULT_WARMUP_SECONDS = 10.0
+
+# First retry delay after a failed refresh; doubles per failure
+RETRY_SECONDS = 15.0
+
+
+class ReportScheduler:
+    """
+    Refreshes reports into a SnapshotStore on their intervals.
+
+    :param reports: ReportDefinitions to keep fresh
+    :param store: SnapshotStore the results go to
+    :param get_connection: Function returning a (pooled) connection
+    :param max_concurrent: Most report queries running at once
+    :param jitter: Fraction of the interval each next run is moved by, at random
+    :param warmup_seconds: The first runs are spread over this long
+    """
+
+    def __init__(self, reports, store, get_connection, max_concurrent=DEFAULT_CONCURRENCY,
+                 jitter=DEFAULT_JITTER, warmup_seconds=DEFAULT_WARMUP_SECONDS, log=print):
+        self.reports = {d.name: d for d in reports}
+        self.store = store
+        self.get_connection = get_connection
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self.log = log or (lambda message: None)
+
+        self._rng = random.Random()
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._stopped = threading.Event()
+        self._thread = None
+        # (due, sequence, name); due is time.monotonic()
+        self._queue = []
+        self._running = set()
+        self._failures = {}
+        self._last_seconds = {}
+
+        now = time.monotonic()
+        step = warmup_seconds / max(len(self.reports), 1)
+        for i, name in enumerate(self.reports):
+            self._push(now + i * step, name)
+
+    # ------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------
+    def start(self) -> None:
+        """Run the scheduler on a background thread."""
+        self._thread = threading.Thread(target=self.run_forever, name="report-scheduler",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, wait=True) -> None:
+        self._stopped.set()
+        with self._cond:
+            self._cond.notify_all()
+        if wait and self._thread is not None:
+            self._thread.join()
+
+    def run_forever(self) -> None:
+        """Dispatch due refreshes until stop() is called."""
+        with ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                thread_name_prefix="report-refresh") as executor:
+            while not self._stopped.is_set():
+                name = self._next_due()
+                if name is None:
+                    break
+                # Wait for a free slot; later due reports queue behind this one
+                while not self._slots.acquire(timeout=0.5):
+                    if self._stopped.is_set():
+                        return
+                executor.submit(self._run, name)
+
+    def _next_due(self):
+        """Block until a report is due and return its name (None once stopped)."""
+        with self._cond:
+            while not self._stopped.is_set():
+                if self._queue:
+                    due, _, name = self._queue[0]
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self._running.add(name)
+                        return name
+                else:
+                    wait = None
+                self._cond.wait(wait)
+        return None
+
+    def _run(self, name) -> None:
+        definition = self.reports[name]
+        try:
+            snapshot = self.refresh(definition)
+        except Exception as e:
+            # e.g. the snapshot file could not be written; retry like a failed query
+            self.store.record_error(name, e)
+            self.log(f"{_now()} {name}: FAILED ({e})")
+            snapshot = None
+        finally:
+            self._slots.release()
+
+        failures = 0 if snapshot is not None else self._failures.get(name, 0) + 1
+        self._failures[name] = failures
+        if failures:
+            delay = min(RETRY_SECONDS * 2 ** (failures - 1), definition.refresh_seconds)
+        else:
+            delay = definition.refresh_seconds * (1 + self._rng.uniform(-self.jitter, self.jitter))
+        with self._cond:
+            self._running.discard(name)
+            self._push(time.monotonic() + delay, name)
+            self._cond.notify_all()
+
+    def refresh(self, definition) -> Snapshot | None:
+        """
+        Run one report now and store its snapshot.
+
+        :return: The new snapshot, or None if the query failed
+        :rtype: Snapshot | None
+        """
+        if "EquipmentTransaction" in tables_for_query(definition.sql):
+            self.apply_rollups()
+        result = run_report(self.get_connection, definition.title, definition.sql,
+                            dictionary=False)
+        if result.error is not None:
+            self.store.record_error(definition.name, result.error)
+            self.log(f"{_now()} {definition.name}: FAILED ({result.error})")
+            return None
+        snapshot = Snapshot.from_result(definition.name, result, definition.refresh_seconds)
+        self.store.put(snapshot)
+        self._last_seconds[definition.name] = result.query_seconds
+        self.log(f"{_now()} {definition.name}: {len(snapshot.rows):,} rows "
+                 f"in {result.query_seconds * 1000:.0f} ms")
+        return snapshot
+
+    def apply_rollups(self) -> None:
+        """
+        Fold new transactions into the rollups. A failure is only logged:
+        the report is still right, it just scans a longer live tail.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            if conn is None:
+                return
+            new_rows, watermark = Rollups.apply_deltas(conn)
+            if new_rows:
+                self.log(f"{_now()} rollups: {new_rows:,} transactions, "
+                         f"watermark {watermark}")
+        except Exception as e:
+            self.log(f"{_now()} rollups: FAILED ({e})")
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _push(self, due, name) -> None:
+        heapq.heappush(self._queue, (due, next(self._sequence), name))
+
+    def status(self) -> list[dict]:
+        """Next run and last query time of every report."""
+        now = time.monotonic()
+        with self._cond:
+            due = {name: d for d, _, name in self._queue}
+            running = set(self._running)
+        return [{
+            "name": name,
+            "running": name in running,
+            "next_run_seconds": None if name in running else max(due.get(name, now) - now, 0.0),
+            "last_query_seconds": self._last_seconds.get(name),
+            "failures": self._failures.get(name, 0),
+        } for name in self.reports]
+
+
+def _now() -> str:
+    return time.strftime("%H:%M:%S")
+
+
+# ------------------------------------------------------------
+# Reading snapshots
+# ------------------------------------------------------------
+def default_store() -> SnapshotStore:
+    """The store for the database in .env."""
+    return SnapshotStore(snapshot_folder(TableData.GetDatabaseSecrets()["DATABASE"]))
+
+
+def latest(definition, store=None, get_connection=None) -> Snapshot | None:
+    """
+    The latest snapshot of a report. When there is none yet (the
+    scheduler has not run it), it is computed once now if get_connection
+    is given.
+    """
+    store = store or default_store()
+    snapshot = store.get(definition.name)
+    if snapshot is None and get_connection is not None:
+        scheduler = ReportScheduler([definition], store, get_connection, log=None)
+        snapshot = scheduler.refresh(definition)
+    return snapshot
+
+
+def parse_where(text) -> tuple:
+    """
+    "Column>=value" as (column, op, value text).
+
+    :raises ValueError: if text is not a comparison
+    """
+    match = re.fullmatch(r"\s*(\w+)\s*(<=|>=|!=|==|=|<|>)\s*(.*?)\s*", text)
+    if match is None:
+        raise ValueError(f"{text!r} is not a comparison like Category=Tent or Quantity>2")
+    return match.groups()
+
+
+def show(definition, store=None, get_connection=None, max_rows=None, where=None) -> bool:
+    """
+    Print the latest snapshot of a report with its staleness.
+    Returns False when there is no snapshot to show.
+
+    :param where: Optional (column, op, value) filter; see Snapshot.filter
+    """
+    snapshot = latest(definition, store, get_connection)
+    if snapshot is None:
+        print(f"No snapshot of {definition.name} yet; is report_scheduler.py running?")
+        return False
+    rows = snapshot.rows if where is None else snapshot.filter(*where)
+    render(definition, snapshot.columns, rows, snapshot.types, max_rows)
+    matched = f"{len(rows):,} of " if where is not None else ""
+    print(f"\n({matched}{len(snapshot.rows):,} rows, {snapshot.staleness()})")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-compute reports into snapshots")
+    parser.add_argument("command", choices=["run", "list", "show"])
+    parser.add_argument("report", nargs="?", help="show: report name")
+    parser.add_argument("--group", help="run: only reports in this group")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER)
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP_SECONDS)
+    parser.add_argument("--max-rows", type=int, help="show: rows printed")
+    parser.add_argument("--where", help="show: only rows matching e.g. \"Category=Tent\"")
+    args = parser.parse_args()
+
+    store = default_store()
+
+    if args.command == "list":
+        print(f"{'Report':<30} {'Every':>7}  Latest snapshot")
+        for definition in REGISTRY.all():
+            snapshot = store.get(definition.name)
+            print(f"{definition.name:<30} {definition.refresh_seconds:>6.0f}s  "
+                  + (snapshot.staleness() if snapshot else "none"))
+        return
+
+    if args.command == "show":
+        if not args.report:
+            parser.error("show needs a report name: " + ", ".join(REGISTRY.names()))
+        try:
+            where = parse_where(args.where) if args.where else None
+        except ValueError as e:
+            parser.error(str(e))
+        show(REGISTRY.get(args.report), store, TableData.GetDatabaseConnection, args.max_rows,
+             where)
+        return
+
+    reports = REGISTRY.group(args.group) if args.group else REGISTRY.all()
+    scheduler = ReportScheduler(reports, store, TableData.GetDatabaseConnection,
+                                max_concurrent=args.concurrency, jitter=args.jitter,
+                                warmup_seconds=args.warmup)
+    print(f"Refreshing {len(reports)} reports into {store.folder} "
+          f"(at most {args.concurrency} at once). Ctrl+C to stop.")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nStopping after the running refreshes finish.")
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+"""
+report_service.py
+Read-only HTTP service for the reports, so analysts share one process
+(one connection pool, one result cache) instead of each running the
+report scripts with database credentials in their own .env.
+
+Endpoints (GET only):
+    /                           reports and tables, with their URLs
+    /reports/<name>.json|.csv   a report_registry report
+    /tables/<name>.json|.csv    any table or view (what display_table shows)
+    /stats                      request, coalescing and cache counters
+
+Query parameters:
+    limit=N            only the first N rows
+    source=snapshot    a report's latest snapshot from report_scheduler.py
+                       instead of the database
+
+Every body has an ETag; a request whose If-None-Match still matches gets
+304 Not Modified without the body being sent again. Bodies are streamed
+in chunks, compressed with zstd (when the zstandard package is installed)
+or gzip as the client's Accept-Encoding allows.
+
+Identical requests that arrive while one is already being answered wait
+for its result instead of running the query again, and the encoded body
+is kept for as long as the result cache returns the same rows.
+
+Usage:
+    python report_service.py [--host 127.0.0.1] [--port 8080]
+    curl -H "Accept-Encoding: gzip" http://127.0.0.1:8080/reports/equipment_profit.csv
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+import DisplayTableData as TableData
+from export_data import json_default
+from report_registry import REGISTRY
+from result_cache import get_cache
+from snapshot_store import SnapshotStore, snapshot_folder
+
+try:
+    import zstandard
+except ImportError:  # Only needed for zstd responses
+    zstandard = None
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Rows encoded per chunk of a streamed body
+CHUNK_ROWS = 1000
+
+# Encoded bodies kept for reuse (report x format x limit)
+MAX_BODIES = 64
+
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class ServiceError(Exception):
+    """An error answered with an HTTP status instead of a body."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ------------------------------------------------------------
+# Request coalescing
+# ------------------------------------------------------------
+class Coalescer:
+    """
+    Runs one call per key at a time: callers asking for a key that is
+    already being computed wait for that result instead of computing it
+    again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.stats = {"calls": 0, "coalesced": 0}
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.stats["calls"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+
+# ------------------------------------------------------------
+# Bodies
+# ------------------------------------------------------------
+class Body:
+    """An encoded response body, as the chunks it is streamed in."""
+
+    def __init__(self, content_type, chunks):
+        self.content_type = content_type
+        self.chunks = chunks
+        # encoding -> compressed chunks, kept after the first response
+        # so later ones are not compressed again
+        self.packed = {}
+        digest = hashlib.blake2b(content_type.encode("ascii"), digest_size=16)
+        for chunk in chunks:
+            digest.update(chunk)
+        self.tag = digest.hexdigest()
+
+    def etag(self, encoding=None) -> str:
+        # Each content coding is a different representation
+        return f'"{self.tag}-{encoding}"' if encoding else f'"{self.tag}"'
+
+
+def encode_json(name, columns, rows) -> list[bytes]:
+    encoder = json.JSONEncoder(default=json_default, separators=(",", ":"))
+    chunks = [f'{{"name":{encoder.encode(name)},"columns":{encoder.encode(list(columns))},'
+              f'"row_count":{len(rows)},"rows":['.encode("utf-8")]
+    for start in range(0, len(rows), CHUNK_ROWS):
+        batch = [list(row) for row in rows[start:start + CHUNK_ROWS]]
+        text = encoder.encode(batch)[1:-1]
+        chunks.append((("," if start else "") + text).encode("utf-8"))
+    chunks.append(b"]}")
+    return chunks
+
+
+def encode_csv(columns, rows) -> list[bytes]:
+    """Header row, then the rows; NULL as an empty field (as export_data.py)."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    chunks = []
+    for start in range(0, len(rows), CHUNK_ROWS):
+        writer.writerows(rows[start:start + CHUNK_ROWS])
+        chunks.append(out.getvalue().encode("utf-8"))
+        out.seek(0)
+        out.truncate()
+    if not chunks or out.tell():
+        chunks.append(out.getvalue().encode("utf-8"))
+    return chunks
+
+
+def encode(fmt, name, columns, rows) -> Body:
+    if fmt == "csv":
+        return Body(CONTENT_TYPES["csv"], encode_csv(columns, rows))
+    return Body(CONTENT_TYPES["json"], encode_json(name, columns, rows))
+
+
+def choose_encoding(accept_encoding) -> str | None:
+    """zstd, gzip or None (identity), from an Accept-Encoding header."""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    if zstandard is not None and accepted.get("zstd", 0) > 0:
+        return "zstd"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def compressor(encoding):
+    """An object with compress(bytes) and flush() for the coding, or None."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    if encoding == "gzip":
+        # wbits 31: gzip header and trailer
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    return None
+
+
+def etag_matches(if_none_match, etag) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+# ------------------------------------------------------------
+# Service
+# ------------------------------------------------------------
+class ReportService:
+    """
+    Answers report requests on pooled connections through the result cache.
+
+    :param get_connection: Function returning a pooled connection (or None)
+    :param cache: ResultCache the queries go through
+    :param store: SnapshotStore for source=snapshot; None disables it
+    """
+
+    def __init__(self, get_connection, cache, store=None):
+        self.get_connection = get_connection
+        self.cache = cache
+        self.store = store
+        self.coalescer = Coalescer()
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.stats = {"requests": 0, "not_modified": 0, "errors": 0,
+                      "bodies_encoded": 0, "bodies_reused": 0}
+
+    def count(self, name) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def body(self, path, query) -> Body:
+        """
+        The body for a request path and its parsed query string.
+
+        :raises ServiceError: 404 for unknown paths, reports and tables,
+            400 for bad parameters, 503 when no connection is available
+        """
+        parts = [p for p in path.split("/") if p]
+        fmt = query.get("format", [None])[0]
+        if parts and "." in parts[-1]:
+            parts[-1], _, fmt = parts[-1].rpartition(".")
+        fmt = (fmt or "json").lower()
+        if fmt not in CONTENT_TYPES:
+            raise ServiceError(400, f"Unknown format {fmt!r}; use json or csv")
+
+        if not parts:
+            return self._index()
+        if parts == ["stats"]:
+            return encode("json", "stats", ["name", "value"], sorted(self.status().items()))
+        if len(parts) != 2 or parts[0] not in ("reports", "tables"):
+            raise ServiceError(404, f"No such endpoint: {path}")
+
+        kind, name = parts
+        limit = query.get("limit", [None])[0]
+        try:
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            raise ServiceError(400, f"limit must be a number, not {limit!r}") from None
+        if limit is not None and limit < 0:
+            raise ServiceError(400, f"limit must be 0 or more, not {limit}")
+        source = query.get("source", ["database"])[0]
+        if source not in ("database", "snapshot") or source == "snapshot" and kind != "reports":
+            raise ServiceError(400, "source must be database, or snapshot for a report")
+
+        key = (kind, name, source, fmt, limit)
+        # Concurrent identical requests share one query and one encoding
+        return self.coalescer.run(("body",) + key, lambda: self._build(key))
+
+    def _build(self, key) -> Body:
+        kind, name, source, fmt, limit = key
+        if kind == "reports":
+            try:
+                definition = REGISTRY.get(name)
+            except KeyError as e:
+                raise ServiceError(404, str(e.args[0])) from None
+            if source == "snapshot":
+                columns, rows = self._snapshot(definition)
+            else:
+                columns, rows = self.coalescer.run(
+                    ("query", kind, name), lambda: self._query(lambda cursor: definition.sql))
+        else:
+            columns, rows = self.coalescer.run(
+                ("query", kind, name),
+                lambda: self._query(lambda cursor: self._select_all(cursor, name)))
+
+        # Same rows object from the cache: the encoded body is still right
+        with self._lock:
+            cached = self._bodies.get(key)
+            if cached is not None and cached[0] is rows:
+                self._bodies.move_to_end(key)
+                self.stats["bodies_reused"] += 1
+                return cached[1]
+
+        shown = rows[:limit] if limit is not None else rows
+        body = encode(fmt, name, columns, shown)
+        with self._lock:
+            self._bodies[key] = (rows, body)
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > MAX_BODIES:
+                self._bodies.popitem(last=False)
+            self.stats["bodies_encoded"] += 1
+        return body
+
+    def _query(self, sql_for) -> tuple:
+        """(columns, rows) of a query run through the result cache."""
+        conn = self.get_connection()
+        if conn is None:
+            raise ServiceError(503, "No database connection available")
+        try:
+            cursor = conn.cursor()
+            try:
+                columns, rows = self.cache.execute(cursor, sql_for(cursor))
+            finally:
+                cursor.close()
+            # End the read transaction so the next query sees new data
+            conn.commit()
+        finally:
+            conn.close()
+        return columns, rows
+
+    @staticmethod
+    def _select_all(cursor, table_name) -> str:
+        try:
+            return TableData.SelectAllQuery(cursor, table_name)
+        except ValueError as e:
+            raise ServiceError(404, str(e)) from None
+
+    def _snapshot(self, definition) -> tuple:
+        if self.store is None:
+            raise ServiceError(404, "Snapshots are not enabled")
+        snapshot = self.store.get(definition.name)
+        if snapshot is None:
+            raise ServiceError(404, f"No snapshot of {definition.name} yet; "
+                                    "is report_scheduler.py running?")
+        return snapshot.columns, snapshot.rows
+
+    def _index(self) -> Body:
+        def tables():
+            conn = self.get_connection()
+            if conn is None:
+                raise ServiceError(503, "No database connection available")
+            try:
+                cursor = conn.cursor()
+                names = TableData.GetTables(cursor)
+                cursor.close()
+            finally:
+                conn.close()
+            return names
+
+        rows = [("report", d.name, d.title, f"/reports/{quote(d.name)}.json",
+                 f"/reports/{quote(d.name)}.csv") for d in REGISTRY.all()]
+        rows += [("table", name, name, f"/tables/{quote(name)}.json", f"/tables/{quote(name)}.csv")
+                 for name in self.coalescer.run(("tables",), tables)]
+        return encode("json", "index", ["kind", "name", "title", "json", "csv"], rows)
+
+    def status(self) -> dict:
+        with self._lock:
+            status = {f"service_{k}": v for k, v in self.stats.items()}
+        status.update({f"coalescer_{k}": v for k, v in self.coalescer.stats.items()})
+        status.update({f"cache_{k}": v for k, v in self.cache.stats.items()})
+        status["cache_bytes"] = self.cache.size_bytes()
+        status["uptime_seconds"] = round(time.time() - self.started_at, 1)
+        return status
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """GET handler; the ReportService is on the server."""
+
+    # Keep-alive, so a client reuses its connection between requests
+    protocol_version = "HTTP/1.1"
+    server_version = "OutlandReports/1.0"
+    # Headers and body chunks are separate writes; without this the
+    # body waits on the client's delayed ACK (about 40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service = self.server.service
+        service.count("requests")
+        url = urlsplit(self.path)
+        try:
+            body = service.body(url.path, parse_qs(url.query))
+        except ServiceError as e:
+            service.count("errors")
+            self._send_error(e.status, str(e))
+            return
+        except Exception as e:
+            service.count("errors")
+            self.log_error("%s failed: %r", self.path, e)
+            self._send_error(500, f"{type(e).__name__}: {e}")
+            return
+
+        encoding = choose_encoding(self.headers.get("Accept-Encoding"))
+        etag = body.etag(encoding)
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            service.count("not_modified")
+            self.send_response(304)
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", body.content_type)
+        self._send_cache_headers(etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._stream(body, encoding)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away mid-body
+            self.close_connection = True
+
+    def _stream(self, body, encoding) -> None:
+        """Send the body with chunked transfer encoding, compressing as it goes."""
+        chunks = body.chunks if encoding is None else body.packed.get(encoding)
+        if chunks is not None:
+            for data in chunks:
+                self._write_chunk(data)
+        else:
+            packer = compressor(encoding)
+            packed = []
+            for chunk in body.chunks:
+                packed.append(packer.compress(chunk))
+                self._write_chunk(packed[-1])
+            packed.append(packer.flush())
+            self._write_chunk(packed[-1])
+            body.packed[encoding] = packed
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data) -> None:
+        # An empty chunk would end the body
+        if data:
+            self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+
+    def _send_cache_headers(self, etag) -> None:
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        # Clients may keep the body but must revalidate it every time
+        self.send_header("Cache-Control", "no-cache")
+
+    def _send_error(self, status, message) -> None:
+        data = json.dumps({"error": message}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPES["json"])
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False) -> ThreadingHTTPServer:
+    """A threaded HTTP server for the service (not started)."""
+    server = ThreadingHTTPServer((host, port), ReportRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only HTTP service for the reports")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help="address to listen on (default: this machine only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    database = TableData.GetDatabaseSecrets()["DATABASE"]
+    service = ReportService(TableData.GetDatabaseConnection, get_cache(),
+                            SnapshotStore(snapshot_folder(database)))
+    server = make_server(service, args.host, args.port, args.verbose)
+    print(f"Serving {database} reports on http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nStopping. {service.status()}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+result_cache.py
+In-memory cache of report query results.
+
+Results are keyed by the normalized query text plus its parameters. Each
+entry has a time-to-live, the cache is trimmed least-recently-used first
+when it grows past its byte budget, and entries are dropped when one of
+the tables behind the query changes.
+
+Table changes are detected with a cheap fingerprint of every table the
+query reads (views are expanded to their base tables):
+    probe     - COUNT(*) and MAX(primary key) per table (default)
+    checksum  - CHECKSUM TABLE, which also catches in-place UPDATEs but
+                reads the whole table
+Fingerprints are re-checked at most once per check_interval seconds, so
+repeated dashboard refreshes inside that window never touch the database.
+
+Usage:
+    cache = get_cache()
+    columns, rows = cache.execute(cursor, "SELECT * FROM EquipmentProfitViewWithRentals")
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from instrumentation import InstrumentedCursor
+
+
+# Base tables read by each report view
+VIEW_TABLES = {
+    "equipmentprofitviewwithrentals": ["Equipment", "EquipmentTransaction"],
+    "equipmentageandinventorystatus": ["Equipment"],
+    "regionbookingparticipantsreport": ["Booking", "Trip"],
+    "equipmentprofitsummaryview": ["Equipment", "EquipmentRentalSummary"],
+    # Rollups plus live tail; the totals only change when transactions do
+    "equipmenttransactiontotals": ["EquipmentTransaction"],
+}
+
+# Primary key of each outland_adventures table, used by the probe fingerprint
+PRIMARY_KEYS = {
+    "customeraccount": "AccountID",
+    "familymember": "MemberID",
+    "waiver": "WaiverID",
+    "trip": "TripID",
+    "booking": "BookingID",
+    "equipment": "EquipmentID",
+    "equipmenttransaction": "TransactionID",
+    "twofactormethod": "MethodID",
+    "staff": "StaffID",
+    # Not a key, but it grows every time new transactions are folded in
+    "equipmentrentalsummary": "LastTransactionID",
+}
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+`?([A-Za-z_][A-Za-z0-9_]*)`?", re.IGNORECASE)
+
+# Queries using these functions change answer from one day to the next
+_DATE_FUNCTIONS = re.compile(r"\b(?:CURDATE|CURRENT_DATE|NOW|SYSDATE)\b", re.IGNORECASE)
+
+
+def normalize_query(query) -> str:
+    """
+    Collapse whitespace and drop the trailing semicolon so formatting
+    differences do not create separate cache entries.
+    """
+    return " ".join(query.split()).rstrip(";").strip()
+
+
+def tables_for_query(query) -> list[str]:
+    """
+    Find the base tables a query reads, expanding known views.
+
+    :param query: SQL text
+    :return: Sorted table names
+    :rtype: list[str]
+    """
+    tables = set()
+    for name in _TABLE_PATTERN.findall(query):
+        tables.update(VIEW_TABLES.get(name.lower(), [name]))
+    return sorted(tables)
+
+
+def _row_shape(cursor) -> str:
+    """
+    Name of the cursor class that builds the rows (dictionary, tuple,
+    raw, ...). With METRICS on every cursor is an InstrumentedCursor, so
+    look at the cursor it wraps.
+    """
+    while isinstance(cursor, InstrumentedCursor):
+        cursor = cursor._cursor
+    return type(cursor).__name__
+
+
+def estimate_size(rows) -> int:
+    """Approximate memory used by a list of result rows, in bytes."""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            total += sys.getsizeof(value)
+    return total
+
+
+class CacheEntry:
+    """One cached result plus the fingerprint it was read under."""
+
+    def __init__(self, columns, rows, tables, fingerprint, size):
+        self.columns = columns
+        self.rows = rows
+        self.tables = tables
+        self.fingerprint = fingerprint
+        self.size = size
+        self.created_at = time.monotonic()
+
+
+class ResultCache:
+    """
+    LRU result cache with TTL and table-change invalidation.
+
+    :param max_bytes: Approximate memory budget for cached rows
+    :param ttl_seconds: Maximum age of an entry
+    :param check_interval: Seconds a table fingerprint is trusted before
+        it is read again
+    :param fingerprint: "probe" or "checksum"
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl_seconds=300,
+                 check_interval=5, fingerprint="probe"):
+        if fingerprint not in ("probe", "checksum"):
+            raise ValueError("fingerprint must be 'probe' or 'checksum'")
+
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.check_interval = check_interval
+        self.fingerprint = fingerprint
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # table name -> (fingerprint value, monotonic time it was read)
+        self._table_prints = {}
+        self._lock = threading.RLock()
+
+        self.stats = {"hits": 0, "misses": 0, "expired": 0,
+                      "invalidated": 0, "evicted": 0}
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def execute(self, cursor, query, params=None) -> tuple[list, list]:
+        """
+        Return the result of a query, from memory when still valid.
+
+        :param cursor: MySQL cursor, used only on a miss or a fingerprint check
+        :param query: SQL text
+        :param params: Query parameters
+        :return: (column names, rows)
+        :rtype: tuple[list, list]
+        """
+        key = self._make_key(cursor, query, params)
+        tables = tables_for_query(query)
+
+        entry = self._lookup(cursor, key)
+        if entry is not None:
+            return entry.columns, entry.rows
+
+        # Read the fingerprint before the query so a change that lands
+        # while the query runs makes the entry stale rather than hidden
+        fingerprint = self._fingerprint(cursor, tables, force=True)
+        cursor.execute(query, params or ())
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+
+        self._store(key, CacheEntry(columns, rows, tables, fingerprint, estimate_size(rows)))
+        return columns, rows
+
+    def invalidate(self, table=None) -> int:
+        """
+        Drop cached results. Call this after writing to a table.
+
+        :param table: Only drop entries reading this table; None drops all
+        :return: Number of entries removed
+        :rtype: int
+        """
+        with self._lock:
+            if table is None:
+                keys = list(self._entries)
+                self._table_prints.clear()
+            else:
+                name = table.lower()
+                keys = [k for k, e in self._entries.items()
+                        if name in (t.lower() for t in e.tables)]
+                self._table_prints.pop(name, None)
+            for key in keys:
+                self._remove(key)
+            self.stats["invalidated"] += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._table_prints.clear()
+            self._bytes = 0
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            return self._bytes
+
+    # ------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------
+    def _make_key(self, cursor, query, params) -> tuple:
+        # Dictionary and tuple cursors return different row shapes
+        key = (_row_shape(cursor), normalize_query(query), tuple(params or ()))
+        if _DATE_FUNCTIONS.search(query):
+            key += (date.today().isoformat(),)
+        return key
+
+    def _lookup(self, cursor, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.created_at > self.ttl_seconds:
+                self._remove(key)
+                self.stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+        # May read the database, so done without holding the lock
+        current = self._fingerprint(cursor, entry.tables)
+
+        with self._lock:
+            if current != entry.fingerprint:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+                self.stats["invalidated"] += 1
+                self.stats["misses"] += 1
+                return None
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def _store(self, key, entry) -> None:
+        with self._lock:
+            if entry.size > self.max_bytes:
+                # Too big to ever fit; do not flush everything else for it
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evicted"] += 1
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _fingerprint(self, cursor, tables, force=False) -> tuple:
+        """
+        Fingerprint of the given tables. Values read within the last
+        check_interval seconds are reused unless force is set.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = [t for t in tables
+                     if force or t.lower() not in self._table_prints
+                     or now - self._table_prints[t.lower()][1] > self.check_interval]
+
+        if stale:
+            fresh = self._read_fingerprints(cursor, stale)
+            with self._lock:
+                for table, value in fresh.items():
+                    self._table_prints[table.lower()] = (value, now)
+
+        with self._lock:
+            return tuple(self._table_prints[t.lower()][0] for t in tables)
+
+    def _read_fingerprints(self, cursor, tables) -> dict:
+        """Read fingerprints for several tables in a single round trip."""
+        if self.fingerprint == "checksum":
+            cursor.execute("CHECKSUM TABLE " + ", ".join(f"`{t}`" for t in tables))
+            result = {}
+            for row in cursor.fetchall():
+                name, checksum = (row["Table"], row["Checksum"]) if isinstance(row, dict) else row
+                result[name.split(".")[-1]] = checksum
+            # CHECKSUM TABLE reports schema.table; map back to the names asked for
+            return {t: result.get(t, result.get(t.lower())) for t in tables}
+
+        parts = []
+        for table in tables:
+            pk = PRIMARY_KEYS.get(table.lower())
+            max_expr = f"MAX(`{pk}`)" if pk else "NULL"
+            parts.append(f"SELECT '{table}' AS TableName, COUNT(*) AS RowCount, "
+                         f"{max_expr} AS MaxID FROM `{table}`")
+        cursor.execute(" UNION ALL ".join(parts))
+
+        result = {}
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                result[row["TableName"]] = (row["RowCount"], row["MaxID"])
+            else:
+                result[row[0]] = (row[1], row[2])
+        return result
+
+
+# One cache shared by everything in the process
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_cache(**options) -> ResultCache:
+    """
+    Get the process-wide result cache, creating it on first use.
+    Options are only applied when the cache is created.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache(**options)
+        return _shared_cache
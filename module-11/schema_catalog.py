@@ -0,0 +1,343 @@
+"""
+schema_catalog.py
+Cached description of the database schema: tables, views, columns and
+their types, primary keys, foreign keys and indexes.
+
+Everything is read from information_schema in one UNION ALL query and
+saved to a JSON file next to this script (schema_catalog.<database>.json).
+The file stores a SHA-256 hash of the schema rows. A later run loads the
+file and checks the hash, so it does not need to ask the server anything
+about the schema. Files older than max_age are checked against the
+server with one query and rebuilt only if the hash differs.
+
+After changing the schema (CREATE/ALTER/DROP), run
+    python schema_catalog.py refresh
+or call invalidate(); scripts pick up the new schema on their next run.
+
+Usage:
+    catalog = get_catalog(cursor, "outland_adventures")
+    catalog.tables()                     # like SHOW TABLES
+    catalog.columns("Equipment")         # names, types, sizes
+    catalog.primary_key("Booking")       # ["BookingID"]
+
+    python schema_catalog.py show|refresh|verify
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+
+# Bump when the row layout below changes, so old cache files are ignored
+CATALOG_VERSION = 1
+
+# Cache files older than this are checked against the server (seconds)
+DEFAULT_MAX_AGE = 24 * 60 * 60
+
+CACHE_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+
+def _text(expr) -> str:
+    # information_schema mixes collations; UNION ALL needs one
+    return f"CONVERT(CAST({expr} AS CHAR) USING utf8mb4) COLLATE utf8mb4_bin"
+
+
+def _select(kind, table, source, where, *values) -> str:
+    values = list(values) + ["NULL"] * (7 - len(values))
+    fields = ", ".join([f"'{kind}'", _text(table)] + [_text(v) for v in values])
+    return f"SELECT {fields} FROM information_schema.{source} WHERE {where}"
+
+
+# One row per table, column, index column and foreign key column:
+# (kind, table, name, position, a, b, c, d, e) with kind-specific a..e
+CATALOG_QUERY = "\nUNION ALL\n".join([
+    _select("table", "TABLE_NAME", "TABLES", "TABLE_SCHEMA = %s",
+            "TABLE_NAME", "0", "TABLE_TYPE", "ENGINE"),
+    _select("column", "TABLE_NAME", "COLUMNS", "TABLE_SCHEMA = %s",
+            "COLUMN_NAME", "ORDINAL_POSITION", "DATA_TYPE", "COLUMN_TYPE",
+            "IS_NULLABLE", "CHARACTER_MAXIMUM_LENGTH",
+            "CONCAT_WS(',', IFNULL(NUMERIC_PRECISION, ''), IFNULL(NUMERIC_SCALE, ''), COLUMN_KEY)"),
+    _select("index", "TABLE_NAME", "STATISTICS", "TABLE_SCHEMA = %s",
+            "INDEX_NAME", "SEQ_IN_INDEX", "COLUMN_NAME", "NON_UNIQUE", "INDEX_TYPE"),
+    _select("fk", "TABLE_NAME", "KEY_COLUMN_USAGE",
+            "TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL",
+            "CONSTRAINT_NAME", "ORDINAL_POSITION", "COLUMN_NAME",
+            "REFERENCED_TABLE_NAME", "REFERENCED_COLUMN_NAME"),
+])
+
+
+def fetch_schema_rows(cursor, database) -> list[list]:
+    """
+    Read the whole schema description in one round trip.
+
+    :param cursor: MySQL cursor object
+    :param database: Schema to describe
+    :return: Rows sorted into a stable order, for hashing
+    :rtype: list[list]
+    """
+    cursor.execute(CATALOG_QUERY, (database,) * 4)
+    rows = [list(row.values()) if isinstance(row, dict) else list(row)
+            for row in cursor.fetchall()]
+    rows.sort(key=lambda r: [("" if v is None else str(v)) for v in r])
+    return rows
+
+
+def schema_hash(rows) -> str:
+    raw = json.dumps(rows, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _int(value):
+    return None if value in (None, "") else int(value)
+
+
+class SchemaCatalog:
+    """
+    Lookups over the schema rows. Table names are matched without regard
+    to case, as MySQL does on Windows.
+
+    :param database: Schema name
+    :param rows: Rows from fetch_schema_rows
+    :param built_at: Unix time the rows were read from the server
+    """
+
+    def __init__(self, database, rows, built_at=None):
+        self.database = database
+        self._build(rows, built_at)
+
+    def _build(self, rows, built_at=None) -> None:
+        self.rows = rows
+        self.hash = schema_hash(rows)
+        self.built_at = built_at if built_at is not None else time.time()
+
+        self._tables = {}
+        self._columns = {}
+        self._indexes = {}
+        self._foreign_keys = {}
+        for kind, table, name, position, a, b, c, d, e in rows:
+            key = table.lower()
+            if kind == "table":
+                self._tables[key] = {"name": table, "type": a, "engine": b}
+            elif kind == "column":
+                precision, scale, column_key = (e or ",,").split(",")
+                self._columns.setdefault(key, []).append({
+                    "name": name,
+                    "position": int(position),
+                    "data_type": a.lower(),
+                    "column_type": b.lower(),
+                    "nullable": c == "YES",
+                    "char_length": _int(d),
+                    "precision": _int(precision),
+                    "scale": _int(scale),
+                    "key": column_key,
+                })
+            elif kind == "index":
+                index = self._indexes.setdefault(key, {}).setdefault(
+                    name, {"unique": b == "0", "type": c, "columns": []})
+                index["columns"].append((int(position), a))
+            elif kind == "fk":
+                fk = self._foreign_keys.setdefault(key, {}).setdefault(
+                    name, {"columns": [], "ref_table": b, "ref_columns": []})
+                fk["columns"].append((int(position), a))
+                fk["ref_columns"].append((int(position), c))
+
+        for columns in self._columns.values():
+            columns.sort(key=lambda col: col["position"])
+        for group in list(self._indexes.values()) + list(self._foreign_keys.values()):
+            for entry in group.values():
+                for field in ("columns", "ref_columns"):
+                    if field in entry:
+                        entry[field] = [col for _, col in sorted(entry[field])]
+
+    # ------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------
+    def has_table(self, table) -> bool:
+        return table.lower() in self._tables
+
+    def tables(self) -> list[str]:
+        """Tables and views, sorted by name like SHOW TABLES."""
+        return sorted((t["name"] for t in self._tables.values()), key=str.lower)
+
+    def base_tables(self) -> list[str]:
+        return [name for name in self.tables()
+                if self._tables[name.lower()]["type"] == "BASE TABLE"]
+
+    def views(self) -> list[str]:
+        return [name for name in self.tables()
+                if self._tables[name.lower()]["type"] == "VIEW"]
+
+    def columns(self, table) -> list[dict]:
+        """
+        Columns of a table or view, in column order: name, data_type,
+        column_type, nullable, char_length, precision, scale and key
+        (PRI/UNI/MUL).
+        Empty when the table is unknown.
+        """
+        return self._columns.get(table.lower(), [])
+
+    def column_names(self, table) -> list[str]:
+        return [col["name"] for col in self.columns(table)]
+
+    def primary_key(self, table) -> list[str]:
+        index = self._indexes.get(table.lower(), {}).get("PRIMARY")
+        return list(index["columns"]) if index else []
+
+    def indexes(self, table) -> dict:
+        """Index name -> {"unique": bool, "type": str, "columns": [...]}"""
+        return self._indexes.get(table.lower(), {})
+
+    def foreign_keys(self, table) -> dict:
+        """Constraint name -> {"columns", "ref_table", "ref_columns"}"""
+        return self._foreign_keys.get(table.lower(), {})
+
+    # ------------------------------------------------------------
+    # Server check
+    # ------------------------------------------------------------
+    def verify(self, cursor) -> bool:
+        """
+        Compare against the server in one query. Returns True when the
+        schema is unchanged; otherwise the catalog is rebuilt in place.
+        """
+        rows = fetch_schema_rows(cursor, self.database)
+        current = schema_hash(rows) == self.hash
+        if current:
+            self.built_at = time.time()
+        else:
+            self._build(rows)
+        return current
+
+
+# ------------------------------------------------------------
+# Cache file
+# ------------------------------------------------------------
+def cache_path(database, folder=None) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", database)
+    return os.path.join(folder or CACHE_FOLDER, f"schema_catalog.{safe}.json")
+
+
+def save_catalog(catalog, path=None) -> str:
+    """Write the catalog to its cache file atomically. Returns the path."""
+    path = path or cache_path(catalog.database)
+    payload = {
+        "version": CATALOG_VERSION,
+        "database": catalog.database,
+        "built_at": catalog.built_at,
+        "hash": catalog.hash,
+        "rows": catalog.rows,
+    }
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as out:
+        json.dump(payload, out, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
+
+
+def load_cached(database, path=None) -> SchemaCatalog | None:
+    """
+    Load a catalog from its cache file. Returns None when the file is
+    missing, from another version or database, or fails its hash check.
+    """
+    path = path or cache_path(database)
+    try:
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if payload.get("version") != CATALOG_VERSION or payload.get("database") != database:
+        return None
+    rows = payload.get("rows")
+    if not isinstance(rows, list) or schema_hash(rows) != payload.get("hash"):
+        return None
+    return SchemaCatalog(database, rows, payload.get("built_at"))
+
+
+# Catalogs already loaded in this process, by database name
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(cursor, database, max_age=DEFAULT_MAX_AGE, refresh=False) -> SchemaCatalog:
+    """
+    Get the schema catalog: from this process if already loaded, else
+    from the cache file, else from the server (and then saved). The
+    cursor is only used when the server has to be asked.
+
+    :param cursor: MySQL cursor object
+    :param database: Schema name
+    :param max_age: Seconds a cached catalog is trusted before it is
+        checked against the server. None trusts it until invalidated.
+    :param refresh: Ignore the caches and read the server
+    :return: The catalog
+    :rtype: SchemaCatalog
+    """
+    with _catalogs_lock:
+        catalog = None if refresh else _catalogs.get(database)
+        if catalog is None and not refresh:
+            catalog = load_cached(database)
+
+        if catalog is None:
+            catalog = SchemaCatalog(database, fetch_schema_rows(cursor, database))
+            save_catalog(catalog)
+        elif max_age is not None and time.time() - catalog.built_at > max_age:
+            catalog.verify(cursor)
+            save_catalog(catalog)
+
+        _catalogs[database] = catalog
+        return catalog
+
+
+def invalidate(database) -> None:
+    """Forget the catalog in this process and delete its cache file."""
+    with _catalogs_lock:
+        _catalogs.pop(database, None)
+        try:
+            os.remove(cache_path(database))
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    import DisplayTableData as TableData
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "show"
+    if command not in ("show", "refresh", "verify"):
+        print(__doc__)
+        return
+
+    database = TableData.GetDatabaseSecrets()["DATABASE"]
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+    cursor = conn.cursor()
+
+    try:
+        if command == "refresh":
+            catalog = get_catalog(cursor, database, refresh=True)
+            print(f"Catalog rebuilt: {cache_path(database)}")
+        elif command == "verify":
+            catalog = get_catalog(cursor, database, max_age=None)
+            current = catalog.verify(cursor)
+            save_catalog(catalog)
+            print("Cache file matches the server." if current
+                  else "Schema had changed; cache file rebuilt.")
+        else:
+            catalog = get_catalog(cursor, database)
+
+        for table in catalog.tables():
+            kind = "view" if table in catalog.views() else "table"
+            key = ", ".join(catalog.primary_key(table)) or "-"
+            print(f"{table} ({kind}, key {key}): {', '.join(catalog.column_names(table))}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
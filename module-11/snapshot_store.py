@@ -0,0 +1,261 @@
+"""
+snapshot_store.py
+The latest computed result of each report, with when it was computed,
+so a reader gets it instantly instead of waiting for the query.
+
+report_scheduler.py writes a snapshot every time it refreshes a report.
+Snapshots are kept in memory and, when the store has a folder, also
+written to files, so another process (a script, the report service) can
+read what the scheduler computed. Every write is a new file,
+name.<version>.snapshot, and readers take the highest version. A file
+is never replaced in place, because Windows will not replace or delete a
+file another process has mapped; older versions are deleted once nothing
+maps them. Files are in snapshot_file's columnar format and are read
+through mmap: a snapshot from disk does not load its rows, it decodes
+only the rows that are shown or match a filter. Every snapshot carries
+its staleness: its age, and whether that is past the report's refresh
+interval.
+
+Usage:
+    store = SnapshotStore(snapshot_folder(database))
+    store.put(Snapshot.from_result("equipment_profit", result, refresh_seconds=300))
+    snapshot = store.get("equipment_profit")
+    print(snapshot.staleness())
+    busy = snapshot.filter("TotalRentalCount", ">", 10)
+"""
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from snapshot_file import (OPERATORS, MappedSnapshot, SnapshotFormatError, column_kind,
+                           parse_value, write_snapshot)
+
+
+# Default place for snapshot files: a folder next to this script
+SNAPSHOT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+
+@dataclass
+class Snapshot:
+    """One computed report result."""
+    name: str
+    columns: list
+    # Tuples in columns order; a SnapshotRows over the file when read from disk
+    rows: list
+    # cursor.description type codes, in columns order
+    types: list = None
+    # time.time() when the query finished
+    computed_at: float = field(default_factory=time.time)
+    query_seconds: float = 0.0
+    # The report's refresh interval when this was computed
+    refresh_seconds: float = None
+    # The mapped file the rows are read from; None for rows in memory
+    data: MappedSnapshot = None
+
+    @classmethod
+    def from_result(cls, name, result, refresh_seconds=None) -> "Snapshot":
+        """Snapshot of a report_runner.ReportResult."""
+        rows = result.rows
+        if rows and isinstance(rows[0], dict):
+            rows = [tuple(row[c] for c in result.columns) for row in rows]
+        return cls(name=name, columns=list(result.columns), rows=list(rows),
+                   types=list(result.types) if result.types is not None else None,
+                   query_seconds=result.query_seconds, refresh_seconds=refresh_seconds)
+
+    @classmethod
+    def from_file(cls, mapped) -> "Snapshot":
+        """Snapshot whose rows are decoded from a MappedSnapshot on demand."""
+        return cls(name=mapped.name, columns=list(mapped.columns), rows=mapped.rows,
+                   types=mapped.types, computed_at=mapped.computed_at,
+                   query_seconds=mapped.query_seconds,
+                   refresh_seconds=mapped.refresh_seconds, data=mapped)
+
+    def filter(self, column, op, value) -> list[tuple]:
+        """
+        Rows where column <op> value; NULLs never match. On a mapped
+        snapshot only the matching rows are decoded.
+
+        :param op: One of "=", "!=", "<", "<=", ">", ">="
+        :param value: Python value, or text converted to the column's type
+        """
+        if self.data is not None:
+            if isinstance(value, str):
+                value = parse_value(value, self.data.column(column).kind)
+            return self.data.take(self.data.where(column, op, value))
+
+        compare = OPERATORS[op]
+        position = self.columns.index(column)
+        if isinstance(value, str):
+            value = parse_value(value, column_kind([row[position] for row in self.rows]))
+        return [row for row in self.rows
+                if row[position] is not None and compare(row[position], value)]
+
+    @property
+    def age_seconds(self) -> float:
+        return max(time.time() - self.computed_at, 0.0)
+
+    @property
+    def stale(self) -> bool:
+        """Older than its refresh interval (the scheduler fell behind)."""
+        return self.refresh_seconds is not None and self.age_seconds > self.refresh_seconds
+
+    def staleness(self) -> str:
+        computed = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.computed_at))
+        text = f"computed {computed} ({_age_text(self.age_seconds)} ago)"
+        if self.refresh_seconds is not None:
+            text += f", refreshed every {_age_text(self.refresh_seconds)}"
+        return text + (" - STALE" if self.stale else "")
+
+
+def _age_text(seconds) -> str:
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.1f}h"
+
+
+def snapshot_folder(database, root=None) -> str:
+    """Folder for one database's snapshot files."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", database)
+    return os.path.join(root or SNAPSHOT_ROOT, safe)
+
+
+class SnapshotStore:
+    """
+    Latest snapshot per report name.
+
+    :param folder: Where snapshot files go; memory only when None
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder
+        self._snapshots = {}
+        # name -> (time.time(), message) of the last failed refresh
+        self.errors = {}
+        self._lock = threading.Lock()
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+
+    def put(self, snapshot) -> None:
+        """
+        Store a snapshot as the latest for its report. With a folder the
+        store then keeps the mapped file instead of the rows in memory.
+        """
+        if self.folder is not None:
+            self._write(snapshot)
+            snapshot = self._read(snapshot.name) or snapshot
+        with self._lock:
+            self._snapshots[snapshot.name] = snapshot
+            self.errors.pop(snapshot.name, None)
+
+    def get(self, name) -> Snapshot | None:
+        """
+        The latest snapshot of a report, or None if there is none. A newer
+        file written by another process wins over the one in memory.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(name)
+        if self.folder is not None:
+            on_disk = self._read(name, newer_than=snapshot.computed_at if snapshot else None)
+            if on_disk is not None:
+                with self._lock:
+                    current = self._snapshots.get(name)
+                    if current is None or current.computed_at < on_disk.computed_at:
+                        self._snapshots[name] = on_disk
+                snapshot = on_disk
+        return snapshot
+
+    def record_error(self, name, error) -> None:
+        """Note a failed refresh; the previous snapshot stays readable."""
+        with self._lock:
+            self.errors[name] = (time.time(), str(error))
+
+    def names(self) -> list[str]:
+        names = set(self._snapshots)
+        names.update(name for name, _ in self._files())
+        return sorted(names)
+
+    # ------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------
+    def path(self, name, version) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        return os.path.join(self.folder, f"{safe}.{version}{SNAPSHOT_SUFFIX}")
+
+    def _files(self) -> list[tuple[str, int]]:
+        """(name, version) of every snapshot file in the folder."""
+        if self.folder is None or not os.path.isdir(self.folder):
+            return []
+        files = []
+        for f in os.listdir(self.folder):
+            name, _, version = f[:-len(SNAPSHOT_SUFFIX)].rpartition(".")
+            if f.endswith(SNAPSHOT_SUFFIX) and name and version.isdigit():
+                files.append((name, int(version)))
+        return files
+
+    def _versions(self, name) -> list[int]:
+        """Versions of a report's files, newest first."""
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        return sorted((v for n, v in self._files() if n == safe), reverse=True)
+
+    def _write(self, snapshot) -> None:
+        # time.time_ns() when written, so never earlier than computed_at
+        version = time.time_ns()
+        versions = self._versions(snapshot.name)
+        if versions:
+            version = max(version, versions[0] + 1)
+        path = self.path(snapshot.name, version)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            write_snapshot(tmp, snapshot)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._prune(snapshot.name, version)
+
+    def _prune(self, name, newest) -> None:
+        """
+        Delete a report's older files. On Windows a file still mapped
+        somewhere cannot be deleted; it is tried again on the next write.
+        """
+        for version in self._versions(name):
+            if version < newest:
+                try:
+                    os.remove(self.path(name, version))
+                except OSError:
+                    pass
+
+    def _read(self, name, newer_than=None) -> Snapshot | None:
+        # A newer write may delete the file between listing and opening;
+        # list again then
+        for _ in range(3):
+            versions = self._versions(name)
+            if not versions:
+                return None
+            # The version is never earlier than computed_at, so an older
+            # file can be skipped without opening it
+            if newer_than is not None and versions[0] / 1e9 <= newer_than:
+                return None
+            try:
+                # Maps the file; it stays readable through this mapping
+                # after a newer version is written
+                mapped = MappedSnapshot(self.path(name, versions[0]))
+                break
+            except FileNotFoundError:
+                continue
+            except (OSError, SnapshotFormatError):
+                return None
+        else:
+            return None
+        if newer_than is not None and mapped.computed_at <= newer_than:
+            mapped.close()
+            return None
+        return Snapshot.from_file(mapped)
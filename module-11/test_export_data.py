@@ -0,0 +1,94 @@
+"""
+test_export_data.py
+Checks export_data.py against a stand-in connection, so no MySQL server
+is needed.
+
+Usage:
+    python -m unittest test_export_data
+"""
+
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+import export_data
+
+
+class FakeCursor:
+    """Hands out rows with fetchmany, as the unbuffered MySQL cursor does."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+
+class FakeCatalog:
+    def __init__(self, columns):
+        self._columns = columns
+
+    def columns(self, table_name):
+        return self._columns
+
+
+@unittest.skipIf(export_data.pa is None, "pyarrow is not installed")
+class WideDecimalTest(unittest.TestCase):
+    columns = [
+        {"name": "LedgerID", "data_type": "int", "column_type": "int",
+         "precision": 10, "scale": 0},
+        {"name": "Balance", "data_type": "decimal", "column_type": "decimal(43,2)",
+         "precision": 43, "scale": 2},
+    ]
+    rows = [
+        (1, Decimal("12345678901234567890123456789012345678901.23")),
+        (2, Decimal("-0.01")),
+        (3, None),
+    ]
+
+    def export(self, fmt):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, f"ledger.{fmt}")
+        with mock.patch.object(export_data.TableData, "GetCatalog",
+                               return_value=FakeCatalog(self.columns)), \
+                mock.patch.object(export_data.TableData, "SelectAllQuery",
+                                  return_value="SELECT * FROM `Ledger`"):
+            result = export_data.export_table(FakeConnection(self.rows), "Ledger", path,
+                                              batch_size=2)
+        self.assertEqual(result["rows"], len(self.rows))
+        return path
+
+    def test_schema_uses_decimal256_above_38_digits(self):
+        schema = export_data.arrow_schema(self.columns)
+        self.assertEqual(schema.field("Balance").type, export_data.pa.decimal256(43, 2))
+
+    def test_parquet_keeps_every_digit(self):
+        table = export_data.pq.read_table(self.export("parquet"))
+        self.assertEqual(table.column("Balance").to_pylist(), [r[1] for r in self.rows])
+
+    def test_arrow_keeps_every_digit(self):
+        with export_data.pa.memory_map(self.export("arrow")) as source:
+            table = export_data.pa.ipc.open_file(source).read_all()
+        self.assertEqual(table.column("Balance").to_pylist(), [r[1] for r in self.rows])
+
+
+if __name__ == "__main__":
+    unittest.main()
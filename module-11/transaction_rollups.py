@@ -0,0 +1,412 @@
+"""
+transaction_rollups.py
+Maintains EquipmentTransactionDaily and EquipmentTransactionMonthly, the
+per-day and per-month rollups of EquipmentTransaction by EquipmentID and
+TransactionType (see InitialLoad (1).sql).
+
+The rollups hold every transaction up to the TransactionID in
+RollupWatermark. Queries add the live tail, the transactions past the
+watermark, which is a primary key range scan. So the reports read about
+one row per item, type and month, plus a few recent rows, however many
+years of transactions there are:
+    EquipmentTransactionTotals   all-time totals (the reports use this)
+    period_totals()              totals for a date range: whole months
+                                 from the monthly rollup, the partial
+                                 months at either end from the daily one
+
+Commands:
+    python transaction_rollups.py apply       # fold in transactions past the watermark
+    python transaction_rollups.py rebuild     # full recompute, resets the watermark
+    python transaction_rollups.py check       # compare the totals against the raw table
+    python transaction_rollups.py partition [--through 2030]
+                                              # RANGE partition the rollups by year
+    python transaction_rollups.py totals --since 2025-01-01 [--until 2025-07-01]
+    python transaction_rollups.py bench       # raw vs rollup report timings
+
+Like equipment_profit_summary.py, apply assumes transactions are
+append-only; edits or deletes of rolled-up rows are only picked up by
+rebuild.
+"""
+
+import argparse
+import statistics
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+from mysql.connector import errorcode
+
+import DisplayTableData as TableData
+
+
+ROLLUP_NAME = "EquipmentTransaction"
+
+# Rollup table -> (date column, expression for a transaction's bucket).
+# Undated transactions go under 1000-01-01, the lowest DATE.
+ROLLUPS = {
+    "EquipmentTransactionDaily": (
+        "RollupDate",
+        "COALESCE(TransactionDate, '1000-01-01')"
+    ),
+    "EquipmentTransactionMonthly": (
+        "RollupMonth",
+        "COALESCE(DATE_SUB(TransactionDate, INTERVAL DAYOFMONTH(TransactionDate) - 1 DAY), "
+        "'1000-01-01')"
+    ),
+}
+
+# What Report Sample 3 read before the rollups, kept for check and bench
+RAW_TOTALS_QUERY = """
+    SELECT EquipmentID, TransactionType, SUM(Quantity), COUNT(*)
+    FROM EquipmentTransaction
+    WHERE EquipmentID IS NOT NULL AND TransactionType IS NOT NULL
+    GROUP BY EquipmentID, TransactionType
+"""
+
+ROLLUP_TOTALS_QUERY = """
+    SELECT EquipmentID, TransactionType, Quantity, Transactions
+    FROM EquipmentTransactionTotals
+"""
+
+
+def _insert_rollup(cursor, table, low, high) -> None:
+    """Add transactions with low < TransactionID <= high to one rollup."""
+    date_column, bucket = ROLLUPS[table]
+    cursor.execute(
+        f"""
+        INSERT INTO {table} ({date_column}, EquipmentID, TransactionType, Quantity, Transactions)
+        SELECT * FROM (
+            SELECT {bucket} AS Bucket, EquipmentID, TransactionType,
+                   COALESCE(SUM(Quantity), 0) AS NewQuantity, COUNT(*) AS NewTransactions
+            FROM EquipmentTransaction
+            WHERE TransactionID > %s AND TransactionID <= %s
+              AND EquipmentID IS NOT NULL
+              AND TransactionType IS NOT NULL
+            GROUP BY Bucket, EquipmentID, TransactionType
+        ) AS delta
+        ON DUPLICATE KEY UPDATE
+          Quantity = {table}.Quantity + delta.NewQuantity,
+          Transactions = {table}.Transactions + delta.NewTransactions
+        """,
+        (low, high)
+    )
+
+
+def _lock_watermark(cursor) -> int:
+    cursor.execute(
+        "SELECT LastTransactionID FROM RollupWatermark WHERE RollupName = %s FOR UPDATE",
+        (ROLLUP_NAME,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        raise RuntimeError("RollupWatermark is missing; run InitialLoad (1).sql")
+    return row[0]
+
+
+def apply_deltas(conn) -> tuple[int, int]:
+    """
+    Fold transactions past the watermark into both rollups. Runs as one
+    transaction so the rollups and the watermark move together. Inserts
+    into EquipmentTransaction wait while it runs.
+
+    :param conn: MySQL connection
+    :return: (transactions read, new watermark)
+    :rtype: tuple[int, int]
+    """
+    cursor = conn.cursor()
+    try:
+        # Lock the watermark row so two appliers cannot double count
+        low = _lock_watermark(cursor)
+
+        # Fix the upper bound first so rows inserted meanwhile wait for the
+        # next run. AUTO_INCREMENT ids are handed out before commit, so a
+        # plain read could see id N while a lower one is still uncommitted,
+        # and the watermark would then skip it for good. The locking read
+        # waits for those inserts to finish and holds off new ones above the
+        # watermark until this transaction commits.
+        cursor.execute(
+            "SELECT MAX(TransactionID), COUNT(*) FROM EquipmentTransaction "
+            "WHERE TransactionID > %s FOR SHARE",
+            (low,)
+        )
+        high, new_rows = cursor.fetchone()
+        if high is None:
+            conn.rollback()
+            return 0, low
+
+        for table in ROLLUPS:
+            _insert_rollup(cursor, table, low, high)
+        cursor.execute(
+            "UPDATE RollupWatermark SET LastTransactionID = %s WHERE RollupName = %s",
+            (high, ROLLUP_NAME)
+        )
+        conn.commit()
+        return new_rows, high
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def rebuild_rollups(conn) -> int:
+    """
+    Recompute both rollups from EquipmentTransaction and reset the
+    watermark. Use this after editing or deleting old transactions.
+
+    :param conn: MySQL connection
+    :return: The new watermark
+    :rtype: int
+    """
+    cursor = conn.cursor()
+    try:
+        _lock_watermark(cursor)
+        cursor.execute("SELECT COALESCE(MAX(TransactionID), 0) FROM EquipmentTransaction")
+        high = cursor.fetchone()[0]
+
+        for table in ROLLUPS:
+            cursor.execute(f"DELETE FROM {table}")
+            _insert_rollup(cursor, table, 0, high)
+        cursor.execute(
+            "UPDATE RollupWatermark SET LastTransactionID = %s WHERE RollupName = %s",
+            (high, ROLLUP_NAME)
+        )
+        conn.commit()
+        return high
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def reset_rollups(cursor) -> None:
+    """
+    Empty the rollups and zero the watermark, for when EquipmentTransaction
+    itself was emptied (its TransactionIDs start again at 1). Does nothing
+    if the rollup tables do not exist.
+    """
+    try:
+        for table in ROLLUPS:
+            cursor.execute(f"TRUNCATE TABLE {table}")
+        cursor.execute(
+            "UPDATE RollupWatermark SET LastTransactionID = 0 WHERE RollupName = %s",
+            (ROLLUP_NAME,)
+        )
+    except mysql.connector.Error as err:
+        if err.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+
+
+# ------------------------------------------------------------
+# Queries
+# ------------------------------------------------------------
+def period_totals(cursor, start, end) -> list[tuple]:
+    """
+    Quantity and transaction count per item and TransactionType for
+    transactions dated from start up to (not including) end.
+
+    :param cursor: MySQL cursor object
+    :param start: First day
+    :param end: Day after the last day
+    :return: (EquipmentID, TransactionType, Quantity, Transactions) rows
+    :rtype: list[tuple]
+    """
+    # Whole months come from the monthly rollup, the days before the
+    # first and after the last whole month from the daily one
+    first_month = start if start.day == 1 else _next_month(start)
+    last_month = end.replace(day=1)
+    parts, params = [], []
+    if first_month < last_month:
+        parts.append("SELECT EquipmentID, TransactionType, Quantity, Transactions "
+                     "FROM EquipmentTransactionMonthly "
+                     "WHERE RollupMonth >= %s AND RollupMonth < %s")
+        params += [first_month, last_month]
+        day_ranges = [(start, first_month), (last_month, end)]
+    else:
+        day_ranges = [(start, end)]
+    for low, high in day_ranges:
+        if low < high:
+            parts.append("SELECT EquipmentID, TransactionType, Quantity, Transactions "
+                         "FROM EquipmentTransactionDaily "
+                         "WHERE RollupDate >= %s AND RollupDate < %s")
+            params += [low, high]
+    parts.append(
+        "SELECT EquipmentID, TransactionType, Quantity, 1 FROM EquipmentTransaction "
+        "WHERE TransactionID > (SELECT LastTransactionID FROM RollupWatermark "
+        "WHERE RollupName = %s) "
+        "AND EquipmentID IS NOT NULL AND TransactionType IS NOT NULL "
+        "AND TransactionDate >= %s AND TransactionDate < %s"
+    )
+    params += [ROLLUP_NAME, start, end]
+
+    cursor.execute(
+        "SELECT EquipmentID, TransactionType, COALESCE(SUM(Quantity), 0), SUM(Transactions) "
+        "FROM (" + " UNION ALL ".join(parts) + ") AS period "
+        "GROUP BY EquipmentID, TransactionType ORDER BY EquipmentID, TransactionType",
+        params
+    )
+    return cursor.fetchall()
+
+
+def _next_month(day) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def check_totals(cursor) -> list[tuple]:
+    """
+    Compare EquipmentTransactionTotals against the raw table.
+
+    :return: (EquipmentID, TransactionType, raw, rollup) for every
+        difference; empty when they agree
+    :rtype: list[tuple]
+    """
+    cursor.execute(RAW_TOTALS_QUERY)
+    raw = {row[:2]: (int(row[2] or 0), int(row[3])) for row in cursor.fetchall()}
+    cursor.execute(ROLLUP_TOTALS_QUERY)
+    rolled = {row[:2]: (int(row[2] or 0), int(row[3])) for row in cursor.fetchall()}
+    return [(key[0], key[1], raw.get(key), rolled.get(key))
+            for key in sorted(set(raw) | set(rolled), key=str)
+            if raw.get(key) != rolled.get(key)]
+
+
+# ------------------------------------------------------------
+# Partitioning
+# ------------------------------------------------------------
+def partition_rollups(conn, through_year=None) -> dict:
+    """
+    RANGE partition both rollups by year of their date column, so date
+    range queries only open the years they need. Tables that are already
+    partitioned get partitions for the missing years up to through_year.
+
+    :param conn: MySQL connection
+    :param through_year: Last year with its own partition; defaults to next year
+    :return: {table: years added}
+    :rtype: dict
+    """
+    through_year = through_year or date.today().year + 1
+    added = {}
+    cursor = conn.cursor()
+    try:
+        for table, (date_column, _) in ROLLUPS.items():
+            cursor.execute(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+                "AND PARTITION_NAME IS NOT NULL",
+                (table,)
+            )
+            existing = {name for (name,) in cursor.fetchall()}
+            years = sorted(int(name[1:]) for name in existing if name[1:].isdigit())
+
+            if not existing:
+                cursor.execute(
+                    f"SELECT YEAR(MIN({date_column})) FROM {table} "
+                    f"WHERE {date_column} > '1000-01-01'"
+                )
+                first_year = cursor.fetchone()[0] or date.today().year
+                new_years = list(range(first_year, through_year + 1))
+                cursor.execute(
+                    f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS({date_column}) ("
+                    + "".join(_year_partition(year) + ", " for year in new_years)
+                    + "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                )
+            else:
+                new_years = list(range((years[-1] + 1) if years else date.today().year,
+                                       through_year + 1))
+                if new_years:
+                    # Split the catch-all partition; it only holds rows past the last year
+                    cursor.execute(
+                        f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO ("
+                        + "".join(_year_partition(year) + ", " for year in new_years)
+                        + "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+                    )
+            added[table] = new_years
+    finally:
+        cursor.close()
+    return added
+
+
+def _year_partition(year) -> str:
+    return f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')"
+
+
+# ------------------------------------------------------------
+# Command line
+# ------------------------------------------------------------
+def bench(conn, rounds=9) -> None:
+    """Time the all-time totals from the raw table and from the rollups."""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*) FROM EquipmentTransaction WHERE TransactionID > "
+        "(SELECT LastTransactionID FROM RollupWatermark WHERE RollupName = %s)",
+        (ROLLUP_NAME,)
+    )
+    tail = cursor.fetchone()[0]
+    print(f"Live tail: {tail:,} transactions past the watermark")
+    print(f"{'Source':<10} {'Median (ms)':>12} {'Min (ms)':>9}")
+    for name, query in (("raw", RAW_TOTALS_QUERY), ("rollups", ROLLUP_TOTALS_QUERY)):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            cursor.execute(query)
+            cursor.fetchall()
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<10} {statistics.median(timings) * 1000:>12.2f} {min(timings) * 1000:>9.2f}")
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EquipmentTransaction rollups")
+    parser.add_argument("command", nargs="?", default="apply",
+                        choices=["apply", "rebuild", "check", "partition", "totals", "bench"])
+    parser.add_argument("--through", type=int, help="partition: last year with its own partition")
+    parser.add_argument("--since", type=date.fromisoformat, help="totals: first day")
+    parser.add_argument("--until", type=date.fromisoformat,
+                        help="totals: day after the last day (default tomorrow)")
+    args = parser.parse_args()
+
+    # Get a database connection
+    conn = TableData.GetDatabaseConnection()
+    if conn is None:
+        print("Failed to connect to the database.")
+        return
+
+    try:
+        if args.command == "apply":
+            new_rows, watermark = apply_deltas(conn)
+            print(f"Applied {new_rows} new transactions. Watermark is now {watermark}.")
+        elif args.command == "rebuild":
+            watermark = rebuild_rollups(conn)
+            print(f"Rollups rebuilt. Watermark is now {watermark}.")
+        elif args.command == "check":
+            cursor = conn.cursor()
+            mismatches = check_totals(cursor)
+            cursor.close()
+            if not mismatches:
+                print("Rollups match EquipmentTransaction.")
+            else:
+                print(f"{len(mismatches)} differences found (quantity, transactions):")
+                for equipment_id, kind, raw, rolled in mismatches:
+                    print(f"  EquipmentID {equipment_id} {kind}: raw={raw} rollups={rolled}")
+        elif args.command == "partition":
+            for table, years in partition_rollups(conn, args.through).items():
+                print(f"{table}: added partitions for {years or 'no new years'}")
+        elif args.command == "totals":
+            if args.since is None:
+                parser.error("totals needs --since")
+            until = args.until or date.today() + timedelta(days=1)
+            cursor = conn.cursor()
+            rows = period_totals(cursor, args.since, until)
+            cursor.close()
+            print(f"Transactions from {args.since} to {until} (exclusive)")
+            print(f"{'EquipmentID':>11} {'Type':<10} {'Quantity':>9} {'Count':>7}")
+            for equipment_id, kind, quantity, count in rows:
+                print(f"{equipment_id:>11} {kind:<10} {quantity:>9} {count:>7}")
+        else:
+            bench(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+"""
+instrumentation.py
+Timing and volume metrics for every query a script runs, so a slow
+report can be pinned on the database (execute/fetch) or on Python
+(formatting and printing).
+
+Connections are wrapped with instrument(); their cursors record, per
+statement:
+    query_execute_seconds        time in cursor.execute / executemany
+    query_fetch_seconds          time in fetchone/fetchmany/fetchall
+    query_rows                   rows fetched (or affected, for DML)
+    query_bytes                  estimated bytes in the fetched rows
+and instrument() itself records
+    connection_checkout_seconds  time waiting for a pooled connection
+Code that formats and prints wraps that work in
+    with timer("render_seconds", report=title): ...
+
+Each metric is a histogram per label set (query text with literals
+removed, or the report name) with count, sum, p50, p95 and p99. Nothing
+is recorded unless metrics are switched on with the METRICS setting in
+.env or the environment, a comma separated list of sinks:
+    METRICS=log                      summary on stderr at exit
+    METRICS=log:metrics.log          appended to a file
+    METRICS=prometheus:reports.prom  Prometheus textfile collector format
+    METRICS=json:metrics.json        JSON snapshot
+When METRICS is not set, instrument() returns the connection unchanged
+and timer() does nothing.
+
+Usage:
+    configure(secrets)               # once, with the .env values
+    conn = instrument(pool.checkout())
+    cursor = conn.cursor()           # recorded
+    with timer("render_seconds", report="Bookings"):
+        print_table(...)
+"""
+
+import atexit
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+
+# Histogram bucket upper bounds, for the Prometheus output
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Percentiles are taken over the most recent observations per label set
+RESERVOIR_SIZE = 2048
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Rows sampled per statement to estimate bytes transferred
+_BYTE_SAMPLE_ROWS = 8
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+_LABEL_LENGTH = 80
+
+
+class Histogram:
+    """Count, sum, cumulative buckets and a reservoir for percentiles."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value) -> None:
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.samples.append(value)
+
+    def percentiles(self, quantiles=PERCENTILES) -> dict:
+        """Quantile -> value over the reservoir (nearest rank)."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in quantiles}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in quantiles}
+
+    def summary(self) -> dict:
+        summary = {"count": self.count, "sum": self.total, "max": self.max}
+        for q, value in self.percentiles().items():
+            summary[f"p{int(q * 100)}"] = value
+        return summary
+
+
+class QuerySeries:
+    """
+    The per-statement histograms of one query label, looked up once and
+    updated together, so recording a statement takes one lock.
+    """
+
+    def __init__(self, lock, execute, fetch, rows, size):
+        self.lock = lock
+        self.execute = execute
+        self.fetch = fetch
+        self.rows = rows
+        self.bytes = size
+        # Rows sized so far and their total size, for the bytes estimate
+        self.sized_rows = 0
+        self.sized_bytes = 0
+
+    def wants_sample(self) -> bool:
+        return self.sized_rows < _BYTE_SAMPLE_ROWS
+
+    def record(self, execute_seconds, fetch_seconds, rows, sample=()) -> None:
+        sample_bytes = sum(row_bytes(row) for row in sample) if sample else 0
+        with self.lock:
+            self.execute.observe(execute_seconds)
+            self.rows.observe(rows)
+            if fetch_seconds is None:
+                return
+            self.fetch.observe(fetch_seconds)
+            self.sized_rows += len(sample)
+            self.sized_bytes += sample_bytes
+            if self.sized_rows:
+                self.bytes.observe(rows * self.sized_bytes / self.sized_rows)
+
+
+class Metrics:
+    """
+    Histograms by (metric name, labels), safe to share between threads.
+
+    :param sinks: Objects with emit(metrics), called by emit()
+    """
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        self._histograms = {}
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def _histogram_locked(self, name, labels) -> Histogram:
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            buckets = LATENCY_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+            histogram = self._histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, name, value, **labels) -> None:
+        with self._lock:
+            self._histogram_locked(name, tuple(sorted(labels.items()))).observe(value)
+
+    def query_series(self, label) -> QuerySeries:
+        """The execute/fetch/rows/bytes histograms for one query label."""
+        series = self._queries.get(label)
+        if series is None:
+            labels = (("query", label),)
+            with self._lock:
+                series = self._queries.get(label)
+                if series is None:
+                    series = self._queries[label] = QuerySeries(
+                        self._lock,
+                        *(self._histogram_locked(name, labels)
+                          for name in ("query_execute_seconds", "query_fetch_seconds",
+                                       "query_rows", "query_bytes")))
+        return series
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> list[tuple]:
+        """(name, labels dict, Histogram) for every series with data, sorted by name."""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        return [(name, dict(labels), histogram) for (name, labels), histogram in items
+                if histogram.count]
+
+    def emit(self) -> None:
+        """Hand the current values to every sink."""
+        for sink in self.sinks:
+            sink.emit(self)
+
+
+# ------------------------------------------------------------
+# Wrappers
+# ------------------------------------------------------------
+_labels = {}
+
+
+def statement_label(operation) -> str:
+    """Query text with literals replaced by ?, whitespace collapsed and
+    cut to a readable length, so repeats of a query share one series."""
+    label = _labels.get(operation)
+    if label is None:
+        text = operation.decode() if isinstance(operation, bytes) else str(operation)
+        label = _SPACES.sub(" ", _LITERALS.sub("?", text)).strip().rstrip(";")
+        if len(label) > _LABEL_LENGTH:
+            label = label[:_LABEL_LENGTH - 3] + "..."
+        if len(_labels) > 4096:
+            _labels.clear()
+        _labels[operation] = label
+    return label
+
+
+def _value_bytes(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    return len(str(value))
+
+
+def row_bytes(row) -> int:
+    """Approximate size of a row on the wire (text protocol)."""
+    values = row.values() if isinstance(row, dict) else row
+    return sum(_value_bytes(value) for value in values)
+
+
+class InstrumentedCursor:
+    """
+    Cursor wrapper that records execute and fetch time, rows and bytes
+    per statement. Everything else is passed through to the real cursor.
+
+    Bytes are estimated: the first rows a query returns are sized and
+    later statements of the same query reuse that average row size.
+    """
+
+    def __init__(self, cursor, metrics):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._series = None
+        self._execute_seconds = 0.0
+        self._fetch_seconds = 0.0
+        self._rows = 0
+        self._sample = []
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def execute(self, operation, *args, **kwargs):
+        return self._run(self._cursor.execute, operation, args, kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._run(self._cursor.executemany, operation, args, kwargs)
+
+    def _run(self, method, operation, args, kwargs):
+        if self._series is not None:
+            self._finish()
+        series = self._metrics.query_series(statement_label(operation))
+        start = time.perf_counter()
+        try:
+            result = method(operation, *args, **kwargs)
+        except Exception:
+            series.record(time.perf_counter() - start, None, 0)
+            raise
+        seconds = time.perf_counter() - start
+        if self._cursor.description is None:
+            # No result set: record rows affected and be done
+            series.record(seconds, None, max(self._cursor.rowcount, 0))
+        else:
+            self._series = series
+            self._execute_seconds = seconds
+        return result
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetch_seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+            if len(self._sample) < _BYTE_SAMPLE_ROWS:
+                self._sample.append(row)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(rows, time.perf_counter() - start)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(rows, time.perf_counter() - start)
+        self._finish()
+        return rows
+
+    def _fetched(self, rows, seconds) -> None:
+        self._fetch_seconds += seconds
+        self._rows += len(rows)
+        if len(self._sample) < _BYTE_SAMPLE_ROWS and rows:
+            self._sample.extend(rows[:_BYTE_SAMPLE_ROWS - len(self._sample)])
+
+    def _finish(self) -> None:
+        """Record the current statement, if any."""
+        series, self._series = self._series, None
+        if series is None:
+            return
+        # Size rows only until the query has a settled row size
+        sample = self._sample if series.wants_sample() else ()
+        series.record(self._execute_seconds, self._fetch_seconds, self._rows, sample)
+        self._fetch_seconds = 0.0
+        self._rows = 0
+        self._sample = []
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors are InstrumentedCursors."""
+
+    def __init__(self, conn, metrics):
+        self._conn = conn
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs), self._metrics)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.close()
+
+
+# ------------------------------------------------------------
+# Sinks
+# ------------------------------------------------------------
+def _format_value(name, value) -> str:
+    if name.endswith("_seconds"):
+        return f"{value * 1000:.2f}ms"
+    return f"{value:,.0f}"
+
+
+class LogSink:
+    """One line per series: count, p50, p95, p99 and max."""
+
+    def __init__(self, path=None):
+        self.path = path
+
+    def emit(self, metrics) -> None:
+        lines = []
+        for name, labels, histogram in metrics.snapshot():
+            summary = histogram.summary()
+            label_text = " ".join(f"{k}={v!r}" for k, v in labels.items())
+            stats = " ".join(f"{key}={_format_value(name, summary[key])}"
+                             for key in ("p50", "p95", "p99", "max"))
+            lines.append(f"{name} {label_text} count={summary['count']} {stats}")
+        if not lines:
+            return
+        text = "\n".join(lines) + "\n"
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as out:
+                out.write(f"# {datetime.now(timezone.utc).isoformat()} pid {os.getpid()}\n")
+                out.write(text)
+        else:
+            sys.stderr.write("\nQuery metrics\n" + text)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _label_text(labels, **extra) -> str:
+    pairs = list(labels.items()) + list(extra.items())
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+
+class PrometheusSink:
+    """
+    Histograms in the Prometheus text format, for the node_exporter
+    textfile collector. p50/p95/p99 are also written as <name>_quantile
+    gauges. The file is replaced atomically on each emit.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, metrics) -> None:
+        lines = []
+        by_name = {}
+        for name, labels, histogram in metrics.snapshot():
+            by_name.setdefault(name, []).append((labels, histogram))
+
+        for name, series in by_name.items():
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series:
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_text(labels, le=bound)} {cumulative}")
+                lines.append(f"{name}_bucket{_label_text(labels, le='+Inf')} {histogram.count}")
+                lines.append(f"{name}_sum{_label_text(labels)} {histogram.total}")
+                lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+            lines.append(f"# TYPE {name}_quantile gauge")
+            for labels, histogram in series:
+                for q, value in histogram.percentiles().items():
+                    lines.append(f"{name}_quantile{_label_text(labels, quantile=q)} {value}")
+
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            out.write("\n".join(lines) + "\n")
+        os.replace(tmp, self.path)
+
+
+class JsonSink:
+    """A JSON snapshot: one object per series with count, sum and percentiles."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def emit(self, metrics) -> None:
+        payload = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "pid": os.getpid(),
+            "metrics": [dict(name=name, labels=labels, **histogram.summary())
+                        for name, labels, histogram in metrics.snapshot()],
+        }
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            json.dump(payload, out, indent=2)
+        os.replace(tmp, self.path)
+
+
+SINKS = {"log": LogSink, "prometheus": PrometheusSink, "json": JsonSink}
+
+
+def parse_sinks(spec) -> list:
+    """
+    Build sinks from a METRICS value such as "log,json:metrics.json".
+
+    :raises ValueError: for an unknown sink or a missing path
+    """
+    sinks = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, path = part.partition(":")
+        if kind not in SINKS:
+            raise ValueError(f"Unknown metrics sink {kind!r}; use one of {', '.join(SINKS)}")
+        if kind != "log" and not path:
+            raise ValueError(f"Metrics sink {kind!r} needs a path, e.g. {kind}:metrics.out")
+        sinks.append(SINKS[kind](path or None))
+    return sinks
+
+
+# ------------------------------------------------------------
+# Process-wide metrics
+# ------------------------------------------------------------
+_metrics = None
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure(secrets=None, sinks=None) -> Metrics | None:
+    """
+    Switch metrics on for this process, once. Later calls return the
+    existing Metrics.
+
+    :param secrets: .env values; METRICS is read from here, then from
+        the environment
+    :param sinks: Sinks to use instead of the METRICS setting
+    :return: The process Metrics, or None when metrics are off
+    :rtype: Metrics | None
+    """
+    global _metrics, _configured
+    with _configure_lock:
+        if _configured:
+            return _metrics
+        _configured = True
+        if sinks is None:
+            spec = (secrets or {}).get("METRICS") or os.environ.get("METRICS")
+            if not spec:
+                return None
+            sinks = parse_sinks(spec)
+        _metrics = Metrics(sinks)
+        atexit.register(_metrics.emit)
+        return _metrics
+
+
+def get_metrics() -> Metrics | None:
+    return _metrics
+
+
+def instrument(conn, metrics=None):
+    """
+    Wrap a connection so its cursors are timed. Returns the connection
+    unchanged when metrics are off, so there is no overhead then.
+
+    :param conn: MySQL or pooled connection
+    :param metrics: Metrics to record into, defaults to the process one
+    :return: InstrumentedConnection, or conn
+    """
+    metrics = metrics or _metrics
+    if metrics is None or conn is None:
+        return conn
+    checkout = getattr(conn, "checkout_seconds", None)
+    if checkout is not None:
+        metrics.observe("connection_checkout_seconds", checkout)
+    return InstrumentedConnection(conn, metrics)
+
+
+def timer(name, **labels):
+    """Time a block into the process metrics; does nothing when they are off."""
+    return _metrics.timer(name, **labels) if _metrics is not None else nullcontext()
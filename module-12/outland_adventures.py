@@ -3,19 +3,31 @@ outland_adventures.py
 Connects to the outland_adventures MySQL database using .env credentials
 and prints clean, presentation friendly report samples.
 
+With --max-age N every report is also saved as a snapshot file, and a
+later run shows a saved report younger than N seconds straight from the
+file instead of querying MySQL again (it connects only for the others).
+
 Expected folder layout:
 module-11/
   outland_adventures.py
   .env
 """
 
+import argparse
 import os
-import mysql.connector
+import time
 from mysql.connector import Error
 from dotenv import dotenv_values
-from prettytable import PrettyTable # Run "pip install PrettyTable" in terminal if you don't have it
 
-def get_connection():
+from connection_pool import get_pool, pool_options, PoolExhaustedError
+from report_runner import run_reports, print_timings
+from column_formatters import TableFormatter
+import table_renderer
+from result_cache import get_cache
+from instrumentation import configure, instrument, timer
+from snapshot_store import Snapshot, SnapshotStore, snapshot_folder
+
+def get_secrets():
     script_dir = os.path.dirname(os.path.abspath(__file__))
     secrets_path = os.path.join(script_dir, ".env")
     secrets = dotenv_values(secrets_path)
@@ -27,16 +39,34 @@ def get_connection():
             f"Missing or empty values in .env for: {', '.join(missing)}. "
             f"Make sure .env is in: {script_dir}"
         )
+    return secrets
+
+
+def get_connection():
+    secrets = get_secrets()
+    config = {
+        "host": secrets["HOST"],
+        "user": secrets["USER"],
+        "password": secrets["PASSWORD"],
+        "database": secrets["DATABASE"]
+    }
+
+    # Connections come from the shared pool; close() hands them back.
+    # With METRICS set in .env, every query on them is timed.
+    configure(secrets)
+    return instrument(get_pool(config, **pool_options(secrets)).checkout())
+
 
-    return mysql.connector.connect(
-        host=secrets["HOST"],
-        user=secrets["USER"],
-        password=secrets["PASSWORD"],
-        database=secrets["DATABASE"]
-    )
+# Money and percent formatting for report readability
+MONEY_COLS = {
+    "Initial Cost", "Total Sale Revenue", "Total Rental Revenue", "Total Combined Revenue", "Total Profit"
+}
+PERCENT_COLS = set()
 
 
 def fmt_value(val, col_name=""):
+    # Formats a single cell. render_table formats whole columns with
+    # TableFormatter instead; this stays for one-off values.
     if val is None:
         return ""
 
@@ -44,19 +74,13 @@ def fmt_value(val, col_name=""):
     if hasattr(val, "strftime"):
         return val.strftime("%Y-%m-%d")
 
-    # Money and percent formatting for report readability
-    money_cols = {
-        "Initial Cost", "Total Sale Revenue", "Total Rental Revenue", "Total Combined Revenue", "Total Profit"
-    }
-    percent_cols = {""}
-
-    if col_name in money_cols:
+    if col_name in MONEY_COLS:
         try:
             return f"${float(val):,.2f}"
         except Exception:
             return str(val)
 
-    if col_name in percent_cols:
+    if col_name in PERCENT_COLS:
         try:
             return f"{float(val):.2f}%"
         except Exception:
@@ -66,97 +90,150 @@ def fmt_value(val, col_name=""):
     return str(val)
 
 
-def print_table(cursor, title,query):
+def print_table(cursor, title,query, cache=None):
+    if cache is not None:
+        # Served from memory while the underlying tables are unchanged
+        columns, rows = cache.execute(cursor, query)
+        types = None
+    else:
+        # Execute query to fetch all data
+        cursor.execute(query)
+
+        # Fetch all rows
+        rows = cursor.fetchall()
+
+        # Get column names and types
+        columns = [desc[0] for desc in cursor.description]
+        types = [desc[1] for desc in cursor.description]
+
+    render_table(title, rows, columns, types)
+
+
+def render_table(title, rows, columns, types=None):
     print("\n" + title)
     print("-" * len(title))
 
-    # Execute query to fetch all data
-    cursor.execute(query)
-
-    # Fetch all rows
-    rows = cursor.fetchall()
-    
     if not rows:
         print("No rows returned.")
         return
-    # Create PrettyTable object
-    table = PrettyTable(field_names=[])
-    
-    # Get column names
-    table.field_names = [desc[0] for desc in cursor.description]
-
-    # Add rows to the table
-    # Add formatted rows
-    formatted_rows = []
-    formatted_row = []
-    for row in rows:
-        for i in range(len(row)):
-            formatted_row.append(fmt_value(row[table.field_names[i]], table.field_names[i]))
-        table.add_row(formatted_row)
-        formatted_row = []
-
-    
-    # Print the table
-    print(table)
-
-
-def connect_and_print_reports():
-    connection = None
-    cursor = None
 
-    try:
-        connection = get_connection()
-        print("Successfully connected to MySQL.")
-        print("Database:", connection.database)
-
-        cursor = connection.cursor(dictionary=True)
-
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 1: Booking Summary by Trip and Region
-        # ------------------------------------------------------------
-        query = "SELECT * From RegionBookingParticipantsReport"
-        print_table(
-            cursor=cursor,
-            title="Report Sample: Booking Summary by Trip and Region",
-            query = query
-        )
+    # Boxed table in PrettyTable's layout, formatted column by column
+    with timer("render_seconds", report=title):
+        formatter = TableFormatter(columns, types, MONEY_COLS, PERCENT_COLS)
+        table_renderer.render_table(columns, formatter.format_columns(rows), style="grid")
 
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 2: Equipment Age and Inventory Status
-        # ------------------------------------------------------------
-        query = "SELECT * From EquipmentAgeAndInventoryStatus"
 
-        print_table(
-            cursor=cursor,
-            title="Report Sample: Equipment Age and Inventory Status",
-            query = query
-        )
+# ------------------------------------------------------------
+# Report definitions as (title, query). The reports do not depend on
+# each other, so they run in parallel on separate pooled connections.
+# ------------------------------------------------------------
+REPORTS = [
+    # REPORT SAMPLE 1: Booking Summary by Trip and Region
+    ("Report Sample: Booking Summary by Trip and Region",
+     "SELECT * From RegionBookingParticipantsReport"),
 
-        # ------------------------------------------------------------
-        # REPORT SAMPLE 3: Equipment Profit and Rental Performance
-        # Uses the view EquipmentProfitViewWithRentals
-        # ------------------------------------------------------------
-        query = "SELECT * From EquipmentProfitViewWithRentals"
+    # REPORT SAMPLE 2: Equipment Age and Inventory Status
+    ("Report Sample: Equipment Age and Inventory Status",
+     "SELECT * From EquipmentAgeAndInventoryStatus"),
+
+    # REPORT SAMPLE 3: Equipment Profit and Rental Performance
+    # Uses the view EquipmentProfitViewWithRentals
+    ("Report Sample: Equipment Profit and Rental Performance",
+     "SELECT * From EquipmentProfitViewWithRentals"),
+]
+
+
+def saved_reports(store, max_age):
+    """Snapshots in store of the reports that are younger than max_age seconds."""
+    saved = {}
+    for title, _ in REPORTS:
+        snapshot = store.get(title)
+        if snapshot is not None and snapshot.age_seconds <= max_age:
+            saved[title] = snapshot
+    return saved
 
-        print_table(
-            cursor=cursor,
-            title="Report Sample: Equipment Profit and Rental Performance",
-            query = query
-        )
 
-        print("\nDone. MySQL connection will now close.")
+def connect_and_print_reports(show_timings=True, cache=None, store=None, max_age=0):
+    connection = None
+
+    try:
+        # Reports saved by an earlier run are shown from their files
+        saved = saved_reports(store, max_age) if store is not None else {}
+        pending = [report for report in REPORTS if report[0] not in saved]
+
+        results = []
+        if pending:
+            connection = get_connection()
+            print("Successfully connected to MySQL.")
+            print("Database:", connection.database)
+
+            # Hand the connection back so the first report can reuse it
+            connection.close()
+            connection = None
+
+            # Run every report at once, then print them in the listed order
+            start = time.perf_counter()
+            results = run_reports(get_connection, pending, cache=cache)
+            wall_seconds = time.perf_counter() - start
+
+            for result in results:
+                if result.error is not None:
+                    raise result.error
+                if store is not None:
+                    store.put(Snapshot.from_result(result.title, result))
+
+        computed = {result.title: result for result in results}
+        for title, _ in REPORTS:
+            if title in saved:
+                snapshot = saved[title]
+                render_table(title, snapshot.rows, snapshot.columns, snapshot.types)
+                print(f"(from snapshot, {snapshot.staleness()})")
+            else:
+                result = computed[title]
+                render_table(result.title, result.rows, result.columns, result.types)
+
+        if show_timings and results:
+            print_timings(results, wall_seconds)
+
+        print("\nDone. MySQL connections will now be returned to the pool.")
 
     except Error as e:
         print(f"\nDatabase error: {e}")
     except ValueError as e:
         print(f"\nConfiguration error: {e}")
+    except PoolExhaustedError as e:
+        print(f"\nConnection pool error: {e}")
     finally:
-        if cursor is not None:
-            cursor.close()
         if connection is not None and connection.is_connected():
             connection.close()
-            print("MySQL connection is closed.")
+            print("MySQL connection returned to the pool.")
 
 
 if __name__ == "__main__":
-    connect_and_print_reports()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--watch", type=float, default=0,
+                        help="refresh the reports every N seconds (uses the result cache)")
+    parser.add_argument("--max-age", type=float, default=0,
+                        help="save reports as snapshots and reuse ones younger than N seconds")
+    args = parser.parse_args()
+
+    store = None
+    if args.max_age > 0:
+        try:
+            store = SnapshotStore(snapshot_folder(get_secrets()["DATABASE"]))
+        except ValueError as e:
+            print(f"\nConfiguration error: {e}")
+            raise SystemExit(1)
+
+    if args.watch <= 0:
+        connect_and_print_reports(store=store, max_age=args.max_age)
+    else:
+        # Dashboard mode: refreshes hit memory until the tables change
+        cache = get_cache()
+        try:
+            while True:
+                connect_and_print_reports(show_timings=False, cache=cache, store=store,
+                                          max_age=args.max_age)
+                time.sleep(args.watch)
+        except KeyboardInterrupt:
+            print(f"\nCache stats: {cache.stats}")
@@ -0,0 +1,615 @@
+"""
+snapshot_file.py
+Compact binary file format for report results, read through mmap.
+
+A result is stored column by column, not row by row:
+    - integer, decimal, float, date, datetime and time columns are
+      fixed-width arrays (decimals as integers scaled by 10**scale,
+      dates as day numbers, datetimes and times as microseconds)
+    - text and bytes columns are one heap of bytes plus an array of
+      offsets into it, so value i is heap[offsets[i]:offsets[i + 1]]
+    - a column holding NULLs has one byte per row marking them
+
+Opening a file maps it and parses only the small header. Each column is
+then a memoryview straight into the mapping (a numpy array when numpy is
+installed): nothing is copied or decoded until values are read. A
+multi-GB snapshot opens instantly, showing the first page decodes only
+that page, and where() filters a numeric column without building rows.
+
+Layout:
+    MAGIC (8 bytes) | header length (uint32) | header (JSON) | padding
+    column blocks, each starting on an 8-byte boundary
+
+Usage:
+    write_snapshot(path, snapshot)
+    mapped = open_snapshot(path)
+    first_page = mapped.rows[:20]
+    tents = mapped.take(mapped.where("Category", "=", "Tent"))
+"""
+
+import json
+import math
+import mmap
+import operator
+import struct
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation, localcontext
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MAGIC = b"OASNAP\x00\x02"
+FORMAT_VERSION = 2
+
+_LENGTH = struct.Struct("<I")
+_ALIGN = 8
+
+# Rows decoded at a time when iterating a whole snapshot
+CHUNK_ROWS = 65536
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+# Decimals with more digits after the point are kept as text
+_MAX_SCALE = 18
+
+# Fixed-width kinds and their array typecode
+_FIXED = {
+    "int": "q",
+    "bool": "q",
+    "float": "d",
+    "decimal": "q",
+    "date": "i",
+    "datetime": "q",
+    "timedelta": "q",
+}
+# Kinds kept in the string heap, and how a value is read back
+_HEAP = {
+    "str": lambda raw: raw.decode("utf-8"),
+    "bytes": bytes,
+    "bigint": lambda raw: int(raw),
+    "decimal_text": lambda raw: Decimal(raw.decode("ascii")),
+    # Anything else (tz-aware datetimes, sets, ...) is kept as its str()
+    "text": lambda raw: raw.decode("utf-8"),
+}
+
+OPERATORS = {
+    "=": operator.eq,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class SnapshotFormatError(ValueError):
+    """The file is not a snapshot this module can read."""
+
+
+# ------------------------------------------------------------
+# Writing
+# ------------------------------------------------------------
+def value_kind(value) -> str:
+    """How one Python value is stored."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, Decimal):
+        return "decimal"
+    if isinstance(value, datetime):
+        return "datetime" if value.tzinfo is None else "text"
+    if isinstance(value, date):
+        return "date"
+    if isinstance(value, timedelta):
+        return "timedelta"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, (bytes, bytearray)):
+        return "bytes"
+    return "text"
+
+
+def column_kind(values) -> str:
+    """How a column holding these values is stored."""
+    # One value_kind() call per Python type, not per value
+    types = set(map(type, values))
+    types.discard(type(None))
+    kinds = set()
+    for t in types:
+        if t is datetime:
+            aware = any(v.tzinfo is not None for v in values if type(v) is datetime)
+            kinds.add("text" if aware else "datetime")
+        else:
+            kinds.add(value_kind(next(v for v in values if type(v) is t)))
+    if not kinds:
+        return "str"
+    if len(kinds) == 1:
+        return kinds.pop()
+    # e.g. SUM(CASE ...) mixing integer and decimal branches
+    if kinds <= {"int", "decimal"}:
+        return "decimal"
+    if kinds <= {"int", "float", "bool"}:
+        return "float"
+    return "text"
+
+
+# Stored in place of NULL in fixed-width columns (the null mask says which)
+_NULL_STANDIN = {
+    "int": 0,
+    "bool": 0,
+    "float": 0.0,
+    "decimal": Decimal(0),
+    "date": date(1970, 1, 1),
+    "datetime": _EPOCH,
+    "timedelta": timedelta(0),
+}
+
+
+def _encode_fixed(kind, values, has_nulls):
+    """(kind, scale, array) for a fixed-width column, or None to use the heap."""
+    if has_nulls:
+        standin = _NULL_STANDIN[kind]
+        values = [standin if v is None else v for v in values]
+    scale = 0
+    try:
+        if kind in ("int", "bool", "float"):
+            stored = array(_FIXED[kind], values)
+        elif kind == "decimal":
+            decimals = [v if type(v) is Decimal else Decimal(v) for v in values]
+            exponents = {d.as_tuple().exponent for d in decimals}
+            if any(isinstance(e, str) for e in exponents):
+                # NaN or Infinity
+                return None
+            scale = max(-min(exponents, default=0), 0)
+            if scale > _MAX_SCALE:
+                return None
+            # Exact: a value that fits in int64 has at most 19 digits
+            with localcontext() as context:
+                context.prec = 60
+                stored = array("q", [int(d.scaleb(scale)) for d in decimals])
+        elif kind == "date":
+            stored = array("i", map(date.toordinal, values))
+        elif kind == "datetime":
+            stored = array("q", [(v - _EPOCH) // _MICROSECOND for v in values])
+        elif kind == "timedelta":
+            stored = array("q", [v // _MICROSECOND for v in values])
+        else:
+            return None
+    except OverflowError:
+        # e.g. BIGINT UNSIGNED above 2**63 - 1
+        return None
+    return kind, scale, stored
+
+
+def _encode_heap(kind, values):
+    """(kind, offsets array, heap bytes) for a text-like column."""
+    if kind == "int":
+        kind = "bigint"
+    elif kind == "decimal":
+        kind = "decimal_text"
+    elif kind not in _HEAP:
+        kind = "text"
+
+    if kind == "bytes":
+        encoded = [b"" if v is None else bytes(v) for v in values]
+    elif kind == "str":
+        encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+    else:
+        encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = array("q", accumulate(map(len, encoded), initial=0))
+    return kind, offsets, b"".join(encoded)
+
+
+def _aligned(position) -> int:
+    return (position + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def write_snapshot(path, snapshot) -> int:
+    """
+    Write a snapshot (anything with name, columns, rows, types,
+    computed_at, query_seconds and refresh_seconds) to path.
+
+    :param path: File to create or overwrite
+    :param snapshot: Snapshot whose rows are tuples in columns order
+    :return: Bytes written
+    :rtype: int
+    """
+    rows = snapshot.rows
+    blocks = []
+    position = 0
+
+    def add_block(data) -> list:
+        nonlocal position
+        start = _aligned(position)
+        raw = memoryview(data).cast("B")
+        blocks.append((start, raw))
+        position = start + raw.nbytes
+        return [start, raw.nbytes]
+
+    column_specs = []
+    columns = list(zip(*rows)) if len(rows) else [()] * len(snapshot.columns)
+    for name, values in zip(snapshot.columns, columns):
+        kind = column_kind(values)
+        spec = {"name": name, "kind": kind, "scale": 0, "data": None,
+                "offsets": None, "nulls": None}
+        has_nulls = None in values
+
+        fixed = _encode_fixed(kind, values, has_nulls) if kind in _FIXED else None
+        if fixed is not None:
+            spec["kind"], spec["scale"], stored = fixed
+            spec["data"] = add_block(stored)
+        else:
+            spec["kind"], offsets, heap = _encode_heap(kind, values)
+            spec["offsets"] = add_block(offsets)
+            spec["data"] = add_block(heap)
+
+        if has_nulls:
+            spec["nulls"] = add_block(bytes([v is None for v in values]))
+        column_specs.append(spec)
+
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "name": snapshot.name,
+        "row_count": len(rows),
+        "types": list(snapshot.types) if snapshot.types is not None else None,
+        "computed_at": snapshot.computed_at,
+        "query_seconds": snapshot.query_seconds,
+        "refresh_seconds": snapshot.refresh_seconds,
+        "columns": column_specs,
+    }, default=str).encode("utf-8")
+
+    base = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+    with open(path, "wb") as out:
+        out.write(MAGIC)
+        out.write(_LENGTH.pack(len(header)))
+        out.write(header)
+        written = len(MAGIC) + _LENGTH.size + len(header)
+        for start, raw in blocks:
+            out.write(b"\0" * (base + start - written))
+            out.write(raw)
+            written = base + start + raw.nbytes
+    return written
+
+
+# ------------------------------------------------------------
+# Reading
+# ------------------------------------------------------------
+def parse_value(text, kind):
+    """
+    Turn command-line text into a value comparable with a column of
+    this kind (e.g. "2024-05-01" for a date column).
+    """
+    try:
+        if kind in ("int", "bigint"):
+            return int(text)
+        if kind == "bool":
+            return text.strip().lower() in ("1", "true", "yes")
+        if kind == "float":
+            return float(text)
+        if kind in ("decimal", "decimal_text"):
+            return Decimal(text)
+        if kind == "date":
+            return date.fromisoformat(text)
+        if kind == "datetime":
+            return datetime.fromisoformat(text)
+    except (ValueError, InvalidOperation):
+        raise ValueError(f"{text!r} is not a valid {kind} value") from None
+    if kind == "bytes":
+        return text.encode("utf-8")
+    return text
+
+
+class SnapshotColumn:
+    """
+    One column of a MappedSnapshot. Its arrays are views into the
+    mapped file; values are decoded only when read.
+    """
+
+    def __init__(self, buffer, base, spec, length):
+        self.name = spec["name"]
+        self.kind = spec["kind"]
+        self.scale = spec["scale"]
+        self.length = length
+        self.fixed = self.kind in _FIXED
+        code = _FIXED.get(self.kind, "B")
+        self.data = _view(buffer, base, spec["data"], code)
+        self.offsets = _view(buffer, base, spec["offsets"], "q") if spec["offsets"] else None
+        self.nulls = _view(buffer, base, spec["nulls"], "B") if spec["nulls"] else None
+        self._decode = _HEAP.get(self.kind)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i):
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        if self.fixed:
+            return self._from_stored(self.data[i])
+        return self._decode(bytes(self.data[self.offsets[i]:self.offsets[i + 1]]))
+
+    def values(self, start=0, stop=None) -> list:
+        """Decoded values of rows start..stop."""
+        stop = self.length if stop is None else min(stop, self.length)
+        if start >= stop:
+            return []
+        if self.fixed:
+            stored = self.data[start:stop].tolist()
+            if self.kind in ("int", "float"):
+                values = stored
+            else:
+                values = list(map(self._from_stored, stored))
+        else:
+            offsets = self.offsets[start:stop + 1].tolist()
+            first = offsets[0]
+            heap = bytes(self.data[first:offsets[-1]])
+            decode = self._decode
+            spans = zip(offsets, offsets[1:])
+            if self.nulls is None:
+                return [decode(heap[a - first:b - first]) for a, b in spans]
+            # NULLs are stored as empty, which int() and Decimal() reject
+            return [None if null else decode(heap[a - first:b - first])
+                    for (a, b), null in zip(spans, self.nulls[start:stop])]
+        if self.nulls is not None:
+            values = [None if null else v for v, null in zip(values, self.nulls[start:stop])]
+        return values
+
+    def array(self):
+        """
+        The stored values as a numpy array over the mapped file, with no
+        copy (decimals scaled, dates as day numbers, NULLs as 0). None for
+        heap columns or without numpy.
+        """
+        if np is None or not self.fixed:
+            return None
+        return np.frombuffer(self.data, dtype=np.dtype(self.data.format))
+
+    def null_mask(self):
+        """numpy bool array, True where the value is NULL (None if there are none)."""
+        if np is None or self.nulls is None:
+            return None
+        return np.frombuffer(self.nulls, dtype=np.uint8).astype(bool)
+
+    def where(self, op, value) -> list[int]:
+        """
+        Indexes of the rows whose value compares true against value.
+        NULLs never match.
+
+        :param op: One of OPERATORS, e.g. ">="
+        :param value: Python value (parse_value turns text into one)
+        """
+        compare = OPERATORS[op]
+        if value is None:
+            return []
+        if self.fixed and np is not None:
+            return self._where_array(op, value)
+        if self.kind == "str" and compare in (operator.eq, operator.ne) and np is not None:
+            return self._where_text(compare, str(value))
+
+        hits = []
+        for start in range(0, self.length, CHUNK_ROWS):
+            for i, v in enumerate(self.values(start, start + CHUNK_ROWS), start):
+                if v is not None and compare(v, value):
+                    hits.append(i)
+        return hits
+
+    def _where_array(self, op, value) -> list[int]:
+        stored = self._to_stored(value)
+        if self.kind == "decimal" and stored != int(stored):
+            # value has more decimal places than the column: no row is
+            # equal to it, and < / > round towards the stored integers
+            if op in ("=", "=="):
+                return []
+            if op in ("<", "<="):
+                op, stored = "<=", math.floor(stored)
+            elif op in (">", ">="):
+                op, stored = ">=", math.ceil(stored)
+            stored = int(stored)
+        elif self.kind == "decimal":
+            stored = int(stored)
+        hits = OPERATORS[op](self.array(), stored)
+        if self.nulls is not None:
+            hits &= ~self.null_mask()
+        return np.flatnonzero(hits).tolist()
+
+    def _where_text(self, compare, value) -> list[int]:
+        target = value.encode("utf-8")
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        # Only values of the same byte length can be equal
+        candidates = np.flatnonzero(np.diff(offsets) == len(target)).tolist()
+        data = self.data
+        equal = [i for i in candidates if data[offsets[i]:offsets[i + 1]] == target]
+        if compare is operator.eq:
+            hits = equal
+        else:
+            mask = np.ones(self.length, dtype=bool)
+            mask[equal] = False
+            hits = np.flatnonzero(mask).tolist()
+        if self.nulls is not None:
+            nulls = self.nulls
+            hits = [i for i in hits if not nulls[i]]
+        return hits
+
+    def _from_stored(self, stored):
+        kind = self.kind
+        if kind == "decimal":
+            return Decimal(stored).scaleb(-self.scale)
+        if kind == "date":
+            return date.fromordinal(stored)
+        if kind == "datetime":
+            return _EPOCH + timedelta(microseconds=stored)
+        if kind == "timedelta":
+            return timedelta(microseconds=stored)
+        if kind == "bool":
+            return bool(stored)
+        return stored
+
+    def _to_stored(self, value):
+        kind = self.kind
+        if kind == "decimal":
+            return Decimal(value).scaleb(self.scale)
+        if kind == "date":
+            if isinstance(value, datetime):
+                value = value.date()
+            return value.toordinal()
+        if kind == "datetime":
+            return (value - _EPOCH) // _MICROSECOND
+        if kind == "timedelta":
+            return value // _MICROSECOND
+        return value
+
+
+def _view(buffer, base, block, code):
+    start, nbytes = block
+    return buffer[base + start:base + start + nbytes].cast(code)
+
+
+class SnapshotRows:
+    """
+    The rows of a MappedSnapshot as a read-only sequence of tuples.
+    Indexing or slicing decodes only the rows asked for.
+    """
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return self._snapshot.row_count
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                return self._snapshot.take(range(start, stop, step))
+            return self._snapshot.slice(start, stop)
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("snapshot row index out of range")
+        return tuple(column[item] for column in self._snapshot.column_data)
+
+    def __iter__(self):
+        for start in range(0, len(self), CHUNK_ROWS):
+            yield from self._snapshot.slice(start, start + CHUNK_ROWS)
+
+
+class MappedSnapshot:
+    """
+    A snapshot file opened through mmap.
+
+    :param path: File written by write_snapshot
+    :raises SnapshotFormatError: if the file is not a readable snapshot
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty file
+                raise SnapshotFormatError(f"{path} is empty") from None
+
+        try:
+            header = self._read_header()
+        except Exception:
+            self._mmap.close()
+            raise
+        self.name = header["name"]
+        self.row_count = header["row_count"]
+        self.types = header["types"]
+        self.computed_at = header["computed_at"]
+        self.query_seconds = header["query_seconds"]
+        self.refresh_seconds = header["refresh_seconds"]
+        self.columns = [spec["name"] for spec in header["columns"]]
+
+        base = _aligned(len(MAGIC) + _LENGTH.size + self._header_length)
+        self._buffer = memoryview(self._mmap)
+        self.column_data = [SnapshotColumn(self._buffer, base, spec, self.row_count)
+                            for spec in header["columns"]]
+        self.rows = SnapshotRows(self)
+
+    def _read_header(self) -> dict:
+        mapped = self._mmap
+        prefix = len(MAGIC) + _LENGTH.size
+        if len(mapped) < prefix or mapped[:len(MAGIC)] != MAGIC:
+            raise SnapshotFormatError(f"{self.path} is not a snapshot file")
+        (self._header_length,) = _LENGTH.unpack_from(mapped, len(MAGIC))
+        try:
+            header = json.loads(mapped[prefix:prefix + self._header_length])
+        except ValueError:
+            raise SnapshotFormatError(f"{self.path} has a damaged header") from None
+        if header.get("version") != FORMAT_VERSION:
+            raise SnapshotFormatError(f"{self.path} is format {header.get('version')}, "
+                                      f"expected {FORMAT_VERSION}")
+        if header.get("byteorder") != sys.byteorder:
+            raise SnapshotFormatError(f"{self.path} was written on a {header.get('byteorder')}"
+                                      "-endian machine")
+        return header
+
+    def column(self, name) -> SnapshotColumn:
+        try:
+            return self.column_data[self.columns.index(name)]
+        except ValueError:
+            raise KeyError(f"No column {name!r}; columns: {', '.join(self.columns)}") from None
+
+    def slice(self, start, stop) -> list[tuple]:
+        """Rows start..stop, decoded column by column."""
+        return list(zip(*(column.values(start, stop) for column in self.column_data)))
+
+    def take(self, indexes) -> list[tuple]:
+        """The rows at the given indexes, in that order."""
+        indexes = list(indexes)
+        return list(zip(*([column[i] for i in indexes] for column in self.column_data)))
+
+    def where(self, column, op, value) -> list[int]:
+        """Indexes of the rows where column <op> value (see SnapshotColumn.where)."""
+        return self.column(column).where(op, value)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mmap)
+
+    def close(self) -> None:
+        """
+        Unmap the file. Views handed out (column arrays) keep the mapping
+        alive until they are gone; it is then released by the GC.
+        """
+        for column in self.column_data:
+            for view in (column.data, column.offsets, column.nulls):
+                if view is not None:
+                    _release(view)
+        _release(self._buffer)
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _release(view) -> None:
+    try:
+        view.release()
+    except BufferError:
+        # A numpy array still uses it
+        pass
+
+
+def open_snapshot(path) -> MappedSnapshot:
+    """Map a snapshot file; see MappedSnapshot."""
+    return MappedSnapshot(path)
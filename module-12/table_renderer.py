@@ -0,0 +1,294 @@
+"""
+table_renderer.py
+Text table rendering for report output, replacing PrettyTable and the
+hand-rolled loops in print_table.
+
+Two modes:
+    render_table   - buffered. Takes column-major cells (what
+                     TableFormatter.format_columns returns), measures each
+                     column with one max() call, then writes the rows
+                     through a single format template in large chunks.
+    StreamingTable - fixed width. Column widths come from declared column
+                     sizes (declared_widths) or from the first batch of
+                     rows, then rows are printed as they arrive. Cells
+                     wider than their column are cut short, unless
+                     max_width is None: then they run past it instead.
+
+Styles:
+    plain - "a | b" with a "--+--" rule under the header (print_table)
+    grid  - boxed, with centred cells, like PrettyTable's default
+
+Usage:
+    cells = TableFormatter(columns, types).format_columns(rows)
+    render_table(columns, cells, style="grid")
+
+    with StreamingTable(columns, widths=declared_widths(cursor, "Booking")) as table:
+        for batch in batches:
+            table.write(batch)
+"""
+
+import sys
+from itertools import islice
+
+from column_formatters import TableFormatter
+
+
+STYLES = {
+    "plain": {
+        "left": "", "sep": " | ", "right": "",
+        "rule_left": "", "rule_sep": "-+-", "rule_right": "",
+        "boxed": False, "align": "<",
+    },
+    "grid": {
+        "left": "| ", "sep": " | ", "right": " |",
+        "rule_left": "+-", "rule_sep": "-+-", "rule_right": "-+",
+        "boxed": True, "align": "^",
+    },
+}
+
+# Lines joined and written per out.write() call
+CHUNK_ROWS = 5000
+
+# Widest column StreamingTable and declared_widths will allow
+MAX_WIDTH = 40
+
+
+def column_widths(columns, column_cells, max_width=None) -> list[int]:
+    """
+    Width of each column: its longest cell or its name, whichever is wider.
+
+    :param columns: Column names
+    :param column_cells: One list of formatted strings per column
+    :param max_width: Optional cap on any column's width
+    :return: Width per column
+    :rtype: list[int]
+    """
+    widths = [max(len(name), max(map(len, cells), default=0))
+              for name, cells in zip(columns, column_cells)]
+    if max_width is not None:
+        widths = [min(w, max(max_width, len(name))) for w, name in zip(widths, columns)]
+    return widths
+
+
+def fit(cell, width) -> str:
+    """Cut a cell down to width characters, marking the cut with '...'."""
+    if len(cell) <= width:
+        return cell
+    if width <= 3:
+        return cell[:width]
+    return cell[:width - 3] + "..."
+
+
+def _fit_column(cells, width) -> list[str]:
+    # Only copy the column when something in it is too wide
+    if max(map(len, cells), default=0) <= width:
+        return cells
+    return [fit(cell, width) for cell in cells]
+
+
+class _Layout:
+    """Precomputed header, rule and row template for one set of widths."""
+
+    def __init__(self, columns, widths, style="plain", align=None):
+        if style not in STYLES:
+            raise ValueError(f"Unknown table style {style}")
+        s = STYLES[style]
+        align = align or s["align"]
+
+        self.widths = list(widths)
+        self.boxed = s["boxed"]
+        # One str.format call per row instead of one ljust per cell
+        self.template = self._template(s, align)
+        self.rule = (s["rule_left"]
+                     + s["rule_sep"].join("-" * w for w in self.widths)
+                     + s["rule_right"])
+        # Boxed headers are centred, plain ones sit left like print_table's
+        names = [fit(name, w) for name, w in zip(columns, self.widths)]
+        self.header = self._template(s, "^" if self.boxed else "<").format(*names)
+
+    def _template(self, s, align) -> str:
+        return (s["left"]
+                + s["sep"].join(f"{{:{align}{w}}}" for w in self.widths)
+                + s["right"])
+
+    def head(self) -> str:
+        if self.boxed:
+            return f"{self.rule}\n{self.header}\n{self.rule}\n"
+        return f"{self.header}\n{self.rule}\n"
+
+    def foot(self) -> str:
+        return f"{self.rule}\n" if self.boxed else ""
+
+    def lines(self, rows) -> str:
+        template = self.template.format
+        return "".join([template(*row) + "\n" for row in rows])
+
+
+def render_table(columns, column_cells, out=None, style="plain", align=None,
+                 widths=None, max_width=None) -> int:
+    """
+    Write a whole table in one pass over the rows.
+
+    :param columns: Column names
+    :param column_cells: One list of formatted strings per column, as
+        returned by TableFormatter.format_columns
+    :param out: File-like object to write to (sys.stdout by default)
+    :param style: "plain" or "grid"
+    :param align: Format alignment for cells ("<", "^" or ">"); the
+        style's default when None
+    :param widths: Fixed column widths. Longer cells are cut short.
+        Measured from the cells when None.
+    :param max_width: Cap on measured column widths
+    :return: Rows written
+    :rtype: int
+    """
+    out = out if out is not None else sys.stdout
+    if widths is None:
+        widths = column_widths(columns, column_cells, max_width)
+        needs_fit = max_width is not None
+    else:
+        needs_fit = True
+    if needs_fit:
+        column_cells = [_fit_column(cells, w) for cells, w in zip(column_cells, widths)]
+
+    layout = _Layout(columns, widths, style, align)
+    out.write(layout.head())
+
+    # zip walks the columns row by row without building a row list
+    rows = zip(*column_cells)
+    count = 0
+    while True:
+        chunk = list(islice(rows, CHUNK_ROWS))
+        if not chunk:
+            break
+        out.write(layout.lines(chunk))
+        count += len(chunk)
+
+    out.write(layout.foot())
+    return count
+
+
+def declared_widths(cursor, table_name, columns=None, max_width=MAX_WIDTH) -> list[int]:
+    """
+    Column widths from the declared column types, so a streamed table can
+    start printing before any rows are read. VARCHAR(n) gives n,
+    DECIMAL(p, s) gives room for p digits, sign and point, dates give 10.
+
+    :param cursor: MySQL cursor object
+    :param table_name: Table or view being printed
+    :param columns: Column names in output order; all columns when None
+    :param max_width: Cap on any column's width
+    :return: Width per column
+    :rtype: list[int]
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION "
+        "FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+        (table_name,)
+    )
+    declared = {}
+    for name, data_type, char_length, precision in cursor.fetchall():
+        data_type = data_type.lower()
+        if char_length is not None:
+            width = char_length
+        elif data_type == "date":
+            width = 10
+        elif data_type in ("datetime", "timestamp"):
+            width = 19
+        elif data_type == "time":
+            width = 10
+        elif data_type in ("decimal", "float", "double"):
+            width = (precision or max_width) + 2
+        elif precision is not None:
+            width = precision + 1
+        else:
+            width = max_width
+        declared[name] = max(len(name), min(width, max_width))
+
+    if columns is None:
+        return list(declared.values())
+    return [declared.get(name, max(len(name), max_width)) for name in columns]
+
+
+class StreamingTable:
+    """
+    Prints a fixed-width table batch by batch as rows arrive.
+
+    :param columns: Column names
+    :param widths: Fixed column widths. When None, they are measured from
+        the first batch written and capped at max_width.
+    :param out: File-like object to write to (sys.stdout by default)
+    :param style: "plain" or "grid"
+    :param align: Format alignment for cells; the style's default when None
+    :param formatter: TableFormatter for the rows; a plain one when None
+    :param max_width: Cap on measured column widths. When None, widths are
+        not capped and no cell is ever cut; wider ones push the row out.
+    """
+
+    def __init__(self, columns, widths=None, out=None, style="plain", align=None,
+                 formatter=None, max_width=MAX_WIDTH):
+        self.columns = list(columns)
+        self.widths = list(widths) if widths is not None else None
+        self.out = out if out is not None else sys.stdout
+        self.style = style
+        self.align = align
+        self.formatter = formatter or TableFormatter(self.columns)
+        self.max_width = max_width
+        self.rows_written = 0
+        self._layout = None
+
+    def _start(self, column_cells) -> None:
+        if self.widths is None:
+            self.widths = column_widths(self.columns, column_cells, self.max_width)
+        self._layout = _Layout(self.columns, self.widths, self.style, self.align)
+        self.out.write(self._layout.head())
+
+    def write(self, rows) -> None:
+        """
+        Format and print one batch of rows.
+
+        :param rows: Tuples, or dictionaries keyed by column name
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        column_cells = self.formatter.format_columns(rows)
+        if self._layout is None:
+            self._start(column_cells)
+        if self.max_width is not None:
+            column_cells = [_fit_column(cells, w) for cells, w in zip(column_cells, self.widths)]
+        self.out.write(self._layout.lines(zip(*column_cells)))
+        self.out.flush()
+        self.rows_written += len(rows)
+
+    def write_all(self, rows, batch_size=1000) -> int:
+        """
+        Print every row from an iterable, batch_size rows at a time.
+
+        :param rows: Iterable of rows, e.g. IterTableData
+        :param batch_size: Rows formatted and written per batch
+        :return: Rows written
+        :rtype: int
+        """
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            self.write(batch)
+        return self.rows_written
+
+    def close(self) -> None:
+        """Print the closing rule. An empty table still gets its header."""
+        if self._layout is None:
+            self._start([[] for _ in self.columns])
+        self.out.write(self._layout.foot())
+        self.out.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
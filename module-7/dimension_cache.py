@@ -0,0 +1,166 @@
+"""
+dimension_cache.py
+In-process copy of the small movies lookup tables, genre and studio.
+
+Both tables are read once into dictionaries indexed both ways (id ->
+name and name -> id), so film queries and updates can resolve names
+without a subquery or a join. Before answering, the cache checks the
+tables' version (CHECKSUM TABLE, one round trip for both) at most once
+per check_interval seconds, and reloads them when it changed.
+
+Usage:
+    dims = get_dimensions()
+    horror_id = dims.genre_id(cursor, "Horror")
+    for studio_id, studio_name in dims.studios(cursor):
+        ...
+"""
+
+import threading
+import time
+
+
+# table -> (id column, name column)
+DIMENSIONS = {
+    "genre": ("genre_id", "genre_name"),
+    "studio": ("studio_id", "studio_name"),
+}
+
+
+class Dimension:
+    """One lookup table, indexed by id and by name."""
+
+    def __init__(self, rows):
+        self.by_id = dict(rows)
+        self.by_name = {name: key for key, name in self.by_id.items()}
+        # Names compare case-insensitively in MySQL's default collation
+        self.by_lower_name = {name.lower(): key for name, key in self.by_name.items()
+                              if name is not None}
+
+    def id_for(self, name):
+        if name in self.by_name:
+            return self.by_name[name]
+        return self.by_lower_name.get(name.lower()) if name is not None else None
+
+    def rows(self) -> list[tuple]:
+        return sorted(self.by_id.items())
+
+
+class DimensionCache:
+    """
+    Cached genre and studio tables.
+
+    :param check_interval: Seconds the cached version is trusted before
+        CHECKSUM TABLE is run again. 0 checks on every call.
+    """
+
+    def __init__(self, check_interval=5):
+        self.check_interval = check_interval
+        self._dimensions = {}
+        self._version = None
+        self._checked_at = None
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "checks": 0, "loads": 0}
+
+    # ------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------
+    def genre_id(self, cursor, genre_name):
+        """Id of a genre, or None when there is no such genre."""
+        return self._get(cursor, "genre").id_for(genre_name)
+
+    def genre_name(self, cursor, genre_id):
+        return self._get(cursor, "genre").by_id.get(genre_id)
+
+    def studio_id(self, cursor, studio_name):
+        """Id of a studio, or None when there is no such studio."""
+        return self._get(cursor, "studio").id_for(studio_name)
+
+    def studio_name(self, cursor, studio_id):
+        return self._get(cursor, "studio").by_id.get(studio_id)
+
+    def genres(self, cursor) -> list[tuple]:
+        """All (genre_id, genre_name) pairs, by id."""
+        return self._get(cursor, "genre").rows()
+
+    def studios(self, cursor) -> list[tuple]:
+        """All (studio_id, studio_name) pairs, by id."""
+        return self._get(cursor, "studio").rows()
+
+    def lookup(self, cursor, table) -> Dimension:
+        """The whole Dimension for one table, e.g. for a client-side join."""
+        return self._get(cursor, table)
+
+    def invalidate(self) -> None:
+        """Forget the cached tables. Call after writing to genre or studio."""
+        with self._lock:
+            self._dimensions = {}
+            self._version = None
+            self._checked_at = None
+
+    # ------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------
+    def _get(self, cursor, table) -> Dimension:
+        if table not in DIMENSIONS:
+            raise KeyError(f"{table} is not a cached dimension table")
+        self.refresh(cursor)
+        with self._lock:
+            self.stats["hits"] += 1
+            return self._dimensions[table]
+
+    def refresh(self, cursor, force=False) -> bool:
+        """
+        Reload the tables if their version changed.
+
+        :param cursor: MySQL cursor object
+        :param force: Check the version even inside check_interval
+        :return: True if the tables were reloaded
+        :rtype: bool
+        """
+        now = time.monotonic()
+        with self._lock:
+            if (not force and self._dimensions and self._checked_at is not None
+                    and now - self._checked_at < self.check_interval):
+                return False
+
+        version = self._read_version(cursor)
+        with self._lock:
+            self.stats["checks"] += 1
+            self._checked_at = now
+            if self._dimensions and version == self._version:
+                return False
+
+        dimensions = {}
+        for table, (id_column, name_column) in DIMENSIONS.items():
+            cursor.execute(f"SELECT {id_column}, {name_column} FROM {table}")
+            dimensions[table] = Dimension(cursor.fetchall())
+
+        with self._lock:
+            self._dimensions = dimensions
+            self._version = version
+            self.stats["loads"] += 1
+        return True
+
+    def _read_version(self, cursor) -> tuple:
+        cursor.execute("CHECKSUM TABLE " + ", ".join(DIMENSIONS))
+        rows = cursor.fetchall()
+        if rows and isinstance(rows[0], dict):
+            return tuple((row["Table"], row["Checksum"]) for row in rows)
+        return tuple((row[0], row[1]) for row in rows)
+
+
+# One cache shared by everything in the process
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_dimensions(**options) -> DimensionCache:
+    """
+    Get the process-wide dimension cache, creating it on first use.
+    Options are only applied when the cache is created.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = DimensionCache(**options)
+        return _shared_cache
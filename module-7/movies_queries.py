@@ -6,6 +6,11 @@ Description: Queries the movies database and displays results.
 import mysql.connector
 from mysql.connector import errorcode
 
+from connection_pool import get_pool
+from dimension_cache import get_dimensions
+from instrumentation import configure, instrument
+from query_registry import QueryRegistry
+
 # Your database config
 config = {
     "user": "root",
@@ -16,9 +21,24 @@ config = {
 }
 
 
+# Film queries are declared once and run as prepared statements
+QUERIES = QueryRegistry()
+QUERIES.register("short_films", """
+    SELECT film_name, film_runtime
+    FROM film
+    WHERE film_runtime < %s
+    ORDER BY film_runtime
+""", params=("max_runtime",))
+QUERIES.register("films_by_director", """
+    SELECT film_director, film_name
+    FROM film
+    ORDER BY film_director, film_name
+""")
+
+
 def show_studios(cursor):
-    cursor.execute("SELECT studio_id, studio_name FROM studio")
-    studios = cursor.fetchall()
+    # Served from the dimension cache; the table is only read when it changed
+    studios = get_dimensions().studios(cursor)
 
     print("-- DISPLAYING Studio RECORDS --")
     for studio in studios:
@@ -27,8 +47,7 @@ def show_studios(cursor):
 
 
 def show_genres(cursor):
-    cursor.execute("SELECT genre_id, genre_name FROM genre")
-    genres = cursor.fetchall()
+    genres = get_dimensions().genres(cursor)
 
     print("-- DISPLAYING Genre RECORDS --")
     for genre in genres:
@@ -36,14 +55,8 @@ def show_genres(cursor):
         print("Genre Name: {}\n".format(genre[1]))
 
 
-def show_short_films(cursor):
-    cursor.execute("""
-        SELECT film_name, film_runtime
-        FROM film
-        WHERE film_runtime < 120
-        ORDER BY film_runtime
-    """)
-    films = cursor.fetchall()
+def show_short_films(db):
+    _, films, _ = QUERIES.fetch(db, "short_films", {"max_runtime": 120})
 
     print("-- DISPLAYING Short Film RECORDS (runtime < 120) --")
     for film in films:
@@ -51,13 +64,8 @@ def show_short_films(cursor):
         print("Runtime (minutes): {}\n".format(film[1]))
 
 
-def show_films_grouped_by_director(cursor):
-    cursor.execute("""
-        SELECT film_director, film_name
-        FROM film
-        ORDER BY film_director, film_name
-    """)
-    films = cursor.fetchall()
+def show_films_grouped_by_director(db):
+    _, films, _ = QUERIES.fetch(db, "films_by_director")
 
     print("-- DISPLAYING Film RECORDS Grouped by Director --")
     for film in films:
@@ -67,13 +75,15 @@ def show_films_grouped_by_director(cursor):
 
 def main():
     try:
-        db = mysql.connector.connect(**config)
+        # Queries are timed when METRICS is set in the environment
+        configure()
+        db = instrument(get_pool(config).checkout())
         cursor = db.cursor()
 
         show_studios(cursor)
         show_genres(cursor)
-        show_short_films(cursor)
-        show_films_grouped_by_director(cursor)
+        show_short_films(db)
+        show_films_grouped_by_director(db)
 
     except mysql.connector.Error as err:
         print("MySQL Error:", err)
@@ -0,0 +1,49 @@
+-- Optional: record every change to film in film_change_log so that
+-- film_view.FilmView.refresh_from_log can bring an in-memory film list up
+-- to date by re-reading only the films that changed, including changes
+-- made by other programs. Without it, FilmView only sees the changes
+-- reported by FilmBatch.
+-- Delete old rows now and then, e.g.
+--   DELETE FROM film_change_log WHERE changed_at < NOW() - INTERVAL 7 DAY;
+
+USE movies;
+
+CREATE TABLE IF NOT EXISTS film_change_log (
+  change_id   BIGINT      NOT NULL AUTO_INCREMENT,
+  film_id     INT         NOT NULL,
+  change_type VARCHAR(6)  NOT NULL,
+  changed_at  TIMESTAMP   NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (change_id)
+);
+
+DROP TRIGGER IF EXISTS film_ChangeLogInsert;
+DROP TRIGGER IF EXISTS film_ChangeLogUpdate;
+DROP TRIGGER IF EXISTS film_ChangeLogDelete;
+
+DELIMITER $$
+
+CREATE TRIGGER film_ChangeLogInsert
+AFTER INSERT ON film
+FOR EACH ROW
+BEGIN
+  INSERT INTO film_change_log (film_id, change_type) VALUES (NEW.film_id, 'insert');
+END$$
+
+CREATE TRIGGER film_ChangeLogUpdate
+AFTER UPDATE ON film
+FOR EACH ROW
+BEGIN
+  IF OLD.film_id <> NEW.film_id THEN
+    INSERT INTO film_change_log (film_id, change_type) VALUES (OLD.film_id, 'delete');
+  END IF;
+  INSERT INTO film_change_log (film_id, change_type) VALUES (NEW.film_id, 'update');
+END$$
+
+CREATE TRIGGER film_ChangeLogDelete
+AFTER DELETE ON film
+FOR EACH ROW
+BEGIN
+  INSERT INTO film_change_log (film_id, change_type) VALUES (OLD.film_id, 'delete');
+END$$
+
+DELIMITER ;
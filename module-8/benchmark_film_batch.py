@@ -0,0 +1,104 @@
+"""
+Title: benchmark_film_batch.py
+Description: Compares mutations per second of FilmBatch against the
+one-statement-one-commit pattern movies_update_and_delete.py used.
+
+Each run inserts N throwaway films, updates each one, and deletes them
+again (3 * N mutations). The films are named "bench-film-<n>" and are
+always removed, even if a run fails.
+
+Usage:
+    python benchmark_film_batch.py --films 2000 --batch-size 500
+"""
+
+import argparse
+import time
+
+from connection_pool import get_pool
+from film_batch import FilmBatch, INSERT_FILM, DELETE_FILM
+from movies_update_and_delete import config
+
+
+PREFIX = "bench-film-"
+
+
+def film_rows(count, studio_id, genre_id):
+    return [(f"{PREFIX}{n}", "2000", 90 + n % 60, "Benchmark Director", studio_id, genre_id)
+            for n in range(count)]
+
+
+def per_statement(db, rows) -> float:
+    """The old way: execute and commit one statement at a time."""
+    cursor = db.cursor()
+    start = time.perf_counter()
+    for row in rows:
+        cursor.execute(INSERT_FILM, row)
+        db.commit()
+    for row in rows:
+        cursor.execute("UPDATE film SET film_runtime = %s WHERE film_name = %s",
+                       (row[2] + 1, row[0]))
+        db.commit()
+    for row in rows:
+        cursor.execute(DELETE_FILM, (row[0],))
+        db.commit()
+    seconds = time.perf_counter() - start
+    cursor.close()
+    return seconds
+
+
+def batched(db, rows, batch_size) -> float:
+    start = time.perf_counter()
+    with FilmBatch(db, batch_size=batch_size) as batch:
+        for row in rows:
+            batch.insert(*row)
+        for row in rows:
+            batch.update(row[0], film_runtime=row[2] + 1)
+        for row in rows:
+            batch.delete(row[0])
+    return time.perf_counter() - start
+
+
+def cleanup(db) -> None:
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM film WHERE film_name LIKE %s", (PREFIX + "%",))
+    db.commit()
+    cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FilmBatch vs per-statement commits")
+    parser.add_argument("--films", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = get_pool(config).checkout()
+    try:
+        # Any existing studio and genre will do for the throwaway films
+        cursor = db.cursor()
+        cursor.execute("SELECT MIN(studio_id) FROM studio")
+        studio_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(genre_id) FROM genre")
+        genre_id = cursor.fetchone()[0]
+        cursor.close()
+
+        rows = film_rows(args.films, studio_id, genre_id)
+        mutations = 3 * len(rows)
+        cleanup(db)
+
+        old = per_statement(db, rows)
+        cleanup(db)
+        new = batched(db, rows, args.batch_size)
+
+        print(f"\n{mutations:,} mutations ({args.films:,} films inserted, updated, deleted)")
+        print(f"{'Pattern':<22} {'Seconds':>10} {'Mutations/s':>14}")
+        print(f"{'per-statement commit':<22} {old:>10.3f} {mutations / old:>14,.0f}")
+        print(f"{'FilmBatch':<22} {new:>10.3f} {mutations / new:>14,.0f}")
+        print(f"\nSpeedup: {old / new:.1f}x")
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
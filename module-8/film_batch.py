@@ -0,0 +1,248 @@
+"""
+Title: film_batch.py
+Description: Batches film inserts, updates, and deletes into one transaction.
+
+Mutations are queued and sent in groups: back-to-back operations of the
+same shape (all inserts, updates of the same columns, all deletes) go out
+together with executemany, batch_size rows at a time, in the order they
+were queued.
+    inserts          - plain cursor; executemany rewrites them into one
+                       multi-row INSERT per batch
+    updates, deletes - prepared cursor; the statement is parsed once and
+                       then executed with each row's parameters
+
+Nothing is committed until commit() (or the end of a with block), and
+savepoint() blocks can be rolled back on their own without losing the
+rest of the transaction.
+
+Usage:
+    with FilmBatch(db, batch_size=500) as batch:
+        with batch.savepoint("new_releases"):
+            batch.insert("Inception", "2010", 148, "Christopher Nolan", 1, 1)
+        batch.update("Alien", genre_id=3)
+        batch.delete("Gladiator")
+    print(batch.summary)
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import mysql.connector
+
+
+INSERT_FILM = """
+    INSERT INTO film
+        (film_name, film_releaseDate, film_runtime,
+         film_director, studio_id, genre_id)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+DELETE_FILM = "DELETE FROM film WHERE film_name = %s"
+
+# Columns update() is allowed to set
+FILM_COLUMNS = ("film_name", "film_releaseDate", "film_runtime",
+                "film_director", "studio_id", "genre_id")
+
+_SAVEPOINT_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@dataclass
+class ChangeSummary:
+    """What a FilmBatch did to the film table."""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    statements: int = 0
+    batches: int = 0
+    # film_id of every inserted film
+    inserted_ids: list = field(default_factory=list)
+    # film_name of every film updated, deleted, or renamed, in the order
+    # queued (kept even if a savepoint later undoes the change)
+    changed_names: list = field(default_factory=list)
+    # (savepoint name, error) for each savepoint that was rolled back
+    rolled_back: list = field(default_factory=list)
+    committed: bool = False
+    seconds: float = 0.0
+
+    def __str__(self):
+        text = (f"{self.inserted} inserted, {self.updated} updated, {self.deleted} deleted "
+                f"in {self.batches} batches ({self.statements} statements, "
+                f"{self.seconds:.3f}s)")
+        for name, error in self.rolled_back:
+            text += f"\n  rolled back {name}: {error}"
+        return text
+
+
+class FilmBatch:
+    """
+    Queue of film mutations sent in batches inside one transaction.
+
+    :param conn: MySQL connection (autocommit off)
+    :param batch_size: Rows sent per executemany call
+    """
+
+    def __init__(self, conn, batch_size=500):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.conn = conn
+        self.batch_size = batch_size
+        self.summary = ChangeSummary()
+        # Each entry is (kind, sql, rows); same-shaped operations share one
+        self._pending = []
+        self._cursor = None
+        self._prepared = None
+        self._start = time.perf_counter()
+
+    # ------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------
+    def _queue(self, kind, sql, row) -> None:
+        if self._pending and self._pending[-1][1] == sql:
+            self._pending[-1][2].append(row)
+        else:
+            self._pending.append((kind, sql, [row]))
+        if len(self._pending[-1][2]) >= self.batch_size:
+            self.flush()
+
+    def insert(self, film_name, release_date, runtime, director, studio_id, genre_id) -> None:
+        """Queue a new film."""
+        self._queue("insert", INSERT_FILM,
+                    (film_name, release_date, runtime, director, studio_id, genre_id))
+
+    def update(self, film_name, **changes) -> None:
+        """
+        Queue an update of the film(s) with this name.
+
+        :param film_name: Film to change
+        :param changes: Column values to set, e.g. genre_id=3
+        """
+        if not changes:
+            raise ValueError("update() needs at least one column to set")
+        unknown = [c for c in changes if c not in FILM_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown film column(s): {', '.join(unknown)}")
+
+        columns = sorted(changes)
+        sql = ("UPDATE film SET " + ", ".join(f"{c} = %s" for c in columns)
+               + " WHERE film_name = %s")
+        self._queue("update", sql, tuple(changes[c] for c in columns) + (film_name,))
+        self.summary.changed_names.append(film_name)
+        if "film_name" in changes:
+            self.summary.changed_names.append(changes["film_name"])
+
+    def delete(self, film_name) -> None:
+        """Queue removal of the film(s) with this name."""
+        self._queue("delete", DELETE_FILM, (film_name,))
+        self.summary.changed_names.append(film_name)
+
+    # ------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------
+    def _cursors(self):
+        if self._cursor is None:
+            self._cursor = self.conn.cursor()
+            self._prepared = self.conn.cursor(prepared=True)
+        return self._cursor, self._prepared
+
+    def flush(self) -> None:
+        """Send everything queued so far. Does not commit."""
+        cursor, prepared = self._cursors()
+        pending, self._pending = self._pending, []
+
+        for kind, sql, rows in pending:
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                if kind == "insert":
+                    cursor.executemany(sql, chunk)
+                    count = cursor.rowcount
+                    # A multi-row INSERT gets consecutive AUTO_INCREMENT ids
+                    # starting at lastrowid
+                    first = cursor.lastrowid
+                    if first:
+                        self.summary.inserted_ids.extend(range(first, first + len(chunk)))
+                    self.summary.inserted += count
+                else:
+                    prepared.executemany(sql, chunk)
+                    count = prepared.rowcount
+                    if kind == "update":
+                        self.summary.updated += count
+                    else:
+                        self.summary.deleted += count
+                self.summary.statements += len(chunk)
+                self.summary.batches += 1
+
+    @contextmanager
+    def savepoint(self, name):
+        """
+        Run a block of mutations that can be undone on its own.
+        Pending work is flushed at both ends of the block. If the database
+        rejects anything in the block, the block is rolled back to the
+        savepoint, recorded in summary.rolled_back, and the transaction
+        carries on. Any other exception also rolls the block back, then
+        propagates.
+
+        :param name: Savepoint name (letters, digits, underscores)
+        """
+        if not _SAVEPOINT_NAME.match(name):
+            raise ValueError(f"Invalid savepoint name: {name!r}")
+        self.flush()
+        cursor, _ = self._cursors()
+        cursor.execute(f"SAVEPOINT {name}")
+        mark = (self.summary.inserted, self.summary.updated, self.summary.deleted,
+                len(self.summary.inserted_ids))
+        try:
+            yield self
+            self.flush()
+        except mysql.connector.Error as err:
+            self._rollback_to(name, mark)
+            self.summary.rolled_back.append((name, err))
+        except Exception as err:
+            self._rollback_to(name, mark)
+            self.summary.rolled_back.append((name, err))
+            raise
+        else:
+            cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+    def _rollback_to(self, name, mark) -> None:
+        self._pending = []
+        self._cursors()[0].execute(f"ROLLBACK TO SAVEPOINT {name}")
+        # Counts only cover work that is still part of the transaction
+        (self.summary.inserted, self.summary.updated, self.summary.deleted,
+         id_count) = mark
+        del self.summary.inserted_ids[id_count:]
+
+    def commit(self) -> ChangeSummary:
+        """Flush and commit. Returns the change summary."""
+        self.flush()
+        self.conn.commit()
+        self.summary.committed = True
+        self.summary.seconds = time.perf_counter() - self._start
+        return self.summary
+
+    def rollback(self) -> None:
+        """Drop everything: queued and already sent."""
+        self._pending = []
+        self.conn.rollback()
+        self.summary.committed = False
+        self.summary.seconds = time.perf_counter() - self._start
+
+    def close(self) -> None:
+        for cursor in (self._cursor, self._prepared):
+            if cursor is not None:
+                cursor.close()
+        self._cursor = self._prepared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.close()
+        return False
@@ -0,0 +1,275 @@
+"""
+Title: film_view.py
+Description: Keeps the film/genre/studio join in memory and refreshes
+only the films that changed.
+
+Re-running the whole three-way join to print every film after each
+change costs the same however little changed. FilmView runs the join
+once, keeps the rows indexed by film_id, and afterwards re-reads only
+the changed films by primary key.
+The changed ids come from a FilmBatch change summary, or from the
+film_change_log table that FilmChangeLog.sql fills with triggers. Each
+refresh returns a FilmDiff of added, changed, and removed films, so the
+cost of a refresh follows the number of changed films, not the size of
+the catalog.
+
+Without a DimensionCache, renaming a genre or studio is not tracked;
+call load() again after that.
+
+Usage:
+    view = FilmView()
+    view.load(cursor)
+    view.show("DISPLAYING FILMS")
+    ...FilmBatch work...
+    print_diff(view.apply_summary(cursor, batch.summary), "AFTER INSERT")
+"""
+
+from dataclasses import dataclass, field
+
+import mysql.connector
+from mysql.connector import errorcode
+
+
+FILM_COLUMNS = ("Name", "Director", "Genre", "Studio")
+
+FILM_JOIN = """
+    SELECT
+        film.film_id,
+        film.film_name   AS Name,
+        film.film_director AS Director,
+        genre.genre_name AS Genre,
+        studio.studio_name AS Studio
+    FROM film
+    INNER JOIN genre
+        ON film.genre_id = genre.genre_id
+    INNER JOIN studio
+        ON film.studio_id = studio.studio_id
+"""
+
+# With a DimensionCache the join is done here instead of in the database
+FILM_ROWS = """
+    SELECT film.film_id, film.film_name, film.film_director,
+           film.genre_id, film.studio_id
+    FROM film
+"""
+
+
+@dataclass
+class FilmDiff:
+    """Films added, changed, or removed by one refresh."""
+    # film_id -> (Name, Director, Genre, Studio)
+    added: dict = field(default_factory=dict)
+    # film_id -> (old row, new row)
+    changed: dict = field(default_factory=dict)
+    removed: dict = field(default_factory=dict)
+    # Films read from the database to build this diff
+    rows_read: int = 0
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+class FilmView:
+    """
+    In-memory copy of the film/genre/studio join, keyed by film_id.
+
+    :param dimensions: Optional DimensionCache. When given, only the film
+        table is read and genre and studio names are filled in from the
+        cache; a renamed genre or studio then shows up as changed films.
+    """
+
+    def __init__(self, dimensions=None):
+        self.dimensions = dimensions
+        self.films = {}
+        # film_id -> (name, director, genre_id, studio_id), dimensions mode only
+        self._raw = {}
+        # DimensionCache.current() that every film in the view was resolved
+        # against; the cache is shared, so anyone may have reloaded it since
+        self._resolved_with = None
+        # Highest film_change_log.change_id applied; None if there is no log
+        self.log_position = None
+        # Per FilmBatch summary: how many ids and names were already applied
+        self._summary_marks = {}
+
+    def load(self, cursor) -> int:
+        """
+        Read the full join. Also notes where film_change_log ends, so a
+        later refresh_from_log picks up from here.
+
+        :return: Number of films loaded
+        :rtype: int
+        """
+        self._raw = {}
+        self.films = self._read(cursor)
+        try:
+            cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM film_change_log")
+            self.log_position = cursor.fetchone()[0]
+        except mysql.connector.Error as err:
+            if err.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+            self.log_position = None
+        return len(self.films)
+
+    def apply_changes(self, cursor, film_ids=(), film_names=()) -> FilmDiff:
+        """
+        Re-read the given films and update the view.
+
+        :param cursor: MySQL cursor object
+        :param film_ids: Ids of films that may have changed
+        :param film_names: Names of films that may have changed. Names
+            already in the view are turned into ids; others are looked up
+            by name.
+        :return: What changed
+        :rtype: FilmDiff
+        """
+        ids = set(film_ids)
+        names = set(film_names)
+        if names:
+            known = {film_id for film_id, row in self.films.items() if row[0] in names}
+            ids |= known
+            names -= {self.films[film_id][0] for film_id in known}
+
+        diff = FilmDiff()
+        self._apply_dimension_changes(cursor, diff)
+        if not ids and not names:
+            return diff
+
+        conditions = []
+        params = []
+        if ids:
+            conditions.append(f"film.film_id IN ({', '.join(['%s'] * len(ids))})")
+            params.extend(sorted(ids))
+        if names:
+            conditions.append(f"film.film_name IN ({', '.join(['%s'] * len(names))})")
+            params.extend(sorted(names))
+        fresh = self._read(cursor, " WHERE " + " OR ".join(conditions), params, ids)
+        diff.rows_read = len(fresh)
+        self._merge(fresh, ids, diff)
+        return diff
+
+    def _read(self, cursor, where="", params=(), asked_ids=()) -> dict:
+        """Run the join, in the database or against the dimension cache."""
+        if self.dimensions is None:
+            cursor.execute(FILM_JOIN + where, params)
+            return {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+        cursor.execute(FILM_ROWS + where, params)
+        raw = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+        self._raw.update(raw)
+        for film_id in set(asked_ids) - raw.keys():
+            self._raw.pop(film_id, None)
+        dimensions = self.dimensions.current(cursor)
+        if not where:
+            self._resolved_with = dimensions
+        return self._resolve(dimensions, raw)
+
+    def _resolve(self, dimensions, raw) -> dict:
+        genres = dimensions["genre"].by_id
+        studios = dimensions["studio"].by_id
+        # Films without a matching genre or studio are left out, as the
+        # INNER JOINs in FILM_JOIN do
+        return {
+            film_id: (name, director, genres[genre_id], studios[studio_id])
+            for film_id, (name, director, genre_id, studio_id) in raw.items()
+            if genre_id in genres and studio_id in studios
+        }
+
+    def _merge(self, fresh, asked_ids, diff) -> None:
+        for film_id, row in fresh.items():
+            old = self.films.get(film_id)
+            if old is None:
+                diff.added[film_id] = row
+            elif old != row:
+                diff.changed[film_id] = (old, row)
+            self.films[film_id] = row
+
+        # Asked about but gone from the join: deleted, or no longer has a
+        # matching genre or studio
+        for film_id in asked_ids - fresh.keys():
+            if film_id in self.films:
+                diff.removed[film_id] = self.films.pop(film_id)
+
+    def _apply_dimension_changes(self, cursor, diff) -> None:
+        # The genre and studio tables were reloaded since the films were
+        # resolved, here or by another user of the shared cache: re-join
+        # every film from memory, no film rows are read
+        if self.dimensions is None:
+            return
+        dimensions = self.dimensions.current(cursor)
+        if dimensions is not self._resolved_with:
+            self._resolved_with = dimensions
+            self._merge(self._resolve(dimensions, self._raw), set(self._raw), diff)
+
+    def apply_summary(self, cursor, summary) -> FilmDiff:
+        """
+        Apply the changes a FilmBatch has made since the last call for
+        that batch. Safe to call after every step of a batch.
+
+        :param cursor: MySQL cursor object (same connection as the batch,
+            so it sees the uncommitted changes)
+        :param summary: FilmBatch.summary
+        """
+        id_mark, name_mark = self._summary_marks.get(id(summary), (0, 0))
+        # A rolled back savepoint can shorten inserted_ids
+        id_mark = min(id_mark, len(summary.inserted_ids))
+        diff = self.apply_changes(cursor,
+                                  summary.inserted_ids[id_mark:],
+                                  summary.changed_names[name_mark:])
+        self._summary_marks[id(summary)] = (len(summary.inserted_ids),
+                                            len(summary.changed_names))
+        return diff
+
+    def refresh_from_log(self, cursor) -> FilmDiff:
+        """
+        Apply every change recorded in film_change_log since the last
+        load or refresh, whoever made it. Needs FilmChangeLog.sql.
+        """
+        if self.log_position is None:
+            raise RuntimeError("film_change_log is missing; run FilmChangeLog.sql")
+        cursor.execute(
+            "SELECT change_id, film_id FROM film_change_log "
+            "WHERE change_id > %s ORDER BY change_id",
+            (self.log_position,)
+        )
+        changes = cursor.fetchall()
+        if not changes:
+            return FilmDiff()
+        self.log_position = changes[-1][0]
+        return self.apply_changes(cursor, film_ids={film_id for _, film_id in changes})
+
+    def show(self, title) -> None:
+        """Print every film's name, director, genre and studio, sorted by name."""
+        print("-- {} --".format(title))
+        # Case-insensitive like the database's ORDER BY film_name
+        for row in sorted(self.films.values(), key=lambda r: r[0].lower()):
+            print_film(row)
+
+
+def print_film(row, marker="") -> None:
+    print("{}Film Name: {}".format(marker, row[0]))
+    print("Director: {}".format(row[1]))
+    print("Genre: {}".format(row[2]))
+    print("Studio: {}\n".format(row[3]))
+
+
+def print_diff(diff, title) -> None:
+    """
+    Print only what a refresh changed: added films in full, changed films
+    as old -> new per column, and the names of removed films.
+    """
+    print("-- {} ({} added, {} changed, {} removed) --".format(
+        title, len(diff.added), len(diff.changed), len(diff.removed)))
+    if not diff:
+        print("No changes.\n")
+        return
+
+    for row in sorted(diff.added.values(), key=lambda r: r[0].lower()):
+        print_film(row, marker="+ ")
+    for old, new in sorted(diff.changed.values(), key=lambda pair: pair[1][0].lower()):
+        print("~ Film Name: {}".format(new[0]))
+        for column, before, after in zip(FILM_COLUMNS, old, new):
+            if before != after:
+                print("{}: {} -> {}".format(column, before, after))
+        print()
+    for row in sorted(diff.removed.values(), key=lambda r: r[0].lower()):
+        print("- Film Name: {}\n".format(row[0]))
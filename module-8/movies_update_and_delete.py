@@ -6,6 +6,12 @@ Description: Shows films, then inserts, updates, and deletes movies.
 import mysql.connector
 from mysql.connector import errorcode
 
+from connection_pool import get_pool
+from film_batch import FilmBatch
+from film_view import FilmView, print_diff
+from dimension_cache import get_dimensions
+from instrumentation import configure, instrument, timer
+
 config = {
     "user": "root",
     "password": "Laurine88..",
@@ -15,94 +21,60 @@ config = {
 }
 
 
-def show_films(cursor, title):
-    """
-    Display film name, director, genre, and studio using joins.
-    """
-    query = """
-        SELECT
-            film.film_name   AS Name,
-            film.film_director AS Director,
-            genre.genre_name AS Genre,
-            studio.studio_name AS Studio
-        FROM film
-        INNER JOIN genre
-            ON film.genre_id = genre.genre_id
-        INNER JOIN studio
-            ON film.studio_id = studio.studio_id
-        ORDER BY film.film_name;
-    """
-
-    cursor.execute(query)
-    films = cursor.fetchall()
-
-    print("-- {} --".format(title))
-    for film in films:
-        print("Film Name: {}".format(film[0]))
-        print("Director: {}".format(film[1]))
-        print("Genre: {}".format(film[2]))
-        print("Studio: {}\n".format(film[3]))
-
-
 def main():
     try:
-        db = mysql.connector.connect(**config)
+        # Queries are timed when METRICS is set in the environment
+        configure()
+        db = instrument(get_pool(config).checkout())
         cursor = db.cursor()
 
-        # Initial display
-        show_films(cursor, "DISPLAYING FILMS")
-
-        # Insert a new film of your choice
-        insert_film = """
-            INSERT INTO film
-                (film_name, film_releaseDate, film_runtime,
-                 film_director, studio_id, genre_id)
-            VALUES (%s, %s, %s, %s, %s, %s);
-        """
-
-        # Change these values if you want a different movie,
-        # but keep studio_id and genre_id as valid ids in your tables.
-        new_film_data = (
-            "Inception",        # film_name
-            "2010",             # film_releaseDate (keep it simple as a year)
-            148,                # film_runtime in minutes
-            "Christopher Nolan",# film_director
-            1,                  # studio_id (must exist in studio table)
-            1                   # genre_id (must exist in genre table)
-        )
-
-        cursor.execute(insert_film, new_film_data)
-        db.commit()
-
-        show_films(cursor, "DISPLAYING FILMS AFTER INSERT")
-
-        # Update Alien to be a Horror film
-        update_alien = """
-            UPDATE film
-            SET genre_id = (
-                SELECT genre_id
-                FROM genre
-                WHERE genre_name = 'Horror'
-                LIMIT 1
+        # Initial display. The join runs once; after each change only the
+        # films the change touched are read again and shown as a diff.
+        # Genre and studio names come from the in-process dimension cache,
+        # so the film reads skip the join and Horror needs no subquery
+        dims = get_dimensions()
+        view = FilmView(dims)
+        view.load(cursor)
+        with timer("render_seconds", report="films"):
+            view.show("DISPLAYING FILMS")
+
+        # All three changes run in one transaction, sent in batches. Each
+        # step has its own savepoint so a failed step can be undone alone.
+        with FilmBatch(db) as batch:
+            # Insert a new film of your choice
+            # Change these values if you want a different movie,
+            # but keep studio_id and genre_id as valid ids in your tables.
+            new_film_data = (
+                "Inception",        # film_name
+                "2010",             # film_releaseDate (keep it simple as a year)
+                148,                # film_runtime in minutes
+                "Christopher Nolan",# film_director
+                1,                  # studio_id (must exist in studio table)
+                1                   # genre_id (must exist in genre table)
             )
-            WHERE film_name = 'Alien';
-        """
 
-        cursor.execute(update_alien)
-        db.commit()
+            with batch.savepoint("insert_inception"):
+                batch.insert(*new_film_data)
+
+            print_diff(view.apply_summary(cursor, batch.summary),
+                       "DISPLAYING FILMS AFTER INSERT")
+
+            # Update Alien to be a Horror film
+            with batch.savepoint("alien_to_horror"):
+                batch.update("Alien", genre_id=dims.genre_id(cursor, "Horror"))
 
-        show_films(cursor, "DISPLAYING FILMS AFTER UPDATE - CHANGED ALIEN TO HORROR")
+            print_diff(view.apply_summary(cursor, batch.summary),
+                       "DISPLAYING FILMS AFTER UPDATE - CHANGED ALIEN TO HORROR")
 
-        # Delete Gladiator
-        delete_gladiator = """
-            DELETE FROM film
-            WHERE film_name = 'Gladiator';
-        """
+            # Delete Gladiator
+            with batch.savepoint("delete_gladiator"):
+                batch.delete("Gladiator")
 
-        cursor.execute(delete_gladiator)
-        db.commit()
+            print_diff(view.apply_summary(cursor, batch.summary),
+                       "DISPLAYING FILMS AFTER DELETE - REMOVED GLADIATOR")
 
-        show_films(cursor, "DISPLAYING FILMS AFTER DELETE - REMOVED GLADIATOR")
+        print("-- CHANGES COMMITTED --")
+        print(batch.summary)
 
     except mysql.connector.Error as err:
         if err.errno == errorcode.ER_ACCESS_DENIED_ERROR: